@@ -0,0 +1,56 @@
+"""
+Compare two benchmark result files written by run.py
+
+    python benchmarks/compare.py before.json after.json [--threshold 10]
+
+Prints the median time of every benchmark in both runs and the change. With
+`--threshold` the exit status is 1 if anything got slower by more than that
+many percent.
+"""
+import argparse
+import json
+import sys
+
+
+def compare(before, after):
+    """Return (benchmark, items, before ms, after ms, change %) rows for benchmarks present in both runs"""
+    rows = []
+    for name, by_items in after["results"].items():
+        for item_count, result in by_items.items():
+            previous = before["results"].get(name, {}).get(item_count)
+            if not previous:
+                continue
+            change = (result["median_ms"] - previous["median_ms"]) / previous["median_ms"] * 100
+            rows.append((name, int(item_count), previous["median_ms"], result["median_ms"], change))
+
+    return sorted(rows, key=lambda row: (row[0], row[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, help="fail if a benchmark is slower by more than this percentage")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"before: {before['meta'].get('commit')}  after: {after['meta'].get('commit')}")
+    print(f"{'benchmark':30} {'items':>6} {'before ms':>12} {'after ms':>12} {'change':>9}")
+
+    regressions = []
+    for name, item_count, before_ms, after_ms, change in compare(before, after):
+        print(f"{name:30} {item_count:>6} {before_ms:>12.3f} {after_ms:>12.3f} {change:>+8.1f}%")
+        if args.threshold is not None and change > args.threshold:
+            regressions.append((name, item_count))
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower by more than {args.threshold}%", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""
+A minimal stand-in for the parts of Frappe the print pipeline touches
+
+Only what custom_invoice imports and calls while printing is provided, backed by
+in-memory documents so the real template and controller code run without MariaDB,
+Redis or wkhtmltopdf. Call `install()` before importing any custom_invoice module.
+"""
+import datetime
+import html
+import importlib
+import logging
+import os
+import sys
+import tempfile
+import types
+import uuid
+
+import jinja2
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "custom_invoice")
+PRINT_FORMAT_PATH = os.path.join(APP_PATH, "print_format", "pr_plastics_invoice.html")
+
+
+class _dict(dict):
+    """Same as frappe._dict: a dict with attribute access"""
+    __getattr__ = dict.get
+    __setattr__ = dict.__setitem__
+    __delattr__ = dict.__delitem__
+
+    def __getstate__(self):
+        return self
+
+    def __setstate__(self, state):
+        self.update(state)
+
+
+class Document:
+    """Read-only document, enough for rendering a print format"""
+
+    def __init__(self, data):
+        self.__dict__.update(data)
+
+    def __getattr__(self, key):
+        # Only called for missing fields, which Frappe returns as None too
+        return None
+
+    def get(self, key, default=None):
+        return self.__dict__.get(key, default)
+
+    def check_permission(self, permtype="read"):
+        pass
+
+    def run_method(self, method, *args, **kwargs):
+        pass
+
+
+class File(_dict):
+    """File doc that keeps its content in memory"""
+
+    def save(self):
+        self.name = uuid.uuid4().hex[:10]
+        self.file_url = f"/files/{self.file_name}"
+        self.file_size = len(self.content)
+        return self
+
+    def get_content(self):
+        return self.content
+
+
+class Cache:
+    """In-memory replacement of frappe.cache() for the calls this app makes"""
+
+    def __init__(self):
+        self.data = {}
+
+    def make_key(self, key):
+        return key
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+    def incrby(self, key, amount=1):
+        self.data[key] = int(self.data.get(key) or 0) + amount
+        return self.data[key]
+
+    def hget(self, name, key):
+        return self.data.get(name, {}).get(key)
+
+    def hset(self, name, key, value):
+        self.data.setdefault(name, {})[key] = value
+
+    def hdel(self, name, key):
+        self.data.get(name, {}).pop(key, None)
+
+    def hgetall(self, name):
+        return dict(self.data.get(name, {}))
+
+
+class Database:
+    """Answers the get_value calls of the print pipeline from the stub's documents"""
+
+    def __init__(self, frappe):
+        self.frappe = frappe
+
+    def get_value(self, doctype, name, fieldname="name", as_dict=False):
+        if doctype == "Print Format":
+            return self.frappe.print_formats.get(name) if fieldname == "html" else None
+
+        doc = self.frappe.documents.get((doctype, name))
+        if not doc:
+            return None
+        if isinstance(fieldname, (list, tuple)):
+            values = [doc.get(field) for field in fieldname]
+            return _dict(zip(fieldname, values)) if as_dict else values
+        return doc.get(fieldname)
+
+    def exists(self, doctype, name=None):
+        return True
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def install(print_format_html=None, pdf_renderer=None, conf=None):
+    """
+    Register the stub `frappe` modules in sys.modules and return the `frappe` module
+
+    Args:
+        print_format_html: HTML of the PR Plastics Invoice print format, defaults to the file in the app
+        pdf_renderer: Function used as `get_pdf(html, options)`; by default the HTML is
+            returned as bytes so only our own code is measured
+        conf: Extra site config values
+    """
+    if print_format_html is None:
+        with open(PRINT_FORMAT_PATH) as f:
+            print_format_html = f.read()
+
+    frappe = types.ModuleType("frappe")
+    frappe._dict = _dict
+    frappe.documents = {}
+    frappe.print_formats = {"PR Plastics Invoice": print_format_html}
+    frappe.conf = _dict({
+        # Every run must render; the cache would turn the end-to-end case into a dict lookup
+        "custom_invoice_pdf_cache": 0,
+        **(conf or {})
+    })
+    frappe.local = _dict(site="benchmark.local", conf=frappe.conf, response=_dict())
+    frappe.session = _dict(user="Administrator")
+    frappe.db = Database(frappe)
+
+    site_path = tempfile.mkdtemp(prefix="custom_invoice_benchmark_")
+    cache = Cache()
+    logger = logging.getLogger("custom_invoice.benchmark")
+    logger.disabled = True
+
+    def get_doc(doctype, name=None):
+        if isinstance(doctype, dict):
+            return File(doctype)
+        return frappe.documents[(doctype, name)]
+
+    def throw(message, exc=Exception, *args, **kwargs):
+        raise exc(message)
+
+    frappe.whitelist = lambda *args, **kwargs: (lambda fn: fn)
+    frappe.logger = lambda *args, **kwargs: logger
+    frappe.log_error = lambda *args, **kwargs: None
+    frappe.throw = throw
+    frappe.only_for = lambda *args, **kwargs: None
+    frappe.has_permission = lambda *args, **kwargs: True
+    frappe.publish_realtime = lambda *args, **kwargs: None
+    frappe.generate_hash = lambda *args, length=10, **kwargs: uuid.uuid4().hex[:length]
+    frappe.safe_decode = lambda value: value.decode() if isinstance(value, bytes) else value
+    frappe.get_doc = get_doc
+    frappe.get_cached_doc = lambda doctype, name=None: Document({"doctype": doctype, "name": name or doctype})
+    frappe.get_meta = lambda doctype: _dict(default_print_format=None)
+    frappe.cache = lambda: cache
+    frappe.get_app_path = lambda app, *parts: os.path.join(APP_PATH, *parts)
+    frappe.get_site_path = lambda *parts: os.path.join(site_path, *parts)
+
+    utils = types.ModuleType("frappe.utils")
+    utils.cint = cint
+    utils.flt = flt
+    utils.escape_html = escape_html
+    utils.money_in_words = money_in_words
+    utils.getdate = getdate
+    utils.nowdate = lambda: datetime.date.today().isoformat()
+    utils.get_url = lambda uri=None: "http://benchmark.local" + (uri or "")
+
+    pdf = types.ModuleType("frappe.utils.pdf")
+    pdf.get_pdf = pdf_renderer or (lambda html, options=None: html.encode())
+    utils.pdf = pdf
+
+    model = types.ModuleType("frappe.model")
+    naming = types.ModuleType("frappe.model.naming")
+    naming.make_autoname = lambda key, doctype=None, doc=None: key.replace(".####", "0001")
+    model.naming = naming
+
+    frappe.utils = utils
+    frappe.model = model
+    sys.modules.update({
+        "frappe": frappe,
+        "frappe.utils": utils,
+        "frappe.utils.pdf": pdf,
+        "frappe.model": model,
+        "frappe.model.naming": naming,
+    })
+
+    jenv = get_jinja_env(frappe)
+    frappe.get_jenv = lambda: jenv
+    frappe.get_print = get_print
+
+    return frappe
+
+
+def get_jinja_env(frappe):
+    """Build a Jinja environment with the methods and filters registered in hooks.jinja"""
+    from custom_invoice import hooks
+
+    jenv = jinja2.Environment(undefined=jinja2.Undefined)
+    jenv.globals["frappe"] = frappe
+    for path in hooks.jinja.get("methods", []):
+        jenv.globals[path.rsplit(".", 1)[1]] = get_attr(path)
+    for path in hooks.jinja.get("filters", []):
+        jenv.filters[path.rsplit(".", 1)[1]] = get_attr(path)
+    return jenv
+
+
+def get_attr(path):
+    module, attr = path.rsplit(".", 1)
+    return getattr(importlib.import_module(module), attr)
+
+
+def get_print(doctype=None, name=None, print_format=None, letterhead=None, **kwargs):
+    from custom_invoice import print_template
+    return print_template.render_print_format(doctype, name, print_format or print_template.PRINT_FORMAT)
+
+
+def cint(value, default=0):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def flt(value, precision=None):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return round(value, precision) if precision is not None else value
+
+
+def escape_html(text):
+    return html.escape(text or "", quote=True) if isinstance(text, str) else text
+
+
+def money_in_words(number, main_currency=None):
+    # The real function spells the amount out with num2words; a fixed string keeps
+    # the template output realistic in length without that dependency
+    return f"{main_currency or 'INR'} {flt(number):.2f} only."
+
+
+def getdate(value=None):
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10]) if value else datetime.date.today()
@@ -0,0 +1,227 @@
+"""
+Time the HSN-wise Sales Summary report against a Python row loop on a seeded site
+
+Unlike run.py this needs a real site, since what is measured is the database.
+It inserts submitted Sales Invoices named HSNBENCH-* (with items and GST rows)
+into one month, times both ways of summarising them, checks they agree and
+deletes the seeded rows again unless --keep is given. Run it with the bench's
+Python from the sites folder:
+
+    ../env/bin/python ../apps/custom_invoice/benchmarks/hsn_summary.py --site mysite --invoices 20000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import frappe  # noqa: E402
+from frappe.utils import flt  # noqa: E402
+
+PREFIX = "HSNBENCH-"
+MONTH_START = "2000-01-01"
+MONTH_END = "2000-01-31"
+
+
+def seed(company, invoices, items_per_invoice, hsn_codes, seed=0):
+    """Insert the benchmark invoices with bulk inserts and return the number of item rows"""
+    rng = random.Random(seed)
+    codes = [f"3926{index:04d}" for index in range(hsn_codes)]
+
+    invoice_rows, item_rows, tax_rows = [], [], []
+    for number in range(invoices):
+        name = f"{PREFIX}{number:07d}"
+        total = 0
+        for idx in range(1, items_per_invoice + 1):
+            qty = rng.randint(1, 5000)
+            rate = round(rng.uniform(0.5, 500), 2)
+            amount = round(qty * rate, 2)
+            total += amount
+            item_rows.append((
+                f"{name}-{idx}", name, "Sales Invoice", "items", idx,
+                f"{PREFIX}ITEM", rng.choice(codes), "Nos", qty, rate, amount
+            ))
+
+        freight, misc = rng.choice((0, 150, 500)), rng.choice((0, 25.5))
+        tax = round((total + freight + misc) * 0.09, 2)
+        tax_rows.append((f"{name}-CGST", name, "Sales Invoice", "taxes", 1, "CGST @ 9.0", "Output Tax CGST", 9, tax))
+        tax_rows.append((f"{name}-SGST", name, "Sales Invoice", "taxes", 2, "SGST @ 9.0", "Output Tax SGST", 9, tax))
+        invoice_rows.append((
+            name, company, MONTH_START, 1, 0, f"{PREFIX}CUSTOMER", "33AAAAA0000A1Z5",
+            round(total, 2), round(total + freight + misc + 2 * tax, 2), freight, misc
+        ))
+
+    frappe.db.bulk_insert(
+        "Sales Invoice",
+        ["name", "company", "posting_date", "docstatus", "is_return", "customer", "tax_id",
+            "total", "grand_total", "freight_charges", "misc_charges"],
+        invoice_rows,
+    )
+    frappe.db.bulk_insert(
+        "Sales Invoice Item",
+        ["name", "parent", "parenttype", "parentfield", "idx", "item_code", "hsn_sac_code", "uom", "qty", "rate", "amount"],
+        item_rows,
+    )
+    frappe.db.bulk_insert(
+        "Sales Taxes and Charges",
+        ["name", "parent", "parenttype", "parentfield", "idx", "description", "account_head", "rate", "tax_amount"],
+        tax_rows,
+    )
+    frappe.db.commit()
+    return len(item_rows)
+
+
+def delete_seeded():
+    for doctype in ("Sales Invoice Item", "Sales Taxes and Charges", "Sales Invoice"):
+        column = "name" if doctype == "Sales Invoice" else "parent"
+        frappe.db.sql(f"delete from `tab{doctype}` where `{column}` like %s", PREFIX + "%")
+    frappe.db.commit()
+
+
+def row_loop_summary(filters):
+    """The summary built the way it was before the report: every row fetched and summed in Python"""
+    names = frappe.get_all(
+        "Sales Invoice",
+        filters={
+            "docstatus": 1,
+            "is_return": 0,
+            "company": filters["company"],
+            "posting_date": ["between", [filters["from_date"], filters["to_date"]]],
+        },
+        fields=["name", "total", "freight_charges", "misc_charges"],
+    )
+    invoices = {row.name: row for row in names}
+
+    taxes = {}
+    for tax in frappe.get_all(
+        "Sales Taxes and Charges",
+        filters={"parenttype": "Sales Invoice", "parent": ["in", list(invoices)]},
+        fields=["parent", "description", "account_head", "tax_amount"],
+    ):
+        amounts = taxes.setdefault(tax.parent, {"cgst_amount": 0.0, "sgst_amount": 0.0, "igst_amount": 0.0})
+        description = f"{tax.description or ''} {tax.account_head or ''}".upper()
+        for tax_type in ("CGST", "SGST", "IGST"):
+            if tax_type in description:
+                amounts[f"{tax_type.lower()}_amount"] += flt(tax.tax_amount)
+                break
+
+    summary = {}
+    item_hsn_codes = {}
+    for item in frappe.get_all(
+        "Sales Invoice Item",
+        filters={"parenttype": "Sales Invoice", "parent": ["in", list(invoices)]},
+        fields=["parent", "item_code", "hsn_sac_code", "qty", "amount"],
+    ):
+        invoice = invoices[item.parent]
+        taxable_value = flt(invoice.total) + flt(invoice.freight_charges) + flt(invoice.misc_charges)
+        share = flt(item.amount) / flt(invoice.total) if flt(invoice.total) else 0
+
+        hsn_sac_code = item.hsn_sac_code
+        if not hsn_sac_code:
+            if item.item_code not in item_hsn_codes:
+                item_hsn_codes[item.item_code] = frappe.db.get_value("Item", item.item_code, "hsn_sac")
+            hsn_sac_code = item_hsn_codes[item.item_code]
+
+        row = summary.setdefault(hsn_sac_code or "", {"qty": 0.0, "taxable_value": 0.0, "cgst_amount": 0.0, "sgst_amount": 0.0})
+        row["qty"] += flt(item.qty)
+        row["taxable_value"] += taxable_value * share
+        for tax_type in ("cgst_amount", "sgst_amount"):
+            row[tax_type] += taxes.get(item.parent, {}).get(tax_type, 0) * share
+
+    return summary
+
+
+def report_summary(filters):
+    from custom_invoice.custom_invoice.report.hsn_wise_sales_summary.hsn_wise_sales_summary import execute
+
+    columns, data = execute(filters)
+    return {row.hsn_sac_code: row for row in data}
+
+
+def measure(fn, filters, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(filters)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return result, {"min_ms": round(min(timings), 2), "median_ms": round(statistics.median(timings), 2)}
+
+
+def get_indexes():
+    """Indexed columns of Sales Invoice Item among the ones the report filters and groups on"""
+    return sorted({
+        row.Column_name
+        for row in frappe.db.sql("show index from `tabSales Invoice Item`", as_dict=True)
+        if row.Column_name in ("hsn_sac_code", "customer_part_no")
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--site", required=True)
+    parser.add_argument("--sites-path", default=".")
+    parser.add_argument("--company", help="defaults to the first company")
+    parser.add_argument("--invoices", type=int, default=20000)
+    parser.add_argument("--items-per-invoice", type=int, default=10)
+    parser.add_argument("--hsn-codes", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--keep", action="store_true", help="leave the seeded invoices in the database")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    frappe.init(site=args.site, sites_path=args.sites_path)
+    frappe.connect()
+    frappe.set_user("Administrator")
+
+    try:
+        company = args.company or frappe.get_all("Company", pluck="name", limit=1)[0]
+        delete_seeded()
+
+        start = time.perf_counter()
+        item_rows = seed(company, args.invoices, args.items_per_invoice, args.hsn_codes)
+        print(f"Seeded {args.invoices} invoices, {item_rows} items in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+
+        filters = {"company": company, "from_date": MONTH_START, "to_date": MONTH_END}
+        hsn_filters = {**filters, "hsn_sac_code": "39260000"}
+
+        loop_result, loop_timing = measure(row_loop_summary, filters, args.repeat)
+        report_result, report_timing = measure(report_summary, filters, args.repeat)
+        _, filtered_timing = measure(report_summary, hsn_filters, args.repeat)
+
+        mismatched = [
+            code for code, row in loop_result.items()
+            if abs(row["taxable_value"] - flt(report_result[code or "Not Set"].taxable_value)) > 0.01
+            or abs(row["cgst_amount"] - flt(report_result[code or "Not Set"].cgst_amount)) > 0.01
+        ]
+
+        results = {
+            "invoices": args.invoices,
+            "items": item_rows,
+            "hsn_codes": args.hsn_codes,
+            "indexed_columns": get_indexes(),
+            "row_loop": loop_timing,
+            "report": report_timing,
+            "report_one_hsn": filtered_timing,
+            "speedup": round(loop_timing["median_ms"] / report_timing["median_ms"], 1),
+            "mismatched_hsn_codes": mismatched,
+        }
+    finally:
+        if not args.keep:
+            delete_seeded()
+        frappe.destroy()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
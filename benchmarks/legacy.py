@@ -0,0 +1,55 @@
+"""
+The print pipeline's original implementations, kept so the current code can be
+compared against them in the same run
+"""
+import re
+
+
+def format_indian_number(number, decimal_places=2):
+    """format_indian_number as it was before it moved to scaled integer digits"""
+    try:
+        number = float(number)
+    except (ValueError, TypeError):
+        number = 0
+
+    number_str = '{:.{decimal}f}'.format(number, decimal=decimal_places)
+
+    parts = number_str.split('.')
+    integer_part = parts[0]
+    decimal_part = parts[1] if len(parts) > 1 else ''
+
+    result = ''
+    if len(integer_part) > 3:
+        result = ',' + integer_part[-3:]
+        integer_part = integer_part[:-3]
+        while len(integer_part) > 0:
+            group = integer_part[-2:] if len(integer_part) >= 2 else integer_part
+            result = ',' + group + result
+            integer_part = integer_part[:-len(group)]
+        result = result[1:]
+    else:
+        result = integer_part
+
+    if decimal_places > 0:
+        return result + '.' + decimal_part
+    return result
+
+
+def substitute_copy_labels(html, copies):
+    """The copy label replacement of the original print_multiple_copies, run once per copy"""
+    copies_html = []
+    for copy_type in copies:
+        pattern = r'(<td[^>]*id="copy-type-label"[^>]*>)([^<]*)(</td>)'
+        replacement = r'\1' + copy_type + r'\3'
+        modified_html = re.sub(pattern, replacement, html)
+
+        if modified_html == html:
+            modified_html = re.sub(pattern, replacement, html)
+
+        if modified_html == html:
+            pattern = r'(<table[^>]*>.*?<tr>.*?<td[^>]*>.*?</td>.*?<td[^>]*>.*?</td>.*?<td[^>]*>)([^<]*)(</td>)'
+            modified_html = re.sub(pattern, replacement, html, flags=re.DOTALL)
+
+        copies_html.append(modified_html)
+
+    return '<div style="page-break-after: always;"></div>'.join(copies_html)
@@ -0,0 +1,129 @@
+"""
+Compare the invoice naming modes of custom_invoice.naming under parallel inserts
+
+Like hsn_summary.py this needs a real site, since what is measured is the lock
+on the tabSeries row. Worker processes each insert bare Sales Invoices named
+PRP-200002-#### and commit every insert, once per naming mode. The script
+reports invoices per second relative to the series mode, checks that no name
+was handed out twice and deletes the invoices again. Run it with the bench's
+Python from the sites folder:
+
+    ../env/bin/python ../apps/custom_invoice/benchmarks/naming.py --site mysite --workers 8
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import frappe  # noqa: E402
+
+from custom_invoice.naming import NAMING_MODES, close_series_connection  # noqa: E402
+from custom_invoice.utils import custom_invoice_naming  # noqa: E402
+
+POSTING_DATE = "2000-02-01"
+PREFIX = "PRP-200002-"
+
+
+def insert_invoices(site, sites_path, mode, block_size, count):
+    """Insert `count` bare Sales Invoices named in `mode` with one commit each, return the names"""
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    try:
+        frappe.local.conf.custom_invoice_naming_mode = mode
+        frappe.local.conf.custom_invoice_naming_block_size = block_size
+
+        names = []
+        for _ in range(count):
+            doc = frappe.new_doc("Sales Invoice")
+            doc.posting_date = POSTING_DATE
+            custom_invoice_naming(doc)
+            doc.db_insert()
+            frappe.db.commit()
+            names.append(doc.name)
+        return names
+    finally:
+        close_series_connection()
+        frappe.destroy()
+
+
+def reset_series():
+    frappe.db.sql("delete from `tabSales Invoice` where name like %s", PREFIX + "%")
+    frappe.db.sql("delete from `tabSeries` where name = %s", PREFIX)
+    # make_autoname creates a missing series row without a lock, which races between workers
+    frappe.db.sql("insert into `tabSeries` (`name`, `current`) values (%s, 0)", PREFIX)
+    frappe.db.commit()
+
+
+def measure(site, sites_path, mode, workers, invoices, block_size):
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    with pool:
+        # Start the workers before timing, spawning imports frappe in each
+        list(pool.map(time.sleep, [0.1] * workers))
+
+        start = time.perf_counter()
+        names = [
+            name
+            for worker_names in pool.map(
+                partial(insert_invoices, site, sites_path, mode, block_size), [invoices] * workers
+            )
+            for name in worker_names
+        ]
+        seconds = time.perf_counter() - start
+
+    return {
+        "seconds": round(seconds, 3),
+        "invoices_per_second": round(len(names) / seconds, 1),
+        "duplicate_names": len(names) - len(set(names)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--site", required=True)
+    parser.add_argument("--sites-path", default=".")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--invoices", type=int, default=100, help="invoices per worker")
+    parser.add_argument("--block-size", type=int, default=20)
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    frappe.init(site=args.site, sites_path=args.sites_path)
+    frappe.connect()
+
+    results = {}
+    try:
+        for mode in NAMING_MODES:
+            reset_series()
+            results[mode] = measure(args.site, args.sites_path, mode, args.workers, args.invoices, args.block_size)
+            results[mode]["speedup"] = round(
+                results[mode]["invoices_per_second"] / results["series"]["invoices_per_second"], 2
+            )
+            print(f"{mode:9} {results[mode]['invoices_per_second']:>8.1f} invoices/s  "
+                f"{results[mode]['speedup']:>5.2f}x series", file=sys.stderr)
+    finally:
+        reset_series()
+        frappe.db.sql("delete from `tabSeries` where name = %s", PREFIX)
+        frappe.db.commit()
+        frappe.destroy()
+
+    output = json.dumps({
+        "workers": args.workers,
+        "invoices_per_worker": args.invoices,
+        "block_size": args.block_size,
+        "results": results,
+    }, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
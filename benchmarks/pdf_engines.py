@@ -0,0 +1,175 @@
+"""
+Compare the PDF engines of custom_invoice.pdf_engine on the PR Plastics Invoice
+
+Renders the same synthetic invoices (three copies each, as printed) through every
+engine that is available on this machine and reports the conversion time, PDF size
+and page count. An engine whose page count differs from wkhtmltopdf's does not
+lay out the A4 invoice the same way; pass --keep to inspect the PDFs.
+
+Each engine also renders once per `custom_invoice_print_asset_mode` given in
+--asset-modes, to compare inlined images with fetching them while converting.
+The url mode serves the app's public folder on a local HTTP server, which is
+what the engine fetches instead of the site. The file mode is skipped for
+wkhtmltopdf, which Frappe runs without local file access.
+
+    python benchmarks/pdf_engines.py --items 1,10,100 --output engines.json
+    python benchmarks/pdf_engines.py --engines chromium --asset-modes data_uri,url,file
+"""
+import argparse
+import functools
+import http.server
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import frappe_stub  # noqa: E402
+
+
+def run_wkhtmltopdf(html, options=None):
+    """Stand-in for frappe.utils.pdf.get_pdf that calls the wkhtmltopdf binary with the same options"""
+    args = ["wkhtmltopdf", "--quiet", "--encoding", "UTF-8"]
+    for key, value in (options or {}).items():
+        args.append(f"--{key}")
+        if value is not True:
+            args.append(str(value))
+
+    return subprocess.run(args + ["-", "-"], input=html.encode(), capture_output=True, check=True).stdout
+
+
+from pypdf import PdfReader  # noqa: E402
+
+# Installs the stub on import, so the PDF renderer is set on that stub
+from benchmarks.run import COPIES, make_invoice  # noqa: E402
+from custom_invoice import pdf_engine  # noqa: E402
+from custom_invoice.api import print_controller  # noqa: E402
+
+frappe = sys.modules["frappe"]
+frappe.utils.pdf.get_pdf = run_wkhtmltopdf
+
+ASSET_MODES = ("data_uri", "url", "file")
+
+
+def serve_assets():
+    """Serve the app's public folder as /assets/custom_invoice on localhost and return the base URL"""
+    root = tempfile.mkdtemp(prefix="custom_invoice_assets_")
+    os.makedirs(os.path.join(root, "assets"))
+    os.symlink(os.path.join(frappe_stub.APP_PATH, "public"), os.path.join(root, "assets", "custom_invoice"))
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=root))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def get_unavailable_reason(engine):
+    if engine == "wkhtmltopdf" and not shutil.which("wkhtmltopdf"):
+        return "wkhtmltopdf is not on PATH"
+    if engine == "weasyprint":
+        try:
+            import weasyprint  # noqa: F401
+        except ImportError:
+            return "weasyprint is not installed"
+        except OSError:
+            # Raised when the package is installed but Pango is missing
+            return "weasyprint cannot load its system libraries"
+    if engine == "chromium" and not pdf_engine.get_chromium_binary():
+        return "no Chromium or Chrome binary found"
+
+
+def get_copies_html(doc, asset_mode="data_uri", engine=None, base_url=None):
+    """The combined HTML print_multiple_copies hands to the PDF engine"""
+    frappe.conf.custom_invoice_print_asset_mode = asset_mode
+    frappe.conf.custom_invoice_pdf_engine = engine
+    html = print_controller.print_assets.inline_assets(
+        print_controller.print_template.render_print_format(doc.doctype, doc.name)
+    )
+    if base_url:
+        # frappe.utils.pdf makes the asset URLs absolute the same way
+        html = html.replace('"/assets/', f'"{base_url}/assets/')
+
+    parts = print_controller.split_at_copy_label(html)
+    return '<div style="page-break-after: always;"></div>'.join(label.join(parts) for label in COPIES)
+
+
+def measure(engine, html, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pdf = pdf_engine.get_pdf(html, print_controller.PDF_OPTIONS, engine=engine)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return pdf, {
+        "min_ms": round(min(timings), 2),
+        "median_ms": round(statistics.median(timings), 2),
+        "pdf_bytes": len(pdf),
+        "pages": len(PdfReader(BytesIO(pdf)).pages),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", default=",".join(pdf_engine.ENGINES), help="comma separated engine names")
+    parser.add_argument("--items", default="1,10,100", help="comma separated item counts")
+    parser.add_argument("--asset-modes", default="data_uri,url", help=f"comma separated, of {', '.join(ASSET_MODES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="conversions per engine and invoice")
+    parser.add_argument("--keep", help="write the generated PDFs to this folder")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    asset_modes = args.asset_modes.split(",")
+    for mode in asset_modes:
+        if mode not in ASSET_MODES:
+            parser.error(f"unknown asset mode {mode}, use one of {', '.join(ASSET_MODES)}")
+    base_url = serve_assets() if "url" in asset_modes else None
+
+    results = {}
+    for engine in args.engines.split(","):
+        reason = get_unavailable_reason(engine)
+        if reason:
+            results[engine] = {"unavailable": reason}
+            print(f"{engine:12} skipped: {reason}", file=sys.stderr)
+            continue
+
+        results[engine] = {}
+        for mode in asset_modes:
+            if mode == "file" and engine not in pdf_engine.LOCAL_FILE_ENGINES:
+                results[engine][mode] = {"unavailable": f"{engine} cannot read local files"}
+                continue
+
+            results[engine][mode] = {}
+            for item_count in map(int, args.items.split(",")):
+                doc = make_invoice(item_count)
+                html = get_copies_html(doc, mode, engine, base_url if mode == "url" else None)
+                pdf, result = measure(engine, html, args.repeat)
+                result["html_bytes"] = len(html.encode())
+                results[engine][mode][str(item_count)] = result
+                print(f"{engine:12} {mode:9} {item_count:>5} items  {result['median_ms']:>10.1f} ms  "
+                    f"{result['pdf_bytes']:>9} bytes  {result['pages']:>3} pages", file=sys.stderr)
+
+                if args.keep:
+                    os.makedirs(args.keep, exist_ok=True)
+                    with open(os.path.join(args.keep, f"{engine}_{mode}_{item_count}.pdf"), "wb") as f:
+                        f.write(pdf)
+
+    output = json.dumps({"copies": COPIES, "pdf_options": print_controller.PDF_OPTIONS, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Offline benchmarks of the print pipeline
+
+Renders synthetic Sales Invoices through the real PR Plastics Invoice template
+and print controller with Frappe stubbed out (see frappe_stub.py). PDF conversion
+is stubbed as well, so the numbers cover our own code only.
+
+    python benchmarks/run.py --output before.json
+    python benchmarks/run.py --items 10,100 --output after.json
+    python benchmarks/compare.py before.json after.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import frappe_stub  # noqa: E402
+
+frappe = frappe_stub.install()
+
+from benchmarks import legacy  # noqa: E402
+from custom_invoice import print_context, print_template, utils  # noqa: E402
+from custom_invoice.api import print_controller  # noqa: E402
+
+COPIES = ["Original", "Duplicate", "Triplicate"]
+DEFAULT_ITEM_COUNTS = (1, 10, 100, 1000)
+
+
+def make_invoice(item_count, seed=0):
+    """Add a submitted Sales Invoice with `item_count` items to the stub's documents and return it"""
+    rng = random.Random(seed + item_count)
+    name = f"PRP-202601-{item_count:04d}"
+
+    items = []
+    for index in range(item_count):
+        qty = rng.randint(1, 5000)
+        rate = round(rng.uniform(0.5, 25000), 2)
+        items.append(frappe._dict({
+            "item_code": f"PRP-ITEM-{index:05d}",
+            "customer_part_no": f"CP-{rng.randint(10000, 99999)}",
+            "description": f"Injection moulded part {index}",
+            "description_of_goods": f"Injection moulded part {index}, natural PP",
+            "hsn_sac_code": "39269099",
+            "qty": qty,
+            "rate": rate,
+            "amount": round(qty * rate, 2),
+        }))
+
+    total = round(sum(item.amount for item in items), 2)
+    taxes = [
+        frappe._dict({"description": "CGST @ 9.0", "account_head": "Output Tax CGST - PRP", "tax_amount": round(total * 0.09, 2)}),
+        frappe._dict({"description": "SGST @ 9.0", "account_head": "Output Tax SGST - PRP", "tax_amount": round(total * 0.09, 2)}),
+    ]
+
+    doc = frappe_stub.Document({
+        "doctype": "Sales Invoice",
+        "name": name,
+        "docstatus": 1,
+        "modified": datetime.datetime(2026, 1, 15, 10, 30),
+        "customer_name": "Example Automotive Components Pvt Ltd",
+        "address_display": "Plot 12, SIPCOT Industrial Park<br>Sriperumbudur, Tamil Nadu 602105",
+        "posting_date": "2026-01-15",
+        "currency": "INR",
+        "items": items,
+        "taxes": taxes,
+        "total": total,
+        "total_qty": sum(item.qty for item in items),
+        "freight_charges": 1500.0,
+        "misc_charges": 0.0,
+    })
+    frappe.documents[("Sales Invoice", name)] = doc
+    return doc
+
+
+def measure(fn, repeat):
+    """Return min/median/mean milliseconds per call of `fn`"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    timings = [t / number * 1000 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "min_ms": round(min(timings), 4),
+        "median_ms": round(statistics.median(timings), 4),
+        "mean_ms": round(statistics.mean(timings), 4),
+        "loops": number,
+    }
+
+
+def get_benchmarks(doc):
+    """Return name -> callable of every benchmark for one invoice"""
+    html = print_template.render_print_format(doc.doctype, doc.name)
+
+    # The original template had no marker comments around the label
+    legacy_html = html.replace("<!--copy-type-label-->", "").replace("<!--/copy-type-label-->", "")
+
+    numbers = [item.rate for item in doc.items] + [item.amount for item in doc.items]
+
+    def substitute_copy_labels():
+        parts = print_controller.split_at_copy_label(html)
+        return '<div style="page-break-after: always;"></div>'.join(label.join(parts) for label in COPIES)
+
+    return {
+        "print_context": lambda: print_context.get_invoice_print_context(doc),
+        "template_render": lambda: print_template.render_print_format(doc.doctype, doc.name),
+        "label_substitution": substitute_copy_labels,
+        "label_substitution_legacy": lambda: legacy.substitute_copy_labels(legacy_html, COPIES),
+        "format_indian_number": lambda: [utils.format_indian_number(number) for number in numbers],
+        "format_indian_numbers": lambda: utils.format_indian_numbers(numbers),
+        "format_indian_number_legacy": lambda: [legacy.format_indian_number(number) for number in numbers],
+        "print_multiple_copies": lambda: print_controller.print_multiple_copies(
+            doc.doctype, doc.name, print_template.PRINT_FORMAT, json.dumps(COPIES)
+        ),
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=frappe_stub.APP_PATH,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(item_counts, repeat=5, only=None):
+    results = {}
+    for item_count in item_counts:
+        doc = make_invoice(item_count)
+        for name, fn in get_benchmarks(doc).items():
+            if only and name not in only:
+                continue
+            results.setdefault(name, {})[str(item_count)] = measure(fn, repeat)
+            print(f"{name:30} {item_count:>5} items  {results[name][str(item_count)]['median_ms']:>10.3f} ms", file=sys.stderr)
+
+    return {
+        "meta": {
+            "commit": get_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "repeat": repeat,
+            "copies": COPIES,
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", default=",".join(map(str, DEFAULT_ITEM_COUNTS)), help="comma separated item counts")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repeats per benchmark")
+    parser.add_argument("--only", help="comma separated benchmark names")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    item_counts = [int(count) for count in args.items.split(",")]
+    only = set(args.only.split(",")) if args.only else None
+    output = json.dumps(run(item_counts, args.repeat, only), indent=2)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,546 +1,120 @@
 import frappe
-import os
+
+from custom_invoice.print_template import PRINT_FORMAT, get_html_hash
+from custom_invoice.setup import values_differ
+
+TEMPLATE_PATH = ("print_format", "pr_plastics_invoice.html")
+
+# Hash of the template file last written to the Print Format, kept in the site's defaults
+SYNCED_HASH_KEY = "custom_invoice_print_format_file_hash"
+
+PRINT_FORMAT_PROPERTIES = {
+    "doc_type": "Sales Invoice",
+    "module": "Accounts",  # Use the actual module name instead of "Custom Invoice"
+    "print_format_type": "Jinja",
+    "standard": "No",
+    "custom_format": 1,
+    # Set consistent small margins; these are Float fields in mm
+    "margin_top": 2.0,
+    "margin_bottom": 2.0,
+    "margin_left": 2.0,
+    "margin_right": 2.0
+}
+
 
 def add_print_format():
     """
-    Create a custom print format for PR Plastics Sales Invoice optimized for A4 paper.
-    This can be called from hooks.py after_install.
+    Create or update the PR Plastics Invoice print format from print_format/pr_plastics_invoice.html.
+    Runs after install and after every migrate; the format is only saved when the
+    template file changed since it was last synced or one of its properties differs.
+    HTML edited in the UI is kept until the template file itself changes.
     """
-    
-    # First check if Print Format already exists
-    if frappe.db.exists("Print Format", "PR Plastics Invoice"):
-        print("Print Format 'PR Plastics Invoice' already exists. Updating it...")
-        pf = frappe.get_doc("Print Format", "PR Plastics Invoice")
+    status = get_print_format_status()
+    if not status["stale"]:
+        if status["edited"]:
+            print(f"Print Format '{PRINT_FORMAT}' was edited in the UI, keeping it (template {status['file_hash'][:10]}).")
+        else:
+            print(f"Print Format '{PRINT_FORMAT}' is up to date ({status['file_hash'][:10]}).")
+        if not status["synced_hash"]:
+            frappe.db.set_global(SYNCED_HASH_KEY, status["file_hash"])
+            frappe.db.commit()
+        return
+
+    file_changed = status["file_hash"] != status["synced_hash"]
+    if status["edited"] and file_changed:
+        message = (
+            f"Print Format '{PRINT_FORMAT}' was edited in the UI; the changed template file "
+            f"{status['file_hash'][:10]} replaces the edited HTML {status['stored_hash'][:10]}"
+        )
+        print(message)
+        frappe.logger().warning(message)
+
+    if status["exists"]:
+        pf = frappe.get_doc("Print Format", PRINT_FORMAT)
     else:
-        print("Creating new Print Format 'PR Plastics Invoice'...")
         pf = frappe.new_doc("Print Format")
-        pf.name = "PR Plastics Invoice"
-        
-    # Set print format properties
-    pf.doc_type = "Sales Invoice"
-    pf.module = "Accounts"  # Use the actual module name instead of "Custom Invoice"
-    pf.print_format_type = "Jinja"
-    pf.standard = "No"
-    pf.custom_format = 1
-    pf.format_data = None
-    
-    # Set consistent small margins (5mm = ~0.2in)
-    pf.margin_top = "2mm"
-    pf.margin_bottom = "2mm"
-    pf.margin_left = "2mm"
-    pf.margin_right = "2mm"
-    
-    # Load HTML from template file if it exists, otherwise use embedded HTML
-    template_path = os.path.join(
-        frappe.get_app_path("custom_invoice"), 
-        "print_format", 
-        "pr_plastics_invoice.html"
-    )
-    
-    print(f"Looking for template at: {template_path}")
-    
-    if os.path.exists(template_path):
-        print(f"Template found! Loading from {template_path}")
-        with open(template_path, 'r') as f:
-            pf.html = f.read()
-            print("Template loaded successfully")
-    else:
-        print(f"Template not found at {template_path}, using embedded HTML")
-        pf.html = get_html_content()
-    
-    # Save the print format
-    if frappe.db.exists("Print Format", "PR Plastics Invoice"):
+        pf.name = PRINT_FORMAT
+
+    pf.update(PRINT_FORMAT_PROPERTIES)
+    if file_changed or not status["exists"]:
+        pf.format_data = None
+        pf.html = get_template_html()
+
+    if status["exists"]:
         pf.save()
     else:
         pf.insert()
-    
-    print("Print Format 'PR Plastics Invoice' saved successfully.")
-    frappe.db.commit()
-
-# Your get_html_content function should be here with your HTML template
-def get_html_content():
-    """Return the HTML content for the print format"""
-    return """
-<!DOCTYPE html>
-<html>
-<head>
-  <meta charset="utf-8">
-  <title>PR Plastics Invoice</title>
-  <style>
-   /* PDF-specific margin control */
-@page {
-  size: A4;
-  margin: 0mm !important; /* Zero margin for PDF */
-}
-
-body, html {
-  margin: 0 !important;
-  padding: 0 !important;
-  width: 100% !important;
-  height: 100% !important;
-}
-
-/* Reset all print-format default margins */
-.print-format {
-  margin: 0 !important;
-  padding: 0 !important;
-  width: 100% !important;
-}
-
-/* Container that expands to fill available space */
-.main-container {
-  border: 1px solid #000;
-  box-sizing: border-box;
-  margin: 0 auto !important;
-  width: 100% !important;
-  max-width: none !important;
-  overflow: hidden;
-  page-break-inside: avoid;
-  page-break-after: avoid;
-}
-
-/* Override any ERPNext-specific PDF settings */
-.print-format-gutter {
-  padding: 0 !important;
-  margin: 0 !important;
-}
 
-/* Additional PDF print controls */
-@media print {
-  body {
-    zoom: 92%; /* More aggressive zoom out to ensure fit */
-    -webkit-print-color-adjust: exact;
-    print-color-adjust: exact;
-  }
-  
-  /* Target ERPNext PDF wrapper if it exists */
-  #body_div, .page-break {
-    margin: 0 !important;
-    padding: 0 !important;
-  }
-  
-  .main-container {
-    margin: 0 !important;
-    max-height: 295mm; /* Optimized for A4 with small margins */
-  }
-}
-
-/* Table styles */
-table {
-  border-collapse: collapse;
-  width: 100%;
-}
-
-/* Common cell styles */
-td, th {
-  padding: 1px 1px;
-  vertical-align: top;
-  font-size: 7.5pt;
-}
-
-/* Fix for items table */
-.items-table {
-  width: 100%;
-  table-layout: fixed;
-  padding: 1px;
-}
+    frappe.db.set_global(SYNCED_HASH_KEY, status["file_hash"])
+    print(f"Print Format '{PRINT_FORMAT}' saved ({status['stored_hash'] and status['stored_hash'][:10]} -> {get_html_hash(pf.html)[:10]}).")
+    frappe.db.commit()
 
-/* Column width fixes */
-.col-sno { width: 2.5%; }
-.col-partno { width: 13%; }
-.col-consumer { width: 15%; }
-.col-desc { width: 28%; }
-.col-hsn { width: 9.5%; }
-.col-qty { width: 13%; }
-.col-rate { width: 7%; }
-.col-total { width: 12%; }
 
-/* Ensure signatory stays on first page */
-.signatory-row {
-  page-break-inside: avoid;
-  page-break-after: avoid;
-}
+def get_print_format_status():
+    """
+    Compare the site's print format with the template file
 
-/* Make the bottom tables more compact */
-.compact-bottom td {
-  padding: 0px;
-  line-height: 1;
-}
+    The format is stale when the template file changed since it was last synced
+    or a property differs. Its HTML counts as `edited` when it is not the last
+    synced file, i.e. it was changed in the UI.
 
-/* Control item row height */
-tr.item-row {
-  height: 16px; /* Optimized height */
-}
+    Returns:
+        dict: `exists`, `stale`, `edited`, and the SHA-1 of the template file
+        (`file_hash`), of the stored HTML (`stored_hash`, None when the format is
+        missing) and of the file last synced (`synced_hash`, None before the first sync)
+    """
+    file_hash = get_html_hash(get_template_html())
+    synced_hash = frappe.db.get_global(SYNCED_HASH_KEY)
+    stored = frappe.db.get_value(
+        "Print Format", PRINT_FORMAT, ["html", *PRINT_FORMAT_PROPERTIES], as_dict=True
+    )
 
-/* Empty row height control */
-tr.empty-row {
-  height: 10px; /* Reduced from original */
-}
+    if not stored:
+        return {
+            "exists": False, "stale": True, "edited": False,
+            "file_hash": file_hash, "stored_hash": None, "synced_hash": synced_hash
+        }
 
-/* Add right border fix */
-.border-right {
-  border-right: 1px solid #000 !important;
-}
+    stored_hash = get_html_hash(stored.html)
+    properties_changed = any(
+        values_differ(stored.get(key), value) for key, value in PRINT_FORMAT_PROPERTIES.items()
+    )
 
-/* Dynamic height classes based on number of items */
-.sign-space-1, .sign-space-2 { height: 80px; }
-.sign-space-3 { height: 60px; }
-.sign-space-4 { height: 40px; }
-.sign-space-5 { height: 25px; }
-.sign-space-more { height: 15px; }
+    # Sites synced before the hash was kept had the file written on every
+    # migrate, so their stored HTML is the last synced file
+    last_synced = synced_hash or stored_hash
 
-.terms-space-1, .terms-space-2, .terms-space-3 { height: 30px; }
-.terms-space-4 { height: 20px; }
-.terms-space-more { height: 10px; }
+    return {
+        "exists": True,
+        "stale": file_hash != last_synced or properties_changed,
+        "edited": stored_hash != last_synced,
+        "file_hash": file_hash,
+        "stored_hash": stored_hash,
+        "synced_hash": synced_hash
+    }
 
-.bank-space-1, .bank-space-2, .bank-space-3 { height: 45px; }
-.bank-space-more { height: 35px; }
-  </style>
-</head>
-<body>
-  <div class="main-container">
-    <!-- Header Image -->
-    <div style="text-align: center; border-bottom: 1px solid #000;">
-      <img src="/assets/custom_invoice/images/pr_plastics_header.png" alt="PR Plastics Header" style="width: 100%; max-width: 800px; height: auto; max-height: 30mm; display: block; margin: 0 auto;">
-    </div>
-    
-<!-- GSTIN and Invoice Title Row -->
-<table style="margin: 0; border-bottom: 1px solid #000;">
-  <tr>
-    <td style="width: 33%; border-right: 1px solid #000; font-size: 8pt;">
-      GSTIN: 33ATNPR3816R1ZW
-    <td style="width: 33%; border-right: 1px solid #000; text-align: center;">
-      <strong style="font-size: 8pt;">INVOICE</strong>
-    </td>
-    <td style="width: 33%; text-align: right; font-size: 8pt;" id="copy-type-label">
-      Original
-    </td>
-  </tr>
-</table>
-    
-    <!-- Customer and Invoice Details Section -->
-    <table style="margin: 0; border-bottom: 1px solid #000;">
-      <tr>
-        <td style="width: 50%; border-right: 1px solid #000;">
-          <div style="margin: 0 0 1px 0; font-weight: bold; font-size: 8pt;">Customer Details</div>
-          <div style="font-size: 7.5pt; margin: 0; line-height: 1;">{{ doc.customer_name }}</div>
-          <div style="font-size: 7.5pt; margin: 0; line-height: 1;">{{ doc.address_display or '' }}</div>
-        </td>
-        <td style="width: 50%;" >
-          <table style="width: 100%; font-size: 9pt; border-spacing: 0; line-height: 0.1;">
-            <tr>
-              <td style="padding: 0 1px 0 0; white-space: nowrap;"><strong>Invoice No</strong>:</td>
-              <td style="padding: 0;">{{ doc.name }}</td>
-            </tr>
-            <tr>
-              <td style="padding: 0 1px 0 0; white-space: nowrap;"><strong>Invoice Date</strong>:</td>
-              <td style="padding: 0;">{{ doc.posting_date }}</td>
-            </tr>
-            <tr>
-              <td style="padding: 0 1px 0 0; white-space: nowrap;"><strong>Dispatched Through</strong>:</td>
-              <td style="padding: 0;">{{ doc.dispatched_through or '' }}</td>
-            </tr>
-            <tr>
-              <td style="padding: 0 1px 0 0; white-space: nowrap;"><strong>Payment Method</strong>:</td>
-              <td style="padding: 0;">{{ doc.payment_terms_template or '' }}</td>
-            </tr>
-            <tr>
-              <td style="padding: 0 1px 0 0; white-space: nowrap;"><strong>E.Way Bill No</strong>:</td>
-              <td style="padding: 0;">{{ doc.eway_bill_no or '' }}</td>
-            </tr>
-          </table>
-        </td>
-      </tr>
-    </table>
-    
-<!-- Order Details, Control No, Packing Details Section with Reduced Height -->
-<table style="margin: 0; font-size: 7.5pt; table-layout: fixed;">
-  <tr>
-    <th style="border: 1px solid #000; border-left: none; border-top: none; border-bottom: 1px solid #000; text-align: center; width: 33.33%; font-weight: bold; padding: 1px;">
-      <strong>Order Details</strong>
-    </th>
-    <th style="border: 1px solid #000; border-left: none; border-top: none; border-bottom: 1px solid #000; text-align: center; width: 33.33%; font-weight: bold; padding: 1px;">
-      <strong>Control No</strong>
-    </th>
-    <th style="border: 1px solid #000; border-left: none; border-right: none; border-top: none; border-bottom: 1px solid #000; text-align: center; width: 33.33%; font-weight: bold; padding: 1px;" >
-      <strong>Packing Details</strong>
-    </th>
-  </tr>
-  <tr>
-    <td style="border: 1px solid #000; border-left: none; border-top: none; border-bottom: none; width: 33.33%; vertical-align: top; padding: 1px; height: 25px;">
-      <div style="font-size: 9pt; margin: 0; line-height: 0.5;">{{ doc.order_details or '' }}</div>
-    </td>
-    <td style="border: 1px solid #000; border-left: none; border-top: none; border-bottom: none; width: 33.33%; vertical-align: top; padding: 1px; height: 25px;">
-      <div style="font-size: 9pt; margin: 0; line-height: 0.5;">{{ doc.control_no_new or '' }}</div>
-    </td>
-    <td style="border: 1px solid #000; border-left: none; border-right: none; border-top: none; border-bottom: none; width: 33.33%; vertical-align: top; padding: 1px; height: 25px;" >
-      <div style="font-size: 9pt; margin: 0; line-height: 0.5;">{{ doc.packing_details_new or '' }}</div>
-    </td>
-  </tr>
-</table>
-    
-<!-- Items Table with dynamic empty rows -->
-<table class="items-table" style="margin: 0; font-size: 7pt;">
-  <thead>
-    <tr>
-      <th class="col-sno" style="border: 1px solid #000; border-left: none; text-align: left; font-size: 5pt;"></th>
-      <th class="col-partno" style="border: 1px solid #000; border-left: none; text-align: center;"><strong>Part No.</strong></th>
-      <th class="col-consumer" style="border: 1px solid #000; border-left: none; text-align: center;"><strong>Consumer Part No.</strong></th>
-      <th class="col-desc" style="border: 1px solid #000; border-left: none; text-align: center;"><strong>Description Of Goods</strong></th>
-      <th class="col-hsn" style="border: 1px solid #000; border-left: none; text-align: center;"><strong>HSN/SAC</strong></th>
-      <th class="col-qty" style="border: 1px solid #000; border-left: none; text-align: center;"><strong>Quantity</strong></th>
-      <th class="col-rate" style="border: 1px solid #000; border-left: none; text-align: center;"><strong>Rate</strong></th>
-      <th class="col-total" style="border: 1px solid #000; border-left: none; border-right: none; text-align: center;"><strong>Total</strong></th>
-    </tr>
-  </thead>
-  <tbody>
-    <!-- For each item in the items table -->
-    {% for item in doc.items %}
-    <tr class="item-row">
-      <td class="col-sno" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000; text-align: center; padding-right: 2px;">
-        <div style="font-size: 7pt; margin: 0; line-height: 0.9; text-align: left; padding-right: 1px;">{{ loop.index }}</div>
-      </td>
-      <td class="col-partno" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000; text-align: center;">
-        <div style="font-size: 9pt; margin: 0; line-height: 0.9;">{{ item.item_code }}</div>
-      </td>
-      <td class="col-consumer" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000; text-align: center; ">
-        <div style="font-size: 9pt; margin: 0; line-height: 0.9;">{{ item.customer_part_no or '' }}</div>
-      </td>
-      <td class="col-desc" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">
-        <div style="font-size: 7.5pt; margin: 0; line-height: 1.1;">{{ item.description_of_goods or item.description or '' }}</div>
-      </td>
-      <td class="col-hsn" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000; text-align: center;">
-        <div style="font-size: 9pt; margin: 0; line-height: 0.9;">{{ item.hsn_sac_code or '' }}</div>
-      </td>
-      <td class="col-qty" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000; text-align: center;">
-        <div style="font-size: 9pt; margin: 0; line-height: 0.9;">{{ format_indian_integer(item.qty|int) }} Nos.</div>
-      </td>
-      <td class="col-rate" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000; text-align: center;">
-        <div style="font-size: 9pt; margin: 0; line-height: 0.9;">{{ format_indian_number(item.rate) }}</div>
-      </td>
-      <td class="col-total" style="border-left: none; border-top: none; border-bottom: none; border-right: none; padding: 1px; text-align: center;">
-        <div style="font-size: 9pt; margin: 0; line-height: 0.9;">{{ format_indian_number(item.amount) }}</div>
-      </td>
-    </tr>
-    {% endfor %}
-      
-    <!-- Dynamic empty rows based on item count -->
-    {% if doc.items|length < 4 %}
-      {% for i in range(4 - doc.items|length) %}
-      <tr class="empty-row">
-        <td class="col-sno" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-partno" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-consumer" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-desc" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-hsn" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-qty" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-rate" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-total" style="border-left: none; border-top: none; border-bottom: none; border-right: none;">&nbsp;</td>
-      </tr>
-      {% endfor %}
-    {% elif doc.items|length < 6 %}
-      <!-- Add just one empty row for 4-5 items -->
-      <tr class="empty-row">
-        <td class="col-sno" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-partno" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-consumer" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-desc" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-hsn" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-qty" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-rate" style="border-left: none; border-top: none; border-bottom: none; border-right: 1px solid #000;">&nbsp;</td>
-        <td class="col-total" style="border-left: none; border-top: none; border-bottom: none; border-right: none;">&nbsp;</td>
-      </tr>
-    {% endif %}
-  </tbody>
-  <tfoot>
-    <!-- Total row with fixed column classes -->
-    <tr>
-      <td colspan="5" style="border-left: none; border-right: 1px solid #000; border-top: 1px solid #000; border-bottom: 1px solid #000; text-align: right; font-weight: bold;">Total</td>
-      <td class="col-qty" style="border-left: none; border-right: 1px solid #000; border-top: 1px solid #000; border-bottom: 1px solid #000; text-align: center; font-size: 9pt;">{{ format_indian_integer(doc.total_qty) }} Nos.</td>
-      <td class="col-rate" style="border-left: none; border-right: 1px solid #000; border-top: 1px solid #000; border-bottom: 1px solid #000;">&nbsp;</td>
-      <td class="col-total" style="border-left: none; border-right: none; border-top: 1px solid #000; border-bottom: 1px solid #000; text-align: right; font-weight: bold; font-size: 9pt;">{{ format_indian_number(doc.total) }}</td>
-    </tr>
-  </tfoot>
-</table>
-  
-<div class="signatory-row compact-bottom">
-  <!-- Bottom Sections With Fixed Table Rows -->
-  <div style="display: table; width: 100%; border-collapse: collapse; font-size: 9pt; margin-top: 1px;">
-    <div style="display: table-row;">
-      <!-- Left Side: Total in words, Bank Details, Terms with proportional spacing -->
-      <div style="display: table-cell; width: 68%; vertical-align: top; border-right: 1px solid #000;">
-        <!-- For Total in Words - Using Total Invoice Value directly -->
-        <table style="width: 100%; border-collapse: collapse;">
-          <tr>
-            <td style="text-align: center; font-weight: bold; border-bottom: 1px solid #000; padding: 0px;">
-              <div style="font-size: 9pt;">Total in words</div>
-            </td>
-          </tr>
-          <tr>
-            <td style="border-bottom: 1px solid #000; padding: 1px; height: 15px; vertical-align: top; line-height: 1;">
-              <div style="font-size: 9pt; margin: 0;">
-                {% set taxable_value = doc.total + (doc.freight_charges or 0) + (doc.misc_charges or 0) %}
-                {% set in_words = frappe.utils.money_in_words(taxable_value) %}
-                {% if in_words.startswith('INR ') %}
-                  {{ in_words[4:] }}
-                {% else %}
-                  {{ in_words }}
-                {% endif %}
-              </div>
-            </td>
-          </tr>
-        </table>
-          
-        <!-- Bank Details - with dynamic height -->
-        <table style="width: 100%; border-collapse: collapse;">
-          <tr>
-            <td style="text-align: center; font-weight: bold; border-bottom: 1px solid #000; padding: 0px;">
-              <div style="font-size: 8pt;">Bank Details</div>
-            </td>
-          </tr>
-          <tr>
-            <td style="border-bottom: 1px solid #000; padding: 1px; vertical-align: top; line-height: 1;" class="{% if doc.items|length <= 1 %}bank-space-1{% elif doc.items|length == 2 %}bank-space-2{% elif doc.items|length == 3 %}bank-space-3{% else %}bank-space-more{% endif %}">
-              <div style="font-size: 9pt; margin: 0;">
-                <strong>Bank Name:</strong> HDFC Bank<br>
-                <strong>Account No:</strong> 50200012345678<br>
-                <strong>IFSC Code:</strong> HDFC0001234<br>
-                <strong>Account Name:</strong> PR PLASTICS
-              </div>
-            </td>
-          </tr>
-        </table>
-          
-        <!-- Terms and Conditions - with dynamic height -->
-        <table style="width: 100%; border-collapse: collapse;">
-          <tr>
-            <td style="text-align: center; font-weight: bold; border-bottom: 1px solid #000; padding: 0px;">
-              <div style="font-size: 8pt;">Terms and Conditions</div>
-            </td>
-          </tr>
-          <tr>
-            <td style="padding: 1px; vertical-align: top; line-height: 1.1;" class="{% if doc.items|length <= 1 %}terms-space-1{% elif doc.items|length == 2 %}terms-space-2{% elif doc.items|length == 3 %}terms-space-3{% elif doc.items|length == 4 %}terms-space-4{% else %}terms-space-more{% endif %}">
-              <div style="font-size: 8pt; margin: 0; font-family: Arial, sans-serif; color: #333232;">
-                {% if doc.terms %}
-                  {{ doc.terms }}
-                {% else %}
-                  1. Payment is due within 30 days from the invoice date.<br>
-                  2. Overdue payments may be subject to a late payment fee of 1.5%.<br>
-                  3. All transactions are governed by the laws of India.<br>
-                  4. Subject to Coimbatore jurisdiction.
-                {% endif %}
-              </div>
-            </td>
-          </tr>
-        </table>
-      </div>
-        
-      <!-- Right Side: Charges and Signature -->
-      <div style="display: table-cell; width: 32%; vertical-align: top;">
-        <!-- For Charges Section with Updated Calculations -->
-        <table style="width: 100%; border-collapse: collapse;">
-          <tr>
-            <td colspan="2" style="border-bottom: 1px solid #000; font-weight: bold; padding: 1px;">
-              <div style="font-size: 9pt;">Add:</div>
-            </td>
-          </tr>
-          <tr>
-            <td style="width: 60%; border-right: 1px solid #000; border-bottom: 1px solid #000; padding: 1px;">
-              <div style="font-size: 9pt; margin: 0;">Freight Charges</div>
-            </td>
-            <td style="width: 40%; text-align: right; border-bottom: 1px solid #000; padding: 1px;" >
-              <div style="font-size: 9pt; margin: 0;">{{ format_indian_number(doc.freight_charges or 0) }}</div>
-            </td>
-          </tr>
-          <tr>
-            <td style="border-right: 1px solid #000; border-bottom: 1px solid #000; padding: 1px;">
-              <div style="font-size: 9pt; margin: 0;">Misc Charges</div>
-            </td>
-            <td style="text-align: right; border-bottom: 1px solid #000; padding: 1px;" >
-              <div style="font-size: 9pt; margin: 0;">{{ format_indian_number(doc.misc_charges or 0) }}</div>
-            </td>
-          </tr>
-          <tr>
-            <td style="border-right: 1px solid #000; border-bottom: 1px solid #000; padding: 1px;">
-              <div style="font-size: 9pt; margin: 0;">Taxable Value</div>
-            </td>
-            <td style="text-align: right; border-bottom: 1px solid #000; padding: 1px;" >
-              <div style="font-size: 9pt; margin: 0;">
-                {% set taxable_value = doc.total + (doc.freight_charges or 0) + (doc.misc_charges or 0) %}
-                {{ format_indian_number(taxable_value) }}
-              </div>
-            </td>
-          </tr>
-          <tr>
-            <td style="border-right: 1px solid #000; border-bottom: 1px solid #000; padding: 1px;">
-              <div style="font-size: 9pt; margin: 0;">CGST</div>
-            </td>
-            <td style="text-align: right; border-bottom: 1px solid #000; padding: 1px;" >
-              <div style="font-size: 9pt; margin: 0;">
-                {% set cgst_amount = 0 %}
-                {% for tax in doc.taxes %}
-                  {% if tax.description and 'CGST' in tax.description %}
-                    {% set cgst_amount = tax.tax_amount %}
-                  {% endif %}
-                {% endfor %}
-                {{ format_indian_number(cgst_amount) }}
-              </div>
-            </td>
-          </tr>
-          <tr>
-            <td style="border-right: 1px solid #000; border-bottom: 1px solid #000; padding: 1px;">
-              <div style="font-size: 9pt; margin: 0;">SGST</div>
-            </td>
-            <td style="text-align: right; border-bottom: 1px solid #000; padding: 1px;" >
-              <div style="font-size: 9pt; margin: 0;">
-                {% set sgst_amount = 0 %}
-                {% for tax in doc.taxes %}
-                  {% if tax.description and 'SGST' in tax.description %}
-                    {% set sgst_amount = tax.tax_amount %}
-                  {% endif %}
-                {% endfor %}
-                {{ format_indian_number(sgst_amount) }}
-              </div>
-            </td>
-          </tr>
-          <tr>
-            <td style="border-right: 1px solid #000; border-bottom: 1px solid #000; font-weight: bold; padding: 1px;">
-              <div style="font-size: 9pt; margin: 0;">Total Invoice Value</div>
-            </td>
-            <td style="text-align: right; border-bottom: 1px solid #000; font-weight: bold; padding: 1px;" >
-              <div style="font-size: 9pt; margin: 0;">
-                {% set taxable_value = doc.total + (doc.freight_charges or 0) + (doc.misc_charges or 0) %}
-                {% set total_invoice_value = taxable_value + cgst_amount + sgst_amount %}
-                {{ format_indian_number(total_invoice_value) }}
-              </div>
-            </td>
-          </tr>
-        </table>
-        
-        <!-- Certification with dynamic height -->
-        <table style="width: 100%; border-collapse: collapse; margin-top: 0px;">
-          <tr>
-            <td style="border-bottom: 1px solid #000; text-align: center; padding: 0px;" >
-              <div style="font-size: 8pt; margin: 0; font-weight: bold;">For PR Plastics</div>
-            </td>
-          </tr>
-          <tr>
-            <td style="border-bottom: 1px solid #000;" class="{% if doc.items|length <= 1 %}sign-space-1{% elif doc.items|length == 2 %}sign-space-2{% elif doc.items|length == 3 %}sign-space-3{% elif doc.items|length == 4 %}sign-space-4{% elif doc.items|length == 5 %}sign-space-5{% else %}sign-space-more{% endif %}">&nbsp;</td>
-          </tr>
-          <tr>
-            <td style="text-align: center; padding: 0px;" >
-              <div style="font-size: 8pt; margin: 0;">Authorised signatory</div>
-            </td>
-          </tr>
-        </table>
-      </div>
-    </div>
-  </div>
-</div>
-  </div>
-</body>
-</html>
-    """
 
-# If you want to run this file directly for testing
-if __name__ == "__main__":
-    add_print_format()
\ No newline at end of file
+def get_template_html():
+    """Return the print format template shipped with the app"""
+    with open(frappe.get_app_path("custom_invoice", *TEMPLATE_PATH)) as f:
+        return f.read()
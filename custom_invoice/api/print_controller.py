@@ -1,91 +1,481 @@
 import frappe
+import io
 import json
+import multiprocessing
+import os
 import re
-from frappe.utils.pdf import get_pdf
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from frappe.utils import cint, escape_html
+from pypdf import PdfWriter
+from custom_invoice import print_assets, print_cache, print_template, print_timing
+from custom_invoice.pdf_engine import get_pdf
+from custom_invoice.pdf_stamp import stamp_copies
+
+# The print format wraps the copy type label in marker comments so it can be
+# swapped with a single linear scan. Formats saved before the markers were
+# added still carry the label in the `copy-type-label` cell.
+COPY_LABEL_PATTERN = re.compile(r'(<!--copy-type-label-->)[^<]*(<!--/copy-type-label-->)')
+LEGACY_COPY_LABEL_PATTERN = re.compile(r'(<td[^>]*id="copy-type-label"[^>]*>)[^<]*(</td>)')
+
+PDF_OPTIONS = {
+    'margin-top': '2mm',
+    'margin-right': '2mm',
+    'margin-bottom': '2mm',
+    'margin-left': '2mm',
+    'page-size': 'A4',
+    'print-media-type': True
+}
+
+PRINT_JOB_PREFIX = "custom_invoice_print::"
 
 @frappe.whitelist()
-def print_multiple_copies(doctype, name, print_format=None, copies=None):
-    """Generate an HTML with multiple copies of the same document with different labels"""
+def print_multiple_copies(doctype, name, print_format=None, copies=None, stamp_labels=None, run_async=0, letterhead=None, download=0, attach=0):
+    """
+    Generate a PDF with multiple copies of the same document with different labels
+
+    With `stamp_labels` (or the `custom_invoice_stamp_copy_labels` site config) the
+    document is converted to PDF only once and the copy labels are written onto the
+    duplicated pages, instead of laying out the same HTML once per copy.
+
+    With `run_async` the PDF is generated in a background job and the job id is
+    returned right away. The file URL is published to the user over realtime as
+    `custom_invoice_print_ready` (or `custom_invoice_print_failed`).
+
+    Submitted documents are immutable, so their PDF is cached and reprinting with
+    the same print format, copies and letterhead returns the existing file.
+
+    With `download` the PDF is sent back as the response itself instead of a file
+    URL, and no File is created unless `attach` is also set. Only a download
+    without `attach` may be a GET request; everything that saves a File or
+    enqueues a job has to be a POST, which is what Frappe checks the CSRF token of.
+
+    Every call writes its stage timings and sizes as one JSON line to the
+    `custom_invoice.print_timing` log, see `custom_invoice.print_timing`.
+    """
     try:
         frappe.logger().info(f"print_multiple_copies called with: doctype={doctype}, name={name}, format={print_format}, copies={copies}")
         
-        # Parse copies parameter
-        if isinstance(copies, str):
-            try:
-                copies = json.loads(copies)
-            except ValueError:
-                copies = copies.split(",")
+        mode = "download" if cint(download) else "enqueue" if cint(run_async) else "file"
+        if mode != "download" or cint(attach):
+            validate_post_request()
         
-        if not copies:
-            copies = ["Original", "Duplicate", "Triplicate"]
-        
-        # Collect HTML for all copies
-        combined_html = ""
-        
-        # Get the standard print and modify it for each copy type
-        for i, copy_type in enumerate(copies):
-            copy_type = copy_type.strip()
-            
-            # Get the HTML for this document
-            html = frappe.get_print(doctype=doctype, name=name, print_format=print_format)
+        with print_timing.track(doctype=doctype, name=name, mode=mode):
+            with print_timing.stage("parse_copies"):
+                copies = parse_copies(copies)
+            print_timing.set_value("copies", len(copies))
             
-            # Find the third TD in the GSTIN row and replace its content 
-            # This targets the cell that contains the copy type label
-            pattern = r'(<td[^>]*id="copy-type-label"[^>]*>)([^<]*)(</td>)'
-            replacement = r'\1' + copy_type + r'\3'
-            modified_html = re.sub(pattern, replacement, html)
-
-            # If no replacement, try ID matching (if you've added the ID)
-            if modified_html == html:
-                pattern = r'(<td[^>]*id="copy-type-label"[^>]*>)([^<]*)(</td>)'
-                replacement = r'\1' + copy_type + r'\3'
-                modified_html = re.sub(pattern, replacement, html)
+            if stamp_labels is None:
+                stamp_labels = frappe.conf.get("custom_invoice_stamp_copy_labels")
             
-            # If no replacement was made, try a more general approach
-            if modified_html == html:
-                # Try to find the third TD in the first table
-                pattern = r'(<table[^>]*>.*?<tr>.*?<td[^>]*>.*?</td>.*?<td[^>]*>.*?</td>.*?<td[^>]*>)([^<]*)(</td>)'
-                replacement = r'\1' + copy_type + r'\3'
-                modified_html = re.sub(pattern, replacement, html, flags=re.DOTALL)
+            if mode == "download":
+                frappe.local.response.filename = get_copies_file_name(doctype, name)
+                frappe.local.response.filecontent = get_copies_content(
+                    doctype, name, print_format, copies, stamp_labels, letterhead, attach=cint(attach)
+                )
+                frappe.local.response.type = "download"
+                frappe.local.response.display_content_as = "inline"
+                return
             
-            # Add page break after each copy except the last one
-            if i < len(copies) - 1:
-                modified_html += '<div style="page-break-after: always;"></div>'
+            if mode == "enqueue":
+                # Fail early instead of inside the job if the user cannot print the document
+                frappe.has_permission(doctype, "print", name, throw=True)
+                
+                job_id = PRINT_JOB_PREFIX + frappe.generate_hash(length=12)
+                frappe.enqueue(
+                    "custom_invoice.api.print_controller.run_print_job",
+                    queue="short",
+                    job_id=job_id,
+                    print_job_id=job_id,
+                    doctype=doctype,
+                    name=name,
+                    print_format=print_format,
+                    copies=copies,
+                    stamp_labels=stamp_labels,
+                    letterhead=letterhead
+                )
+                print_timing.set_value("job_id", job_id)
+                return {"job_id": job_id}
             
-            combined_html += modified_html
-        
-        # Generate PDF from the combined HTML
-        # Generate PDF from the combined HTML with zero margins
-        pdf_data = get_pdf(
-            combined_html,
-            {
-                'margin-top': '2mm',
-                'margin-right': '2mm',
-                'margin-bottom': '2mm',
-                'margin-left': '2mm',
-                'page-size': 'A4',
-                'print-media-type': True
-            }
+            return get_copies_file_url(doctype, name, print_format, copies, stamp_labels, letterhead)
+    
+    except Exception as e:
+        frappe.logger().error(f"Error in print_multiple_copies: {str(e)}", exc_info=True)
+        frappe.log_error(title="Print Multiple Copies Error")
+        raise
+
+
+def run_print_job(print_job_id, doctype, name, print_format=None, copies=None, stamp_labels=None, letterhead=None):
+    """Background job for `print_multiple_copies(run_async=1)`; publishes the result to the user"""
+    try:
+        with print_timing.track(doctype=doctype, name=name, mode="job", job_id=print_job_id, copies=len(copies or [])):
+            file_url = get_copies_file_url(doctype, name, print_format, copies, stamp_labels, letterhead)
+    except Exception as e:
+        frappe.logger().error(f"Error in print job {print_job_id}: {str(e)}", exc_info=True)
+        frappe.log_error(title="Print Multiple Copies Error")
+        frappe.publish_realtime(
+            "custom_invoice_print_failed",
+            {"job_id": print_job_id, "doctype": doctype, "name": name, "error": str(e)},
+            user=frappe.session.user
         )
+        raise
+    
+    frappe.publish_realtime(
+        "custom_invoice_print_ready",
+        {"job_id": print_job_id, "doctype": doctype, "name": name, "file_url": file_url},
+        user=frappe.session.user
+    )
+    return file_url
+
+
+@frappe.whitelist()
+def print_multiple_copies_bulk(doctype="Sales Invoice", names=None, filters=None, print_format=None, copies=None, stamp_labels=None):
+    """
+    Generate one PDF with the copies of many documents, in the given order
+
+    The documents are picked by `names` (a list of document names) or `filters`.
+    Rendering runs in a background job that spreads the documents over a bounded
+    process pool. The merged file URL and the documents that could not be printed
+    are published to the user over realtime as `custom_invoice_print_ready`.
+    """
+    frappe.logger().info(f"print_multiple_copies_bulk called with: doctype={doctype}, names={names}, filters={filters}, format={print_format}, copies={copies}")
+    
+    if isinstance(names, str):
+        names = json.loads(names)
+    
+    if not names and filters:
+        names = frappe.get_list(doctype, filters=filters, pluck="name", order_by="name asc")
+    
+    if not names:
+        frappe.throw(frappe._("Please select the documents to print"))
+    
+    if stamp_labels is None:
+        stamp_labels = frappe.conf.get("custom_invoice_stamp_copy_labels")
+    
+    limit = cint(frappe.conf.get("custom_invoice_bulk_print_limit")) or 500
+    if len(names) > limit:
+        frappe.throw(frappe._("Cannot print more than {0} documents at once").format(limit))
+    
+    job_id = PRINT_JOB_PREFIX + frappe.generate_hash(length=12)
+    frappe.enqueue(
+        "custom_invoice.api.print_controller.run_bulk_print_job",
+        queue="long",
+        job_id=job_id,
+        print_job_id=job_id,
+        doctype=doctype,
+        names=names,
+        print_format=print_format,
+        copies=parse_copies(copies),
+        stamp_labels=stamp_labels
+    )
+    return {"job_id": job_id, "count": len(names)}
+
+
+def run_bulk_print_job(print_job_id, doctype, names, print_format=None, copies=None, stamp_labels=None):
+    """Background job for `print_multiple_copies_bulk`; publishes the merged PDF to the user"""
+    try:
+        writer = PdfWriter()
+        failed = []
+        
+        for name, pdf_data, error in render_in_process_pool(doctype, names, print_format, copies, stamp_labels):
+            if error:
+                failed.append({"name": name, "error": error})
+            else:
+                writer.append(io.BytesIO(pdf_data))
+        
+        if len(failed) == len(names):
+            frappe.throw(frappe._("None of the documents could be printed"))
+        
+        output = io.BytesIO()
+        writer.write(output)
         
-        # Save the combined PDF as a file
-        filename = f"{doctype.replace(' ', '_')}_{name}_copies.pdf"
         file_doc = frappe.get_doc({
             "doctype": "File",
-            "file_name": filename,
+            "file_name": f"{doctype.replace(' ', '_')}_bulk_{frappe.generate_hash(length=8)}_copies.pdf",
             "folder": "Home/Attachments",
-            "is_private": 0,
-            "attached_to_doctype": doctype,
-            "attached_to_name": name
+            "is_private": 1
         })
-        
-        file_doc.content = pdf_data
+        file_doc.content = output.getvalue()
         file_doc.save()
         frappe.db.commit()
-        
-        return file_doc.file_url
-    
     except Exception as e:
-        frappe.logger().error(f"Error in print_multiple_copies: {str(e)}", exc_info=True)
+        frappe.logger().error(f"Error in bulk print job {print_job_id}: {str(e)}", exc_info=True)
         frappe.log_error(title="Print Multiple Copies Error")
-        raise
\ No newline at end of file
+        frappe.publish_realtime(
+            "custom_invoice_print_failed",
+            {"job_id": print_job_id, "doctype": doctype, "error": str(e)},
+            user=frappe.session.user
+        )
+        raise
+    
+    frappe.publish_realtime(
+        "custom_invoice_print_ready",
+        {"job_id": print_job_id, "doctype": doctype, "file_url": file_doc.file_url, "failed": failed},
+        user=frappe.session.user
+    )
+    return file_doc.file_url
+
+
+def render_in_process_pool(doctype, names, print_format, copies, stamp_labels):
+    """
+    Render the copies PDF of each document in a pool of worker processes
+
+    Returns:
+        iterator: (name, pdf_data, error) tuples in the order of `names`
+    """
+    workers = cint(frappe.conf.get("custom_invoice_bulk_print_workers")) or min(os.cpu_count() or 1, 4)
+    workers = max(1, min(workers, len(names)))
+    
+    # Workers are spawned rather than forked so they never share the parent's
+    # database or redis connections
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_print_worker,
+        initargs=(frappe.local.site, frappe.local.sites_path, frappe.session.user)
+    )
+    with pool:
+        yield from pool.map(
+            partial(render_copies_in_worker, doctype, print_format=print_format, copies=copies, stamp_labels=stamp_labels),
+            names
+        )
+
+
+def init_print_worker(site, sites_path, user):
+    """Connect a pool worker process to the site"""
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    frappe.set_user(user)
+
+
+def render_copies_in_worker(doctype, name, print_format=None, copies=None, stamp_labels=None):
+    """Render one document inside a pool worker, returning the error instead of raising it"""
+    try:
+        if frappe.db.get_value(doctype, name, "docstatus") != 1:
+            frappe.throw(frappe._("{0} {1} is not submitted").format(doctype, name))
+        return name, get_copies_pdf(doctype, name, print_format, copies, stamp_labels), None
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.log_error(title="Print Multiple Copies Error", reference_doctype=doctype, reference_name=name)
+        frappe.db.commit()
+        return name, None, str(e) or e.__class__.__name__
+
+
+@frappe.whitelist()
+def get_print_job_status(job_id):
+    """Return the status of a background print job and its file URL once finished"""
+    job = get_print_job(job_id)
+    if not job:
+        return {"job_id": job_id, "status": None}
+    
+    status = job.get_status()
+    return {
+        "job_id": job_id,
+        "status": status,
+        "file_url": job.return_value() if status == "finished" else None
+    }
+
+
+@frappe.whitelist()
+def cancel_print_job(job_id):
+    """Cancel a queued background print job, or stop it if it is already running"""
+    from rq.command import send_stop_job_command
+    
+    job = get_print_job(job_id)
+    if not job:
+        return {"job_id": job_id, "status": None}
+    
+    status = job.get_status()
+    if status == "queued":
+        job.cancel()
+    elif status == "started":
+        send_stop_job_command(job.connection, job.id)
+    
+    return {"job_id": job_id, "status": job.get_status()}
+
+
+def get_print_job(job_id):
+    """Return the RQ job for a print job id, if it belongs to the current user"""
+    from frappe.utils.background_jobs import get_job
+    
+    if not job_id or not job_id.startswith(PRINT_JOB_PREFIX):
+        frappe.throw(frappe._("Invalid print job id"))
+    
+    job = get_job(job_id)
+    if job and job.kwargs.get("user") != frappe.session.user and "System Manager" not in frappe.get_roles():
+        frappe.throw(frappe._("Not permitted to access this print job"), frappe.PermissionError)
+    
+    return job
+
+
+def validate_post_request():
+    """Refuse a GET request for a call that writes, so a link cannot make a logged-in user save files"""
+    request = getattr(frappe.local, "request", None)
+    if request and request.method != "POST":
+        frappe.throw(frappe._("Saving the PDF needs a POST request"), frappe.PermissionError)
+
+
+def parse_copies(copies):
+    """Return the list of copy type labels from the `copies` request parameter"""
+    if isinstance(copies, str):
+        try:
+            copies = json.loads(copies)
+        except ValueError:
+            copies = copies.split(",")
+    
+    if not copies:
+        copies = ["Original", "Duplicate", "Triplicate"]
+    
+    return [copy_type.strip() for copy_type in copies]
+
+
+def get_copies_file_url(doctype, name, print_format, copies, stamp_labels=None, letterhead=None):
+    """Return the URL of the copies PDF, reusing the cached file of a submitted document"""
+    with print_timing.stage("cache_lookup"):
+        cache_key = get_copies_cache_key(doctype, name, print_format, copies, stamp_labels, letterhead)
+        entry = cache_key and print_cache.get_cached_file(cache_key)
+    
+    print_timing.set_value("cache_hit", bool(entry))
+    if entry:
+        return entry["file_url"]
+    
+    pdf_data = get_copies_pdf(doctype, name, print_format, copies, stamp_labels, letterhead)
+    file_doc = save_copies_pdf(doctype, name, pdf_data)
+    
+    if cache_key:
+        print_cache.set_cached_file(cache_key, file_doc, print_format)
+    
+    return file_doc.file_url
+
+
+def get_copies_content(doctype, name, print_format, copies, stamp_labels=None, letterhead=None, attach=False):
+    """Return the copies PDF bytes, saving them as an attachment only when `attach` is set"""
+    with print_timing.stage("cache_lookup"):
+        cache_key = get_copies_cache_key(doctype, name, print_format, copies, stamp_labels, letterhead)
+        entry = cache_key and print_cache.get_cached_file(cache_key)
+    
+    print_timing.set_value("cache_hit", bool(entry))
+    if entry:
+        return frappe.get_doc("File", entry["file"]).get_content()
+    
+    pdf_data = get_copies_pdf(doctype, name, print_format, copies, stamp_labels, letterhead)
+    
+    if attach:
+        file_doc = save_copies_pdf(doctype, name, pdf_data)
+        if cache_key:
+            print_cache.set_cached_file(cache_key, file_doc, print_format)
+    
+    return pdf_data
+
+
+def get_copies_cache_key(doctype, name, print_format, copies, stamp_labels=None, letterhead=None):
+    """Return the PDF cache key of a submitted document, None for documents that can still change"""
+    doc_info = frappe.db.get_value(doctype, name, ["modified", "docstatus"], as_dict=True)
+    if not doc_info or doc_info.docstatus != 1:
+        return None
+    
+    # A cache hit skips frappe.get_print, which is what checks print permission
+    frappe.has_permission(doctype, "print", name, throw=True)
+    
+    return print_cache.get_cache_key(
+        doctype, name, doc_info.modified, print_format, copies, letterhead, stamp_labels
+    )
+
+
+def get_copies_pdf(doctype, name, print_format, copies, stamp_labels=None, letterhead=None):
+    """Render the document once and return a PDF with one labelled copy per entry in `copies`"""
+    # Render the document once; every copy reuses the same HTML and only
+    # the copy type label differs between them
+    with print_timing.stage("render"):
+        if print_format == print_template.PRINT_FORMAT and not letterhead:
+            # Our own format is rendered with the compiled template kept by this worker
+            html = print_template.render_print_format(doctype, name, print_format)
+        else:
+            html = frappe.get_print(doctype=doctype, name=name, print_format=print_format, letterhead=letterhead)
+
+    # Embed the header image so wkhtmltopdf does not fetch it over HTTP
+    with print_timing.stage("inline_assets"):
+        html = print_assets.inline_assets(html)
+    
+    with print_timing.stage("label_substitution"):
+        # Split the HTML around the label once; each copy is then a plain join
+        parts = split_at_copy_label(html)
+    
+    if cint(stamp_labels):
+        pdf_data = get_stamped_pdf(parts, copies)
+        print_timing.set_size("pdf_bytes", pdf_data)
+        return pdf_data
+    
+    with print_timing.stage("label_substitution"):
+        # Collect HTML for all copies
+        copies_html = [escape_html(copy_type).join(parts) for copy_type in copies]
+        
+        # Add page break between copies
+        combined_html = '<div style="page-break-after: always;"></div>'.join(copies_html)
+    
+    print_timing.set_size("html_bytes", combined_html)
+    
+    # Generate PDF from the combined HTML with zero margins
+    with print_timing.stage("get_pdf"):
+        pdf_data = get_pdf(combined_html, PDF_OPTIONS)
+    
+    print_timing.set_size("pdf_bytes", pdf_data)
+    return pdf_data
+
+
+def save_copies_pdf(doctype, name, pdf_data):
+    """Save the generated PDF as a public attachment of the document and return the File"""
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": get_copies_file_name(doctype, name),
+        "folder": "Home/Attachments",
+        "is_private": 0,
+        "attached_to_doctype": doctype,
+        "attached_to_name": name
+    })
+    
+    file_doc.content = pdf_data
+    with print_timing.stage("file_save"):
+        file_doc.save()
+    with print_timing.stage("commit"):
+        frappe.db.commit()
+    
+    return file_doc
+
+
+def get_copies_file_name(doctype, name):
+    return f"{doctype.replace(' ', '_')}_{name}_copies.pdf"
+
+
+def get_stamped_pdf(parts, copies):
+    """Convert the document to PDF once with a blank copy label and stamp each copy label onto its pages"""
+    html = "".join(parts)
+    print_timing.set_size("html_bytes", html)
+    
+    with print_timing.stage("get_pdf"):
+        pdf_data = get_pdf(html, PDF_OPTIONS)
+    
+    # Position of the label cell on the A4 layout, in mm from the top right corner
+    right_mm, top_mm = frappe.conf.get("custom_invoice_copy_label_position") or (4, 31)
+    
+    with print_timing.stage("stamp"):
+        return stamp_copies(pdf_data, copies, right_mm=right_mm, top_mm=top_mm)
+
+
+def split_at_copy_label(html):
+    """
+    Split the rendered print HTML at the copy type label
+
+    Returns:
+        list: HTML fragments; joining them with a label gives the HTML for that copy
+    """
+    matches = list(COPY_LABEL_PATTERN.finditer(html)) or list(LEGACY_COPY_LABEL_PATTERN.finditer(html))
+    
+    parts = []
+    position = 0
+    for match in matches:
+        parts.append(html[position:match.end(1)])
+        position = match.start(2)
+    parts.append(html[position:])
+    
+    return parts
@@ -0,0 +1,116 @@
+import os
+import sys
+
+import click
+from frappe.commands import pass_context
+
+
+@click.command("custom-invoice-pdf-pool")
+@click.option("--engine", help="weasyprint or chromium, defaults to custom_invoice_pdf_engine")
+@click.option("--size", type=int, help="Number of renderer processes, default 2")
+@click.option("--max-jobs", type=int, help="Restart a renderer after this many documents, default 200")
+@click.option("--max-queue", type=int, help="Requests that may wait for a renderer before new ones are refused, default 4 x size")
+@click.option("--socket", "socket_path", help="Unix socket to listen on, defaults to sites/custom_invoice_pdf_pool.sock")
+def start_pdf_pool(engine=None, size=None, max_jobs=None, max_queue=None, socket_path=None):
+    """
+    Run the shared pool of warm PDF renderers used by custom_invoice printing
+
+    Sites use it when `custom_invoice_pdf_pool` is set in their config. Run it
+    next to the workers, e.g. in the Procfile or a supervisor program. Defaults
+    are read from common_site_config.json (`custom_invoice_pdf_pool_size`,
+    `custom_invoice_pdf_pool_max_jobs`, `custom_invoice_pdf_pool_max_queue`).
+    """
+    import frappe
+    from custom_invoice import pdf_engine, pdf_pool
+
+    # Bench runs commands from the sites folder
+    config = frappe._dict(frappe.get_file_json("common_site_config.json") if os.path.exists("common_site_config.json") else {})
+
+    engine = engine or config.custom_invoice_pdf_engine or "chromium"
+    if engine not in pdf_pool.POOLABLE_ENGINES:
+        raise click.UsageError(f"Only {', '.join(pdf_pool.POOLABLE_ENGINES)} can run in the pool, not {engine}")
+
+    settings = {}
+    if engine == "chromium":
+        settings["chromium_path"] = pdf_engine.find_chromium_binary(config.custom_invoice_chromium_path)
+        settings["chromium_args"] = config.custom_invoice_chromium_args or []
+        if not settings["chromium_path"]:
+            raise click.UsageError("No Chromium or Chrome binary found, set custom_invoice_chromium_path")
+
+    pdf_pool.serve(
+        engine,
+        os.path.abspath(socket_path or config.custom_invoice_pdf_pool_socket or pdf_pool.SOCKET_NAME),
+        size=size or config.custom_invoice_pdf_pool_size or 2,
+        max_jobs=max_jobs or config.custom_invoice_pdf_pool_max_jobs or 200,
+        max_queue=max_queue if max_queue is not None else config.custom_invoice_pdf_pool_max_queue,
+        settings=settings,
+    )
+
+
+@click.command("custom-invoice-print-format-status")
+@click.option("--sync", is_flag=True, help="Update stale print formats from the template file")
+@pass_context
+def print_format_status(context, sync=False):
+    """Report whether each site's PR Plastics Invoice print format matches the template file; exits with 1 if any is stale"""
+    import frappe
+    from custom_invoice.add_print_format import add_print_format, get_print_format_status
+
+    stale_sites = []
+    for site in context.sites:
+        frappe.init(site=site)
+        frappe.connect()
+        try:
+            status = get_print_format_status()
+            if not status["stale"]:
+                if status["edited"]:
+                    print(f"{site}: edited in the UI, kept until the template changes (site {status['stored_hash'][:10]}, template {status['file_hash'][:10]})")
+                else:
+                    print(f"{site}: up to date ({status['file_hash'][:10]})")
+                continue
+
+            if not status["exists"]:
+                print(f"{site}: missing (template {status['file_hash'][:10]})")
+            else:
+                edited = ", edited in the UI" if status["edited"] else ""
+                print(f"{site}: stale (site {status['stored_hash'][:10]}{edited}, template {status['file_hash'][:10]})")
+
+            if sync:
+                add_print_format()
+            else:
+                stale_sites.append(site)
+        finally:
+            frappe.destroy()
+
+    if stale_sites:
+        sys.exit(1)
+
+
+@click.command("custom-invoice-gstr1-export")
+@click.argument("month")
+@click.option("--section", type=click.Choice(["b2b", "hsn"]), default="b2b", help="GSTR-1 section, default b2b")
+@click.option("--format", "file_format", type=click.Choice(["json", "csv"]), default="json", help="Output format, default json")
+@click.option("--company", help="Defaults to the site's default company")
+@click.option("--output", type=click.Path(dir_okay=False), help="File to write, defaults to GSTR1_<section>_<month>.<format>")
+@pass_context
+def gstr1_export(context, month, section="b2b", file_format="json", company=None, output=None):
+    """Export the GSTR-1 B2B or HSN summary of MONTH (YYYY-MM) from the submitted Sales Invoices"""
+    import frappe
+    from frappe.exceptions import SiteNotSpecifiedError
+    from custom_invoice.gst import export_gstr1
+
+    if not context.sites:
+        raise SiteNotSpecifiedError
+
+    output = os.path.abspath(output or f"GSTR1_{section}_{month}.{file_format}")
+    frappe.init(site=context.sites[0])
+    frappe.connect()
+    try:
+        with open(output, "w", encoding="utf-8", newline="") as f:
+            count = export_gstr1(f, month, section, file_format, company)
+    finally:
+        frappe.destroy()
+
+    print(f"Wrote {count} {'invoices' if section == 'b2b' else 'HSN codes'} to {output}")
+
+
+commands = [start_pdf_pool, print_format_status, gstr1_export]
@@ -0,0 +1,68 @@
+import frappe
+from frappe import _
+
+from custom_invoice.gst import HSN_CODE, INVOICE_CONDITIONS, ITEM_SHARE, TAXABLE_VALUE, get_invoice_taxes_query
+
+
+def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    return get_columns(), get_data(filters)
+
+
+def get_columns():
+    return [
+        {"fieldname": "hsn_sac_code", "label": _("HSN/SAC"), "fieldtype": "Data", "width": 120},
+        {"fieldname": "invoices", "label": _("Invoices"), "fieldtype": "Int", "width": 90},
+        {"fieldname": "qty", "label": _("Qty"), "fieldtype": "Float", "width": 110},
+        {"fieldname": "taxable_value", "label": _("Taxable Value"), "fieldtype": "Currency", "width": 140},
+        {"fieldname": "cgst_amount", "label": _("CGST"), "fieldtype": "Currency", "width": 120},
+        {"fieldname": "sgst_amount", "label": _("SGST"), "fieldtype": "Currency", "width": 120},
+        {"fieldname": "igst_amount", "label": _("IGST"), "fieldtype": "Currency", "width": 120},
+        {"fieldname": "total_tax", "label": _("Total Tax"), "fieldtype": "Currency", "width": 130},
+    ]
+
+
+def get_data(filters):
+    """
+    Sum the submitted invoice items of the period per HSN/SAC code in one query
+
+    Codes and amounts are those of the GSTR-1 HSN export: an item without a code
+    falls back to its Item's, and carries the share of its invoice's taxable
+    value (freight and miscellaneous charges included) and of the CGST, SGST and
+    IGST that its amount is of the item total.
+    """
+    conditions = ""
+    if filters.customer:
+        conditions += " and si.customer = %(customer)s"
+    if filters.hsn_sac_code:
+        conditions += f" and {HSN_CODE} = %(hsn_sac_code)s"
+
+    share = f"coalesce({ITEM_SHARE}, 0)"
+
+    data = frappe.db.sql(
+        f"""
+        select
+            {HSN_CODE} as hsn_sac_code,
+            count(distinct si.name) as invoices,
+            sum(sii.qty) as qty,
+            sum(({TAXABLE_VALUE}) * {share}) as taxable_value,
+            sum(coalesce(taxes.cgst_amount, 0) * {share}) as cgst_amount,
+            sum(coalesce(taxes.sgst_amount, 0) * {share}) as sgst_amount,
+            sum(coalesce(taxes.igst_amount, 0) * {share}) as igst_amount,
+            sum(coalesce(taxes.cgst_amount + taxes.sgst_amount + taxes.igst_amount, 0) * {share}) as total_tax
+        from `tabSales Invoice Item` sii
+        inner join `tabSales Invoice` si on si.name = sii.parent
+        left join `tabItem` item on item.name = sii.item_code
+        left join ({get_invoice_taxes_query()}) taxes on taxes.parent = si.name
+        where sii.parenttype = 'Sales Invoice' and {INVOICE_CONDITIONS} {conditions}
+        group by {HSN_CODE}
+        order by hsn_sac_code
+        """,
+        filters,
+        as_dict=True,
+    )
+
+    for row in data:
+        row.hsn_sac_code = row.hsn_sac_code or _("Not Set")
+
+    return data
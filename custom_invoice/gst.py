@@ -0,0 +1,325 @@
+import csv
+import json
+import tempfile
+
+import frappe
+from frappe.utils import cstr, flt, get_first_day, get_last_day, getdate
+
+SECTIONS = ("b2b", "hsn")
+FILE_FORMATS = ("json", "csv")
+
+# Unit Quantity Codes of the GST portal for the UOMs used on invoices
+UQC_BY_UOM = {
+    "NOS": "NOS",
+    "UNIT": "UNT",
+    "KG": "KGS",
+    "GRAM": "GMS",
+    "METER": "MTR",
+    "LITRE": "LTR",
+    "SET": "SET",
+    "BOX": "BOX",
+    "PAIR": "PRS",
+}
+DEFAULT_UQC = "OTH"
+
+# Kept on the B2B invoices for the CSV export, not part of the JSON schema
+B2B_EXTRA_KEYS = ("ctin", "receiver_name", "eway_bill_no")
+
+B2B_CSV_HEADER = [
+    "GSTIN/UIN of Recipient", "Receiver Name", "Invoice Number", "Invoice date", "Invoice Value",
+    "Place Of Supply", "Reverse Charge", "Invoice Type", "Rate", "Taxable Value",
+    "Integrated Tax Amount", "Central Tax Amount", "State/UT Tax Amount", "Cess Amount", "E-way Bill No"
+]
+HSN_CSV_HEADER = [
+    "HSN", "Description", "UQC", "Total Quantity", "Total Value", "Taxable Value",
+    "Integrated Tax Amount", "Central Tax Amount", "State/UT Tax Amount", "Cess Amount"
+]
+
+# CGST, SGST and IGST amounts and rates of each invoice, matched on the tax row
+# description or account the same way print_context.get_gst_amounts does
+INVOICE_TAXES_QUERY = """
+    select
+        tax.parent,
+        sum(case when {cgst} then tax.tax_amount else 0 end) as cgst_amount,
+        sum(case when {sgst} then tax.tax_amount else 0 end) as sgst_amount,
+        sum(case when {igst} then tax.tax_amount else 0 end) as igst_amount,
+        sum(case when {cgst} or {sgst} or {igst} then tax.rate else 0 end) as gst_rate
+    from `tabSales Taxes and Charges` tax
+    inner join `tabSales Invoice` si on si.name = tax.parent
+    where tax.parenttype = 'Sales Invoice' and {invoice_conditions}
+    group by tax.parent
+"""
+TAX_TEXT = "upper(concat(coalesce(tax.description, ''), ' ', coalesce(tax.account_head, '')))"
+TAX_CONDITIONS = {
+    "cgst": f"{TAX_TEXT} like '%%CGST%%'",
+    "sgst": f"{TAX_TEXT} not like '%%CGST%%' and {TAX_TEXT} like '%%SGST%%'",
+    "igst": f"{TAX_TEXT} not like '%%CGST%%' and {TAX_TEXT} not like '%%SGST%%' and {TAX_TEXT} like '%%IGST%%'",
+}
+
+# HSN code of an invoice item, falling back to the Item's code when the row has none
+HSN_CODE = "coalesce(nullif(sii.hsn_sac_code, ''), item.hsn_sac, '')"
+
+# Taxable value of an invoice: the items plus freight and miscellaneous charges
+TAXABLE_VALUE = "si.total + coalesce(si.freight_charges, 0) + coalesce(si.misc_charges, 0)"
+
+# Share of an item in its invoice's taxable value and taxes. The charges are
+# spread over the items in proportion to their amount, so the HSN rows of an
+# invoice add up to its B2B taxable value
+ITEM_SHARE = "sii.amount / nullif(si.total, 0)"
+
+INVOICE_CONDITIONS = """
+    si.docstatus = 1 and si.is_return = 0 and si.company = %(company)s
+    and si.posting_date between %(from_date)s and %(to_date)s
+"""
+
+
+def export_gstr1(f, month, section="b2b", file_format="json", company=None):
+    """
+    Write the GSTR-1 B2B or HSN summary section of a month to the text file `f`
+
+    Invoices, items and taxes are read with a server-side cursor and written
+    out row by row (B2B) or summed per HSN code (HSN), so memory does not grow
+    with the number of invoice lines. Submitted invoices of the company that are
+    not returns are included; B2B only has the ones with a customer GSTIN.
+
+    Args:
+        f: text file to write to
+        month: "YYYY-MM"
+        section: "b2b" or "hsn"
+        file_format: "json" (GST offline tool schema) or "csv"
+        company: defaults to the user's default company
+
+    Returns:
+        int: number of invoices (B2B) or HSN codes (HSN) written
+    """
+    if section not in SECTIONS:
+        frappe.throw(f"Unknown GSTR-1 section {section}, use one of {', '.join(SECTIONS)}")
+    if file_format not in FILE_FORMATS:
+        frappe.throw(f"Unknown export format {file_format}, use one of {', '.join(FILE_FORMATS)}")
+
+    filters = get_filters(month, company)
+    header = frappe._dict({
+        "gstin": frappe.db.get_value("Company", filters["company"], "tax_id") or "",
+        "fp": filters["from_date"].strftime("%m%Y"),
+    })
+
+    # Nothing else may query the database until the unbuffered result is read
+    with frappe.db.unbuffered_cursor():
+        if section == "b2b":
+            rows = frappe.db.sql(get_b2b_query(), filters, as_dict=True, as_iterator=True)
+            invoices = (get_b2b_invoice(row) for row in rows)
+            if file_format == "json":
+                return write_b2b_json(f, header, invoices)
+            return write_csv(f, B2B_CSV_HEADER, (get_b2b_csv_row(invoice) for invoice in invoices))
+
+        rows = frappe.db.sql(get_hsn_query(), filters, as_dict=True, as_iterator=True)
+        summary = get_hsn_summary(rows)
+
+    if file_format == "json":
+        return write_hsn_json(f, header, summary)
+    return write_csv(f, HSN_CSV_HEADER, (get_hsn_csv_row(row) for row in summary))
+
+
+@frappe.whitelist()
+def download_gstr1(month, section="b2b", file_format="json", company=None):
+    """
+    Download the GSTR-1 B2B or HSN summary of a month, see `export_gstr1`
+
+    The export is written to a temporary file and streamed from there, so the
+    response is never held in memory either.
+    """
+    from werkzeug.wrappers import Response
+    from werkzeug.wsgi import wrap_file
+
+    frappe.only_for(("Accounts Manager", "System Manager"))
+
+    f = tempfile.TemporaryFile(mode="w+", encoding="utf-8", newline="")
+    try:
+        export_gstr1(f, month, section, file_format, company)
+        f.flush()
+        size = f.buffer.tell()
+        f.seek(0)
+    except Exception:
+        f.close()
+        raise
+
+    response = Response(
+        wrap_file(frappe.local.request.environ, f.buffer),
+        mimetype="application/json" if file_format == "json" else "text/csv",
+        direct_passthrough=True,
+    )
+    response.content_length = size
+    response.headers["Content-Disposition"] = f'attachment; filename="GSTR1_{section}_{month}.{file_format}"'
+    return response
+
+
+def get_filters(month, company=None):
+    try:
+        from_date = get_first_day(getdate(f"{month}-01"))
+    except Exception:
+        frappe.throw(f"Invalid month {month}, use YYYY-MM")
+
+    company = company or frappe.defaults.get_user_default("Company") or frappe.db.get_single_value(
+        "Global Defaults", "default_company"
+    )
+    if not company:
+        frappe.throw("Please set the company to export")
+
+    return {"company": company, "from_date": from_date, "to_date": get_last_day(from_date)}
+
+
+def get_b2b_query():
+    return f"""
+        select
+            si.name, si.posting_date, si.customer_name, si.tax_id, si.grand_total,
+            si.total, si.freight_charges, si.misc_charges, si.eway_bill_no,
+            taxes.cgst_amount, taxes.sgst_amount, taxes.igst_amount, taxes.gst_rate
+        from `tabSales Invoice` si
+        left join ({get_invoice_taxes_query()}) taxes on taxes.parent = si.name
+        where {INVOICE_CONDITIONS} and coalesce(si.tax_id, '') != ''
+        order by si.tax_id, si.posting_date, si.name
+    """
+
+
+def get_hsn_query():
+    return f"""
+        select
+            {HSN_CODE} as hsn_sac_code,
+            sii.uom, sii.qty, sii.amount,
+            coalesce({ITEM_SHARE}, 0) as share,
+            {TAXABLE_VALUE} as invoice_taxable_value,
+            taxes.cgst_amount, taxes.sgst_amount, taxes.igst_amount
+        from `tabSales Invoice Item` sii
+        inner join `tabSales Invoice` si on si.name = sii.parent
+        left join `tabItem` item on item.name = sii.item_code
+        left join ({get_invoice_taxes_query()}) taxes on taxes.parent = si.name
+        where sii.parenttype = 'Sales Invoice' and {INVOICE_CONDITIONS}
+    """
+
+
+def get_invoice_taxes_query():
+    return INVOICE_TAXES_QUERY.format(invoice_conditions=INVOICE_CONDITIONS, **TAX_CONDITIONS)
+
+
+def get_b2b_invoice(row):
+    """Return an invoice in the GSTR-1 B2B `inv` schema, with the B2B_EXTRA_KEYS alongside"""
+    return frappe._dict({
+        "ctin": row.tax_id.strip().upper(),
+        "receiver_name": row.customer_name or "",
+        "eway_bill_no": row.eway_bill_no or "",
+        "inum": row.name,
+        "idt": getdate(row.posting_date).strftime("%d-%m-%Y"),
+        "val": flt(row.grand_total, 2),
+        # Place of supply is the recipient's state, the first two digits of their GSTIN
+        "pos": row.tax_id.strip()[:2],
+        "rchrg": "N",
+        "inv_typ": "R",
+        "itms": [{
+            "num": 1,
+            "itm_det": {
+                "rt": flt(row.gst_rate, 2),
+                "txval": flt(flt(row.total) + flt(row.freight_charges) + flt(row.misc_charges), 2),
+                "iamt": flt(row.igst_amount, 2),
+                "camt": flt(row.cgst_amount, 2),
+                "samt": flt(row.sgst_amount, 2),
+                "csamt": 0,
+            },
+        }],
+    })
+
+
+def get_hsn_summary(rows):
+    """
+    Sum the item rows per HSN code and UQC, returning the rows in the GSTR-1 HSN schema
+
+    Each item carries its `share` (see ITEM_SHARE) of the invoice's taxable
+    value, freight and miscellaneous charges included, and of its taxes.
+    """
+    totals = {}
+    for row in rows:
+        key = (cstr(row.hsn_sac_code).strip(), get_uqc(row.uom))
+        total = totals.get(key)
+        if not total:
+            total = totals[key] = frappe._dict(qty=0.0, txval=0.0, iamt=0.0, camt=0.0, samt=0.0)
+
+        share = flt(row.share)
+        total.qty += flt(row.qty)
+        total.txval += flt(row.invoice_taxable_value) * share
+        total.iamt += flt(row.igst_amount) * share
+        total.camt += flt(row.cgst_amount) * share
+        total.samt += flt(row.sgst_amount) * share
+
+    return [
+        frappe._dict({
+            "num": number,
+            "hsn_sc": hsn_sac_code,
+            "desc": "",
+            "uqc": uqc,
+            "qty": flt(total.qty, 2),
+            "val": flt(total.txval + total.iamt + total.camt + total.samt, 2),
+            "txval": flt(total.txval, 2),
+            "iamt": flt(total.iamt, 2),
+            "camt": flt(total.camt, 2),
+            "samt": flt(total.samt, 2),
+            "csamt": 0,
+        })
+        for number, ((hsn_sac_code, uqc), total) in enumerate(sorted(totals.items()), 1)
+    ]
+
+
+def get_uqc(uom):
+    return UQC_BY_UOM.get(cstr(uom).strip().upper(), DEFAULT_UQC)
+
+
+def write_b2b_json(f, header, invoices):
+    """Write the B2B section, grouping the invoices (sorted by GSTIN) per recipient as they arrive"""
+    f.write(f'{{"gstin": {json.dumps(header.gstin)}, "fp": {json.dumps(header.fp)}, "b2b": [')
+
+    count = 0
+    ctin = None
+    for invoice in invoices:
+        if invoice.ctin != ctin:
+            if ctin is not None:
+                f.write("]}, ")
+            ctin = invoice.ctin
+            f.write(f'{{"ctin": {json.dumps(ctin)}, "inv": [')
+        else:
+            f.write(", ")
+
+        f.write(json.dumps({key: value for key, value in invoice.items() if key not in B2B_EXTRA_KEYS}))
+        count += 1
+
+    if ctin is not None:
+        f.write("]}")
+    f.write("]}\n")
+    return count
+
+
+def write_hsn_json(f, header, summary):
+    json.dump({"gstin": header.gstin, "fp": header.fp, "hsn": {"data": summary}}, f)
+    f.write("\n")
+    return len(summary)
+
+
+def write_csv(f, header, rows):
+    writer = csv.writer(f)
+    writer.writerow(header)
+
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def get_b2b_csv_row(invoice):
+    item = invoice.itms[0]["itm_det"]
+    return [
+        invoice.ctin, invoice.receiver_name, invoice.inum, invoice.idt, invoice.val,
+        invoice.pos, invoice.rchrg, "Regular", item["rt"], item["txval"],
+        item["iamt"], item["camt"], item["samt"], item["csamt"], invoice.eway_bill_no
+    ]
+
+
+def get_hsn_csv_row(row):
+    return [row.hsn_sc, row.desc, row.uqc, row.qty, row.val, row.txval, row.iamt, row.camt, row.samt, row.csamt]
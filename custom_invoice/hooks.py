@@ -12,11 +12,19 @@ after_install = [
     "custom_invoice.add_print_format.add_print_format"
 ]
 
+# Only saves the print format when the template file changed; the part number
+# becomes unique once the duplicates the patch reported are fixed
+after_migrate = [
+    "custom_invoice.add_print_format.add_print_format",
+    "custom_invoice.part_no.ensure_unique_part_no"
+]
+
 doctype_js = {
-    "Sales Invoice": [
-        "public/js/custom_invoice.js",
-        "public/js/invoice_print.js"
-    ]
+    "Sales Invoice": "public/js/invoice_print.js"
+}
+
+doctype_list_js = {
+    "Sales Invoice": "public/js/invoice_print.js"
 }
 
 # Fixtures
@@ -50,6 +58,12 @@ fixtures = [
 # Add methods and filters to jinja environment
 jinja = {
     "methods": [
+        "custom_invoice.utils.format_indian_number",
+        "custom_invoice.utils.format_indian_numbers",
+        "custom_invoice.utils.format_indian_integer",
+        "custom_invoice.print_context.get_invoice_print_context"
+    ],
+    "filters": [
         "custom_invoice.utils.format_indian_number",
         "custom_invoice.utils.format_indian_integer"
     ]
@@ -57,10 +71,42 @@ jinja = {
 
 doc_events = {
     "Sales Invoice": {
-        "autoname": "custom_invoice.utils.custom_invoice_naming"
+        "autoname": "custom_invoice.utils.custom_invoice_naming",
+        "validate": "custom_invoice.utils.set_description_of_goods",
+        "on_submit": "custom_invoice.print_prerender.enqueue_prerender",
+        "on_cancel": "custom_invoice.print_cache.invalidate_document",
+        "after_insert": "custom_invoice.print_cache.invalidate_amended_from"
+    },
+    "Print Format": {
+        "on_update": [
+            "custom_invoice.print_cache.invalidate_print_format",
+            "custom_invoice.print_template.clear_template_cache"
+        ]
+    },
+    "Item": {
+        "on_update": "custom_invoice.part_no.clear_part_no_cache",
+        "after_rename": "custom_invoice.part_no.clear_part_no_cache",
+        "on_trash": "custom_invoice.part_no.clear_part_no_cache"
     }
 }
 
+# Item links also match the start of the customer part number
+standard_queries = {
+    "Item": "custom_invoice.part_no.item_query"
+}
+
+# Prune reprinted copies PDFs, see custom_invoice.tasks.cleanup_copies_files
+scheduler_events = {
+    "daily_long": [
+        "custom_invoice.tasks.cleanup_copies_files"
+    ]
+}
+
+# Compile the print format template as soon as a worker serves a site,
+# when custom_invoice_prewarm_print_template is set in site config
+before_request = ["custom_invoice.print_template.warm_template_cache"]
+before_job = ["custom_invoice.print_template.warm_template_cache"]
+
 # Apps
 # ------------------
 
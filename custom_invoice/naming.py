@@ -0,0 +1,105 @@
+import threading
+
+import frappe
+from frappe.model.naming import make_autoname
+from frappe.utils import cint, getdate, nowdate
+
+SERIES_DIGITS = 4
+
+# Naming modes, selected with the `custom_invoice_naming_mode` site config
+#   series:   make_autoname in the insert transaction, gapless but holds the series row lock until commit
+#   separate: take each number in a short transaction of its own, numbers of rolled back inserts are lost
+#   block:    reserve `custom_invoice_naming_block_size` numbers at once per worker process
+NAMING_MODES = ("series", "separate", "block")
+
+# Per process state: site -> separate database connection, (site, prefix) -> [next, last]
+series_connections = {}
+reserved_blocks = {}
+series_lock = threading.Lock()
+
+
+def get_invoice_name(doc):
+    """Return the next `PRP-YYYYMM-####` name, using the month of the posting date"""
+    prefix = "PRP-{}-".format(getdate(doc.get("posting_date") or nowdate()).strftime("%Y%m"))
+
+    mode = frappe.conf.get("custom_invoice_naming_mode") or "series"
+    if mode not in NAMING_MODES:
+        frappe.throw(f"Invalid custom_invoice_naming_mode {mode}, use one of {', '.join(NAMING_MODES)}")
+
+    # The series table update below is MariaDB syntax
+    if mode == "series" or frappe.conf.db_type == "postgres":
+        return make_autoname(prefix + ".####")
+
+    block_size = 1
+    if mode == "block":
+        block_size = cint(frappe.conf.get("custom_invoice_naming_block_size")) or 20
+
+    return prefix + str(get_next_number(prefix, block_size)).zfill(SERIES_DIGITS)
+
+
+def get_next_number(prefix, block_size=1):
+    """Return the next number of a series, reserving `block_size` numbers when this process has none left"""
+    key = (frappe.local.site, prefix)
+
+    with series_lock:
+        block = reserved_blocks.get(key)
+        if not block or block[0] > block[1]:
+            last = reserve_numbers(prefix, block_size)
+            block = reserved_blocks[key] = [last - block_size + 1, last]
+
+        number = block[0]
+        block[0] += 1
+        return number
+
+
+def reserve_numbers(prefix, count):
+    """
+    Advance a series by `count` in its own committed transaction and return the new current value
+
+    The row lock on tabSeries is only held for this statement instead of the
+    whole invoice insert. LAST_INSERT_ID(expr) returns the updated value to this
+    connection without a second read of the row.
+    """
+    query = """
+        insert into `tabSeries` (`name`, `current`) values (%(prefix)s, last_insert_id(%(count)s))
+        on duplicate key update `current` = last_insert_id(`current` + %(count)s)
+    """
+
+    for attempt in range(2):
+        db = get_series_connection()
+        try:
+            db.sql(query, {"prefix": prefix, "count": count})
+            current = cint(db.sql("select last_insert_id()")[0][0])
+            db.commit()
+            return current
+        except Exception:
+            # The connection may have timed out while idle, retry once on a new one
+            close_series_connection()
+            if attempt:
+                raise
+
+
+def get_series_connection():
+    """Return this process's separate connection used only for series updates"""
+    from frappe.database import get_db
+
+    site = frappe.local.site
+    if site not in series_connections:
+        series_connections[site] = get_db(
+            socket=frappe.conf.db_socket,
+            host=frappe.conf.db_host,
+            port=frappe.conf.db_port,
+            user=frappe.conf.db_user or frappe.conf.db_name,
+            password=frappe.conf.db_password,
+            cur_db_name=frappe.conf.db_name,
+        )
+    return series_connections[site]
+
+
+def close_series_connection():
+    db = series_connections.pop(frappe.local.site, None)
+    if db:
+        try:
+            db.close()
+        except Exception:
+            pass
@@ -0,0 +1,159 @@
+import frappe
+from frappe.desk.reportview import get_filters_cond
+
+PART_NO_CACHE_KEY = "custom_invoice_part_no_map"
+
+
+def get_item_code(part_no):
+    """
+    Return the item code of a customer part number, or None
+
+    Answers come from a Redis hash of part number to item code that is filled
+    on lookup and cleared by `clear_part_no_cache` when Items change.
+    """
+    part_no = (part_no or "").strip()
+    if not part_no:
+        return None
+
+    item_code = frappe.cache().hget(PART_NO_CACHE_KEY, part_no)
+    if item_code is None:
+        item_code = frappe.db.get_value("Item", {"customer_part_no": part_no}, "name")
+        if not item_code:
+            return None
+        frappe.cache().hset(PART_NO_CACHE_KEY, part_no, item_code)
+
+    return item_code
+
+
+@frappe.whitelist()
+def get_item_by_part_no(part_no):
+    """Return the item code of a customer part number, for entering invoice items by part number"""
+    item_code = get_item_code(part_no)
+    if item_code and not frappe.has_permission("Item", "read", item_code):
+        return None
+    return item_code
+
+
+@frappe.whitelist()
+@frappe.validate_and_sanitize_search_inputs
+def item_query(doctype, txt, searchfield, start, page_len, filters, as_dict=False):
+    """
+    Item link search that also matches the start of the customer part number
+
+    An exact part number comes first, then Items whose part number starts with
+    `txt` (a range scan of the unique index), then the usual matches of the
+    ERPNext item query, or of the default search without ERPNext.
+    """
+    start, page_len = int(start), int(page_len)
+    filters = frappe.parse_json(filters) if isinstance(filters, str) else filters
+
+    part_no_matches = []
+    if txt and not start:
+        part_no_matches = get_part_no_matches(txt, filters, page_len)
+
+    other_matches = get_default_matches(doctype, txt, searchfield, start, page_len, filters, as_dict)
+
+    # Skip items already listed through their part number
+    listed = {row["name"] if as_dict else row[0] for row in part_no_matches}
+    other_matches = [row for row in other_matches if (row["name"] if as_dict else row[0]) not in listed]
+
+    if not as_dict:
+        part_no_matches = [(row.name, row.item_name, row.customer_part_no) for row in part_no_matches]
+
+    return (list(part_no_matches) + list(other_matches))[:page_len]
+
+
+def get_part_no_matches(txt, filters, page_len):
+    exact = get_item_code(txt)
+    conditions = get_filters_cond("Item", get_item_filters(filters), [], ignore_permissions=False, with_match_conditions=True)
+
+    matches = frappe.db.sql(
+        f"""
+        select name, item_name, customer_part_no
+        from `tabItem`
+        where customer_part_no like %(prefix)s and disabled = 0 {conditions}
+        order by customer_part_no
+        limit %(page_len)s
+        """,
+        {"prefix": f"{txt.strip()}%", "page_len": page_len},
+        as_dict=True,
+    )
+
+    if exact:
+        matches.sort(key=lambda row: row.name != exact)
+    return matches
+
+
+def get_default_matches(doctype, txt, searchfield, start, page_len, filters, as_dict=False):
+    if "erpnext" in frappe.get_installed_apps():
+        from erpnext.controllers.queries import item_query as erpnext_item_query
+
+        return erpnext_item_query(doctype, txt, searchfield, start, page_len, filters, as_dict=as_dict)
+
+    from frappe.desk.search import search_widget
+
+    return search_widget(
+        doctype, txt, searchfield=searchfield, start=start, page_length=page_len,
+        filters=filters, as_dict=as_dict, ignore_user_permissions=False,
+    )
+
+
+def get_item_filters(filters):
+    """Keep the filters on Item fields; item queries also get keys like `customer` that are not"""
+    if not filters:
+        return {}
+
+    meta = frappe.get_meta("Item")
+    if isinstance(filters, dict):
+        return {key: value for key, value in filters.items() if meta.has_field(key)}
+    return [row for row in filters if meta.has_field(row[1] if len(row) > 3 else row[0])]
+
+
+def clear_part_no_cache(doc, method=None, *args):
+    """Drop the cached part numbers of an Item when it is saved, renamed or deleted"""
+    part_nos = {doc.get("customer_part_no")}
+    previous = doc.get_doc_before_save() if method == "on_update" else None
+    if previous:
+        part_nos.add(previous.get("customer_part_no"))
+
+    for part_no in part_nos:
+        if part_no:
+            frappe.cache().hdel(PART_NO_CACHE_KEY, part_no.strip())
+
+
+def ensure_unique_part_no():
+    """
+    Make Customer Part No. unique once no two Items share a part number
+
+    The sync_customizations patch leaves the field non-unique while duplicates
+    exist; this runs after every migrate so the index follows once they are fixed.
+    """
+    if frappe.db.get_value("Custom Field", {"dt": "Item", "fieldname": "customer_part_no"}, "unique") != 0:
+        return
+
+    # Blank part numbers would collide in the unique index, NULLs do not
+    frappe.db.sql("update `tabItem` set customer_part_no = null where customer_part_no = ''")
+
+    duplicates = get_duplicate_part_nos()
+    if duplicates:
+        print(f"Customer Part No. is not unique yet, these part numbers are used by more than one Item: {', '.join(duplicates)}")
+        return
+
+    field = frappe.get_doc("Custom Field", {"dt": "Item", "fieldname": "customer_part_no"})
+    field.unique = 1
+    field.save()
+    frappe.db.commit()
+    print("Customer Part No. is now unique.")
+
+
+def get_duplicate_part_nos():
+    """Part numbers used by more than one Item, which block the unique index"""
+    return frappe.db.sql_list(
+        """
+        select customer_part_no
+        from `tabItem`
+        where customer_part_no is not null
+        group by customer_part_no
+        having count(*) > 1
+        """
+    )
@@ -0,0 +1,31 @@
+import copy
+
+import frappe
+
+from custom_invoice.part_no import get_duplicate_part_nos
+from custom_invoice.setup import CUSTOM_FIELDS, sync_customizations
+
+
+def execute():
+    """Apply changes to the custom fields and property setters in setup.py on existing sites"""
+    # Blank part numbers would collide in the unique index, NULLs do not
+    frappe.db.sql("update `tabItem` set customer_part_no = null where customer_part_no = ''")
+
+    duplicates = get_duplicate_part_nos()
+    if not duplicates:
+        sync_customizations()
+        return
+
+    # Leave the field non-unique until the duplicates are fixed, instead of failing the
+    # migration; part_no.ensure_unique_part_no applies it on a later migrate
+    message = (
+        f"Customer Part No. is not unique yet, these part numbers are used by more than one Item: {', '.join(duplicates)}. "
+        "It is made unique on the first bench migrate after they are fixed."
+    )
+    print(message)
+    frappe.log_error(title="Duplicate Customer Part No.", message=message)
+
+    custom_fields = copy.deepcopy(CUSTOM_FIELDS)
+    for df in custom_fields["Item"]:
+        df.pop("unique", None)
+    sync_customizations(custom_fields)
@@ -0,0 +1,149 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import frappe
+from frappe.utils import cint, get_url
+
+from custom_invoice import pdf_pool, print_timing
+
+DEFAULT_ENGINE = "wkhtmltopdf"
+
+# frappe.utils.pdf falls back to these when no margin is given
+DEFAULT_MARGIN = "15mm"
+
+# Engines that may load file:// URLs; frappe.utils.pdf runs wkhtmltopdf with
+# --disable-local-file-access
+LOCAL_FILE_ENGINES = ("weasyprint", "chromium")
+
+CHROMIUM_BINARIES = ("chromium", "chromium-browser", "google-chrome", "google-chrome-stable")
+CHROMIUM_TIMEOUT = 120
+
+
+def get_pdf(html, options=None, engine=None):
+    """
+    Convert HTML to PDF with the engine set in the `custom_invoice_pdf_engine` site config
+
+    `options` are wkhtmltopdf options. Other engines get the same page size,
+    orientation and margins as an injected `@page` rule, so switching engines
+    does not change the page geometry.
+
+    With the `custom_invoice_pdf_pool` site config, WeasyPrint and Chromium
+    conversions go to the warm renderers of `bench custom-invoice-pdf-pool`
+    when it is running, see `custom_invoice.pdf_pool`.
+    """
+    engine = get_engine_name(engine)
+    if engine not in ENGINES:
+        frappe.throw(f"Unknown PDF engine {engine}, use one of {', '.join(ENGINES)}")
+
+    print_timing.set_value("pdf_engine", engine)
+    options = options or {}
+
+    if engine in pdf_pool.POOLABLE_ENGINES and cint(frappe.conf.get("custom_invoice_pdf_pool")):
+        pdf = pdf_pool.render(engine, add_page_css(html, options), options, get_url())
+        if pdf is not None:
+            print_timing.set_value("pdf_pool", True)
+            return pdf
+
+    return ENGINES[engine](html, options)
+
+
+def get_engine_name(engine=None):
+    return engine or frappe.conf.get("custom_invoice_pdf_engine") or DEFAULT_ENGINE
+
+
+def get_wkhtmltopdf_pdf(html, options):
+    from frappe.utils.pdf import get_pdf as get_frappe_pdf
+    return get_frappe_pdf(html, options)
+
+
+def get_weasyprint_pdf(html, options):
+    try:
+        from weasyprint import HTML
+    except ImportError:
+        frappe.throw("The weasyprint PDF engine needs the weasyprint package, install it with bench pip install weasyprint")
+
+    return HTML(string=add_page_css(html, options), base_url=get_url()).write_pdf()
+
+
+def get_chromium_pdf(html, options):
+    binary = get_chromium_binary()
+    if not binary:
+        frappe.throw("The chromium PDF engine needs Chromium or Chrome, set custom_invoice_chromium_path if it is not on PATH")
+
+    with tempfile.TemporaryDirectory(prefix="custom_invoice_pdf_") as folder:
+        html_path = os.path.join(folder, "print.html")
+        pdf_path = os.path.join(folder, "print.pdf")
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write(add_page_css(html, options))
+
+        args = [
+            binary,
+            "--headless",
+            "--disable-gpu",
+            "--no-pdf-header-footer",
+            f"--print-to-pdf={pdf_path}",
+            *(frappe.conf.get("custom_invoice_chromium_args") or []),
+        ]
+        # Chromium refuses to start its sandbox as root
+        if os.geteuid() == 0:
+            args.append("--no-sandbox")
+
+        subprocess.run(
+            args + ["file://" + html_path],
+            check=True,
+            capture_output=True,
+            timeout=CHROMIUM_TIMEOUT,
+        )
+
+        with open(pdf_path, "rb") as f:
+            return f.read()
+
+
+def get_chromium_binary():
+    return find_chromium_binary(frappe.conf.get("custom_invoice_chromium_path"))
+
+
+def find_chromium_binary(path=None):
+    if path:
+        return path
+
+    for binary in CHROMIUM_BINARIES:
+        path = shutil.which(binary)
+        if path:
+            return path
+
+
+def get_page_css(options):
+    """Translate the page size, orientation and margins of wkhtmltopdf options to an @page rule"""
+    if options.get("page-width") and options.get("page-height"):
+        size = f"{options['page-width']} {options['page-height']}"
+    else:
+        size = options.get("page-size") or "A4"
+        if (options.get("orientation") or "").lower() == "landscape":
+            size += " landscape"
+
+    margins = " ".join(
+        str(options.get(f"margin-{side}") or DEFAULT_MARGIN)
+        for side in ("top", "right", "bottom", "left")
+    )
+
+    # Print formats may set their own @page margins for wkhtmltopdf, which ignores them
+    return f"@page {{ size: {size}; margin: {margins} !important; }}"
+
+
+def add_page_css(html, options):
+    """Add the @page rule of `options` after the document's own styles so it takes precedence"""
+    style = f"<style>{get_page_css(options)}</style>"
+    position = html.rfind("</head>")
+    if position == -1:
+        return style + html
+    return html[:position] + style + html[position:]
+
+
+ENGINES = {
+    "wkhtmltopdf": get_wkhtmltopdf_pdf,
+    "weasyprint": get_weasyprint_pdf,
+    "chromium": get_chromium_pdf,
+}
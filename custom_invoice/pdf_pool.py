@@ -0,0 +1,477 @@
+import base64
+import fcntl
+import json
+import multiprocessing
+import os
+import queue
+import select
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from multiprocessing.connection import Client, Listener
+
+import frappe
+
+# Engines that can keep a renderer loaded between conversions; wkhtmltopdf is a
+# separate program per conversion and is always run directly
+POOLABLE_ENGINES = ("weasyprint", "chromium")
+
+SOCKET_NAME = "custom_invoice_pdf_pool.sock"
+RENDER_TIMEOUT = 120
+QUEUE_TIMEOUT = 60
+HEALTH_CHECK_INTERVAL = 30
+
+
+class RenderError(Exception):
+    """The renderer reported an error for the document, the renderer itself is fine"""
+
+
+def render(engine, html, options, base_url):
+    """
+    Convert HTML to PDF in the shared renderer pool
+
+    Returns None when no pool is running for this engine, or when its renderer
+    died before converting the document, so the caller can render the PDF itself.
+    Raises TooManyRequestsError when every renderer is busy and the pool's queue
+    is full.
+    """
+    try:
+        conn = Client(get_socket_path(), family="AF_UNIX")
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+
+    with conn:
+        conn.send({"engine": engine, "html": html, "options": options, "base_url": base_url})
+        if not conn.poll(QUEUE_TIMEOUT + RENDER_TIMEOUT):
+            frappe.throw("The PDF renderer pool did not respond in time")
+        response = conn.recv()
+
+    if response["status"] == "unsupported":
+        return None
+    if response["status"] == "unavailable":
+        frappe.log_error(
+            title="PDF Renderer Pool Unavailable",
+            message=f"No {engine} renderer of the pool could convert the document, rendered it directly instead.\n\n{response['error']}"
+        )
+        return None
+    if response["status"] == "busy":
+        frappe.throw("All PDF renderers are busy, please try again in a moment", exc=frappe.TooManyRequestsError)
+    if response["status"] == "error":
+        frappe.throw(f"PDF rendering failed: {response['error']}")
+
+    return response["pdf"]
+
+
+def get_socket_path():
+    return frappe.conf.get("custom_invoice_pdf_pool_socket") or os.path.join(frappe.local.sites_path, SOCKET_NAME)
+
+
+def serve(engine, socket_path, size=2, max_jobs=200, max_queue=None, settings=None):
+    """
+    Run a pool of `size` warm renderer processes and answer render requests on a unix socket
+
+    Each renderer is restarted after `max_jobs` conversions to contain leaks, or when it
+    crashes, times out or fails a health check. At most `max_queue` requests wait for a
+    free renderer; any more are answered as busy right away.
+    """
+    pool = RendererPool(engine, size, max_jobs, settings or {})
+    max_queue = size * 4 if max_queue is None else max_queue
+
+    # A renderer that cannot start (e.g. a wrong Chromium path) prints its
+    # traceback and exits; refuse to serve when none of them came up
+    alive = sum(renderer.ping() for renderer in pool.renderers)
+    if not alive:
+        pool.stop()
+        raise RuntimeError(f"None of the {size} {engine} renderers started, see the errors above")
+    if alive < size:
+        print(f"PDF renderer pool: only {alive} of {size} {engine} renderers started", flush=True)
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    # Only the bench user may connect
+    umask = os.umask(0o077)
+    try:
+        listener = Listener(socket_path, family="AF_UNIX")
+    finally:
+        os.umask(umask)
+
+    threading.Thread(target=pool.check_health, daemon=True).start()
+    print(f"PDF renderer pool: {size} {engine} renderers on {socket_path}", flush=True)
+
+    try:
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=handle_request, args=(pool, conn, max_queue), daemon=True).start()
+    finally:
+        listener.close()
+        pool.stop()
+
+
+def handle_request(pool, conn, max_queue):
+    with conn:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            return
+
+        response = get_response(pool, request, max_queue)
+        try:
+            conn.send(response)
+        except OSError:
+            # The client gave up waiting
+            pass
+
+
+def get_response(pool, request, max_queue):
+    if request.get("engine") != pool.engine:
+        return {"status": "unsupported"}
+
+    renderer = pool.acquire(max_queue)
+    if not renderer:
+        return {"status": "busy"}
+
+    try:
+        pdf = renderer.render(request["html"], request["options"], request["base_url"])
+    except RenderError as e:
+        return {"status": "error", "error": str(e)}
+    except TimeoutError as e:
+        renderer.needs_restart = True
+        return {"status": "error", "error": str(e)}
+    except (EOFError, OSError) as e:
+        # The renderer process died before answering, the client renders the document itself
+        renderer.needs_restart = True
+        return {"status": "unavailable", "error": repr(e)}
+    except Exception as e:
+        # Crashed or timed out, start a fresh process before it is used again
+        renderer.needs_restart = True
+        return {"status": "error", "error": repr(e)}
+    finally:
+        pool.release(renderer)
+
+    return {"status": "ok", "pdf": pdf}
+
+
+class RendererPool:
+    def __init__(self, engine, size, max_jobs, settings):
+        self.engine = engine
+        self.max_jobs = max_jobs
+        self.renderers = [RendererProcess(engine, settings) for _ in range(size)]
+        self.idle = queue.Queue()
+        self.waiting = 0
+        self.lock = threading.Lock()
+
+        for renderer in self.renderers:
+            renderer.start()
+            self.idle.put(renderer)
+
+    def acquire(self, max_queue):
+        """Return an idle renderer, or None if too many requests are waiting already"""
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            if self.waiting >= max_queue:
+                return None
+            self.waiting += 1
+
+        try:
+            return self.idle.get(timeout=QUEUE_TIMEOUT)
+        except queue.Empty:
+            return None
+        finally:
+            with self.lock:
+                self.waiting -= 1
+
+    def release(self, renderer):
+        if not renderer.needs_restart and renderer.jobs < self.max_jobs:
+            self.idle.put(renderer)
+            return
+
+        # Restart outside the request so the client gets its PDF without waiting for it
+        def restart():
+            renderer.restart()
+            self.idle.put(renderer)
+
+        threading.Thread(target=restart, daemon=True).start()
+
+    def check_health(self):
+        """Ping idle renderers periodically and restart the ones that stopped responding"""
+        while True:
+            time.sleep(HEALTH_CHECK_INTERVAL)
+            for _ in range(len(self.renderers)):
+                try:
+                    renderer = self.idle.get_nowait()
+                except queue.Empty:
+                    break
+
+                if not renderer.ping():
+                    renderer.restart()
+                self.idle.put(renderer)
+
+    def stop(self):
+        for renderer in self.renderers:
+            renderer.stop()
+
+
+class RendererProcess:
+    """A renderer process with the engine loaded, driven over a pipe"""
+
+    def __init__(self, engine, settings):
+        self.engine = engine
+        self.settings = settings
+        self.process = None
+        self.conn = None
+        self.jobs = 0
+        self.needs_restart = False
+
+    def start(self):
+        context = multiprocessing.get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=run_renderer, args=(self.engine, self.settings, child_conn), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        self.needs_restart = False
+
+    def stop(self):
+        if not self.process:
+            return
+
+        # Closing the pipe ends the renderer's loop; terminate it if it is stuck
+        self.conn.close()
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.process = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def ping(self):
+        try:
+            self.conn.send(("ping",))
+            return self.conn.poll(10) and self.conn.recv() == ("pong",)
+        except (EOFError, OSError):
+            return False
+
+    def render(self, html, options, base_url):
+        if not self.process.is_alive():
+            self.restart()
+
+        self.jobs += 1
+        self.conn.send(("render", html, options, base_url))
+        if not self.conn.poll(RENDER_TIMEOUT):
+            raise TimeoutError(f"The {self.engine} renderer took more than {RENDER_TIMEOUT}s")
+
+        status, result = self.conn.recv()
+        if status == "error":
+            raise RenderError(result)
+        return result
+
+
+def run_renderer(engine, settings, conn):
+    """Main loop of a renderer process: load the engine once, then convert documents until the pipe closes"""
+    # Run the finally block on terminate too, so Chromium does not outlive its renderer
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    renderer = RENDERERS[engine](settings)
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+
+            if message[0] == "ping":
+                response = ("pong",) if renderer.is_healthy() else ("unhealthy",)
+            else:
+                try:
+                    response = ("ok", renderer.render(*message[1:]))
+                except Exception:
+                    response = ("error", traceback.format_exc(limit=5))
+
+            try:
+                conn.send(response)
+            except OSError:
+                # The pool closed the pipe, e.g. after a timeout
+                break
+
+            # Exit if the engine itself broke, the pool starts a new process
+            if response[0] == "error" and not renderer.is_healthy():
+                break
+    finally:
+        renderer.close()
+
+
+class WeasyPrintRenderer:
+    def __init__(self, settings):
+        from weasyprint import HTML
+        from weasyprint.text.fonts import FontConfiguration
+
+        self.html_class = HTML
+        self.font_config = FontConfiguration()
+
+    def render(self, html, options, base_url):
+        return self.html_class(string=html, base_url=base_url).write_pdf(font_config=self.font_config)
+
+    def is_healthy(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class ChromiumRenderer:
+    """
+    One headless Chromium with a single page that is reused for every document
+
+    Talks the DevTools protocol over --remote-debugging-pipe (fd 3 in, fd 4 out,
+    null terminated JSON), so no websocket client is needed.
+    """
+
+    def __init__(self, settings):
+        child_read, self.write_fd = os.pipe()
+        self.read_fd, child_write = os.pipe()
+
+        def map_pipes():
+            # Move both ends above 3 and 4 first so neither dup2 overwrites the other
+            read_fd = fcntl.fcntl(child_read, fcntl.F_DUPFD, 10)
+            write_fd = fcntl.fcntl(child_write, fcntl.F_DUPFD, 10)
+            os.dup2(read_fd, 3)
+            os.dup2(write_fd, 4)
+
+        args = [
+            settings["chromium_path"],
+            "--headless",
+            "--disable-gpu",
+            "--remote-debugging-pipe",
+            "--no-first-run",
+            "--no-default-browser-check",
+            *settings.get("chromium_args", []),
+        ]
+        if os.geteuid() == 0:
+            args.append("--no-sandbox")
+
+        self.process = subprocess.Popen(
+            args,
+            preexec_fn=map_pipes,
+            close_fds=False,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        os.close(child_read)
+        os.close(child_write)
+
+        self.buffer = bytearray()
+        self.events = []
+        self.message_id = 0
+        self.document_count = 0
+        self.folder = tempfile.mkdtemp(prefix="custom_invoice_chromium_")
+
+        target = self.send("Target.createTarget", {"url": "about:blank"})
+        self.session_id = self.send("Target.attachToTarget", {"targetId": target["targetId"], "flatten": True})["sessionId"]
+        self.send("Page.enable", session=True)
+
+    def render(self, html, options, base_url):
+        # A new file name per document makes every navigation a real load
+        self.document_count += 1
+        path = os.path.join(self.folder, f"print-{self.document_count}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+
+        try:
+            self.events.clear()
+            self.send("Page.navigate", {"url": "file://" + path}, session=True)
+            self.wait_for_event("Page.loadEventFired")
+
+            # The page size and margins come from the @page rule added by pdf_engine
+            result = self.send("Page.printToPDF", {
+                "printBackground": True,
+                "preferCSSPageSize": True,
+                "displayHeaderFooter": False,
+            }, session=True)
+        finally:
+            os.unlink(path)
+
+        return base64.b64decode(result["data"])
+
+    def is_healthy(self):
+        if self.process.poll() is not None:
+            return False
+        try:
+            self.send("Browser.getVersion", timeout=10)
+        except Exception:
+            return False
+        return True
+
+    def close(self):
+        self.process.kill()
+        self.process.wait()
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def send(self, method, params=None, session=False, timeout=RENDER_TIMEOUT):
+        """Send a DevTools command and return its result, keeping events that arrive meanwhile"""
+        self.message_id += 1
+        message = {"id": self.message_id, "method": method, "params": params or {}}
+        if session:
+            message["sessionId"] = self.session_id
+
+        data = json.dumps(message).encode() + b"\0"
+        while data:
+            data = data[os.write(self.write_fd, data):]
+
+        deadline = time.monotonic() + timeout
+        while True:
+            response = self.read_message(deadline)
+            if response.get("id") == self.message_id:
+                if "error" in response:
+                    raise RenderError(f"{method}: {response['error'].get('message')}")
+                return response.get("result", {})
+            self.events.append(response)
+
+    def wait_for_event(self, method, timeout=RENDER_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while True:
+            for event in self.events:
+                if event.get("method") == method and event.get("sessionId") == self.session_id:
+                    return event
+            self.events.append(self.read_message(deadline))
+
+    def read_message(self, deadline):
+        while True:
+            end = self.buffer.find(b"\0")
+            if end != -1:
+                message = bytes(self.buffer[:end])
+                del self.buffer[:end + 1]
+                return json.loads(message)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self.read_fd], [], [], remaining)[0]:
+                raise TimeoutError("Chromium did not respond in time")
+
+            chunk = os.read(self.read_fd, 1024 * 1024)
+            if not chunk:
+                raise EOFError("Chromium exited")
+            self.buffer += chunk
+
+
+RENDERERS = {
+    "weasyprint": WeasyPrintRenderer,
+    "chromium": ChromiumRenderer,
+}
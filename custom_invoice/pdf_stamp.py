@@ -0,0 +1,87 @@
+import io
+
+from pypdf import PageObject, PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+MM_TO_PT = 72 / 25.4
+
+# Helvetica glyph widths (1/1000 em) for printable ASCII, used to right-align
+# the label without needing a font metrics library
+HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+
+
+def stamp_copies(pdf_data, labels, right_mm=4, top_mm=31, font_size=8):
+    """
+    Duplicate a rendered PDF once per label and write the label onto every page of each copy
+
+    Args:
+        pdf_data: PDF bytes of a single copy, rendered with the copy type label left blank
+        labels: Copy type labels, one copy is produced per label
+        right_mm: Distance of the label's right edge from the right edge of the page
+        top_mm: Distance of the label's baseline from the top of the page
+        font_size: Font size of the label in points
+
+    Returns:
+        bytes: A single PDF containing all the labelled copies
+    """
+    writer = PdfWriter()
+
+    for label in labels:
+        # Each copy gets its own reader so stamping one copy never leaks into another
+        reader = PdfReader(io.BytesIO(pdf_data))
+        for page in reader.pages:
+            if label:
+                page.merge_page(make_label_page(page, label, right_mm, top_mm, font_size))
+            writer.add_page(page)
+
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def make_label_page(page, label, right_mm, top_mm, font_size):
+    """Return a transparent page of the same size as `page` with only `label` drawn on it"""
+    box = page.mediabox
+    width = float(box.width)
+    height = float(box.height)
+
+    x = float(box.left) + width - right_mm * MM_TO_PT - get_text_width(label, font_size)
+    y = float(box.bottom) + height - top_mm * MM_TO_PT
+
+    text = label.encode("cp1252", "replace")
+    text = text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+    content = DecodedStreamObject()
+    content.set_data(
+        b"BT /F1 %.2f Tf %.2f %.2f Td (%s) Tj ET" % (font_size, x, y, text)
+    )
+
+    overlay = PageObject.create_blank_page(width=width, height=height)
+    overlay[NameObject("/Contents")] = content
+    overlay[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/Font"): DictionaryObject({
+            NameObject("/F1"): DictionaryObject({
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+                NameObject("/Encoding"): NameObject("/WinAnsiEncoding"),
+            })
+        })
+    })
+    return overlay
+
+
+def get_text_width(text, font_size):
+    """Approximate width in points of `text` set in Helvetica"""
+    width = 0
+    for char in text:
+        code = ord(char)
+        width += HELVETICA_WIDTHS[code - 32] if 32 <= code <= 126 else 556
+    return width * font_size / 1000
@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import io
+import mimetypes
+import os
+import re
+
+import frappe
+from frappe.utils import cint
+
+from custom_invoice.pdf_engine import LOCAL_FILE_ENGINES, get_engine_name
+
+# Images of this app referenced by print formats, in an img src or a CSS url(),
+# e.g. the PR Plastics header
+ASSET_URL_PATTERN = re.compile(r'(src="|url\(")/assets/custom_invoice/([^"?#]+)"')
+
+# Sites already warned that the file mode does not work with their PDF engine
+file_mode_warned_sites = set()
+
+# Per process caches: asset path -> (mtime, size, content hash) and
+# (site, content hash, mode, max width) -> resolved src
+asset_hashes = {}
+resolved_assets = {}
+
+
+def inline_assets(html):
+    """
+    Point the app's images in rendered print HTML at local data instead of /assets URLs
+
+    wkhtmltopdf would otherwise fetch every image through the site URL while
+    rendering. Depending on `custom_invoice_print_asset_mode` the src becomes a
+    data URI (default) or a `file://` path of the optimized image. Set it to
+    "url" to keep the original URLs.
+
+    The file mode only works with the weasyprint and chromium engines. Frappe
+    runs wkhtmltopdf without local file access, so with it data URIs are used.
+    """
+    mode = frappe.conf.get("custom_invoice_print_asset_mode") or "data_uri"
+    if mode == "url":
+        return html
+
+    if mode == "file" and get_engine_name() not in LOCAL_FILE_ENGINES:
+        if frappe.local.site not in file_mode_warned_sites:
+            file_mode_warned_sites.add(frappe.local.site)
+            frappe.logger().warning(
+                f"custom_invoice_print_asset_mode 'file' needs the weasyprint or chromium PDF engine, "
+                f"{get_engine_name()} cannot read local files; embedding images as data URIs instead"
+            )
+        mode = "data_uri"
+
+    def replace(match):
+        src = resolve_asset(match.group(2), mode)
+        return f'{match.group(1)}{src}"' if src else match.group(0)
+
+    return ASSET_URL_PATTERN.sub(replace, html)
+
+
+def resolve_asset(relative_path, mode="data_uri"):
+    """Return the data URI or file URL of an asset under public/, or None if it does not exist"""
+    public_path = os.path.realpath(frappe.get_app_path("custom_invoice", "public"))
+    path = os.path.realpath(os.path.join(public_path, relative_path))
+    if not path.startswith(public_path + os.sep) or not os.path.isfile(path):
+        return None
+
+    max_width = cint(frappe.conf.get("custom_invoice_print_asset_max_width"))
+    content_hash = get_content_hash(path)
+    key = (frappe.local.site, content_hash, mode, max_width)
+    if key not in resolved_assets:
+        content = optimize_image(path, max_width)
+        if mode == "file":
+            resolved_assets[key] = "file://" + write_optimized_file(content_hash, path, content)
+        else:
+            mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            resolved_assets[key] = f"data:{mime_type};base64," + base64.b64encode(content).decode()
+
+    return resolved_assets[key]
+
+
+def get_content_hash(path):
+    """Return the SHA-1 of a file, re-reading it only when its mtime or size changed"""
+    stat = os.stat(path)
+    cached = asset_hashes.get(path)
+    if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+        return cached[2]
+
+    with open(path, "rb") as f:
+        content_hash = hashlib.sha1(f.read()).hexdigest()
+
+    asset_hashes[path] = (stat.st_mtime, stat.st_size, content_hash)
+    return content_hash
+
+
+def optimize_image(path, max_width=0):
+    """
+    Return the image re-encoded losslessly, and scaled down if it is wider than
+    `max_width` pixels (`custom_invoice_print_asset_max_width`). Non-image assets
+    are returned as is.
+    """
+    with open(path, "rb") as f:
+        content = f.read()
+
+    try:
+        from PIL import Image
+    except ImportError:
+        return content
+
+    try:
+        image = Image.open(io.BytesIO(content))
+        image_format = image.format
+
+        if max_width and image.width > max_width:
+            palette = image.mode == "P"
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            image = image.resize((max_width, round(image.height * max_width / image.width)), Image.LANCZOS)
+            if palette and image.mode == "RGB":
+                image = image.quantize(256)
+
+        output = io.BytesIO()
+        image.save(output, image_format, optimize=True)
+    except Exception:
+        return content
+
+    # Keep the original when re-encoding does not make it smaller
+    return output.getvalue() if output.tell() < len(content) else content
+
+
+def write_optimized_file(content_hash, path, content):
+    """Write the optimized image to the site's private folder, named by its content hash"""
+    folder = frappe.get_site_path("private", "custom_invoice_assets")
+    os.makedirs(folder, exist_ok=True)
+
+    target = os.path.abspath(os.path.join(folder, content_hash + os.path.splitext(path)[1]))
+    if not os.path.exists(target):
+        # Write under a temporary name so concurrent renders never read a partial file
+        temp_path = f"{target}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(content)
+        os.replace(temp_path, target)
+
+    return target
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import time
+
+import frappe
+from frappe.utils import cint
+
+CACHE_KEY = "custom_invoice_pdf_cache"
+STATS_KEY = "custom_invoice_pdf_cache_stats"
+
+
+def get_cache_key(doctype, name, modified, print_format, copies, letterhead=None, stamp_labels=None):
+    """
+    Return the cache key of a copies PDF
+
+    The key changes whenever the document, the print format HTML, the copies or
+    the letterhead change, so a stored PDF is never served for different input.
+    """
+    print_format = print_format or frappe.get_meta(doctype).default_print_format or "Standard"
+    print_format_html = frappe.db.get_value("Print Format", print_format, "html") or ""
+
+    key = json.dumps([
+        doctype,
+        name,
+        str(modified),
+        print_format,
+        hashlib.sha1(print_format_html.encode()).hexdigest(),
+        list(copies),
+        letterhead or "",
+        cint(stamp_labels)
+    ])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def get_cached_file(key):
+    """Return the cache entry (`file`, `file_url`, ...) stored for `key`, or None on a miss"""
+    if not is_enabled():
+        return None
+
+    entry = frappe.cache().hget(CACHE_KEY, key)
+
+    # The file may have been deleted since it was cached
+    if entry and not frappe.db.exists("File", entry["file"]):
+        frappe.cache().hdel(CACHE_KEY, key)
+        entry = None
+
+    if not entry:
+        increment_stat("misses")
+        return None
+
+    entry["last_access"] = time.time()
+    frappe.cache().hset(CACHE_KEY, key, entry)
+    increment_stat("hits")
+    return entry
+
+
+def set_cached_file(key, file_doc, print_format=None):
+    """Store a generated copies PDF for `key` and evict the least recently used entries"""
+    if not is_enabled():
+        return
+
+    frappe.cache().hset(CACHE_KEY, key, {
+        "file": file_doc.name,
+        "file_url": file_doc.file_url,
+        "size": file_doc.file_size or 0,
+        "doctype": file_doc.attached_to_doctype,
+        "name": file_doc.attached_to_name,
+        "print_format": print_format,
+        "last_access": time.time()
+    })
+    evict()
+
+
+def evict():
+    """Drop the least recently used entries until the cache fits its entry and size limits"""
+    max_entries = cint(frappe.conf.get("custom_invoice_pdf_cache_size")) or 1000
+    max_bytes = (cint(frappe.conf.get("custom_invoice_pdf_cache_max_mb")) or 1024) * 1024 * 1024
+
+    entries = get_entries()
+    total_size = sum(entry["size"] for entry in entries.values())
+    if len(entries) <= max_entries and total_size <= max_bytes:
+        return
+
+    evicted = []
+    for key, entry in sorted(entries.items(), key=lambda item: item[1]["last_access"]):
+        if len(entries) - len(evicted) <= max_entries and total_size <= max_bytes:
+            break
+        evicted.append(key)
+        total_size -= entry["size"]
+
+    delete_entries(evicted)
+    increment_stat("evictions", len(evicted))
+
+
+def invalidate(doctype=None, name=None, print_format=None):
+    """Drop the entries of a document or of a print format"""
+    stale = [
+        key for key, entry in get_entries().items()
+        if (name and entry["doctype"] == doctype and entry["name"] == name)
+        or (print_format and entry["print_format"] == print_format)
+    ]
+    delete_entries(stale)
+
+
+def invalidate_document(doc, method=None):
+    """Drop the cached copies of a document when it is cancelled"""
+    invalidate(doctype=doc.doctype, name=doc.name)
+
+
+def invalidate_amended_from(doc, method=None):
+    """Drop the cached copies of the document an inserted amendment replaces"""
+    # A new document has nothing cached, and most are not amendments
+    if not doc.get("amended_from"):
+        return
+    invalidate(doctype=doc.doctype, name=doc.amended_from)
+
+
+def invalidate_print_format(doc, method=None):
+    """Drop the cached copies rendered with a print format when it is edited"""
+    invalidate(print_format=doc.name)
+
+
+def get_entries():
+    """Return all cache entries by key"""
+    return {
+        frappe.safe_decode(key): entry
+        for key, entry in (frappe.cache().hgetall(CACHE_KEY) or {}).items()
+    }
+
+
+def delete_entries(keys):
+    for key in keys:
+        frappe.cache().hdel(CACHE_KEY, key)
+
+
+def increment_stat(stat, amount=1):
+    frappe.cache().incrby(get_stat_key(stat), amount)
+
+
+def get_stat(stat):
+    return cint(frappe.safe_decode(frappe.cache().get(get_stat_key(stat)) or 0))
+
+
+def get_stat_key(stat):
+    return frappe.cache().make_key(f"{STATS_KEY}:{stat}")
+
+
+def is_enabled():
+    return cint(frappe.conf.get("custom_invoice_pdf_cache", 1))
+
+
+@frappe.whitelist()
+def get_pdf_cache_stats():
+    """Return hit/miss counters and the current size of the PDF cache"""
+    frappe.only_for("System Manager")
+
+    hits = get_stat("hits")
+    misses = get_stat("misses")
+    entries = get_entries()
+
+    return {
+        "hits": hits,
+        "misses": misses,
+        "evictions": get_stat("evictions"),
+        "hit_rate": hits / (hits + misses) if hits + misses else 0,
+        "entries": len(entries),
+        "size": sum(entry["size"] for entry in entries.values())
+    }
@@ -0,0 +1,148 @@
+import frappe
+from frappe.utils import cint, flt, money_in_words
+
+from custom_invoice.utils import format_indian_integer, format_indian_number, format_indian_numbers
+
+# Item rows that fit on a page, and on the last page which also holds the
+# amount in words, bank details, terms and signature. Pages are not clipped, so
+# too high a count spills rows onto an extra sheet rather than hiding them;
+# sites can tune both with custom_invoice_print_rows_per_page / _last_page
+ROWS_PER_PAGE = 30
+ROWS_ON_LAST_PAGE = 18
+
+
+def get_invoice_print_context(doc):
+    """
+    Compute everything the PR Plastics Invoice print format shows, once per render
+
+    The template only reads the returned values, so taxes, totals and layout
+    classes are not re-evaluated in Jinja for every place they are printed.
+
+    Long invoices are split into `pages` here too, so the template lays out a
+    fixed number of rows per page instead of leaving the page breaks to the PDF
+    engine.
+    """
+    item_count = len(doc.items)
+    rows = get_item_rows(doc.items)
+    pages = get_pages(doc.items, rows)
+    last_page_count = len(pages[-1].rows)
+
+    taxable_value = flt(doc.total) + flt(doc.get("freight_charges")) + flt(doc.get("misc_charges"))
+    taxes = get_gst_amounts(doc)
+    total_invoice_value = taxable_value + taxes.cgst_amount + taxes.sgst_amount + taxes.igst_amount
+
+    in_words = money_in_words(total_invoice_value, doc.get("currency"))
+    if in_words.startswith("INR "):
+        in_words = in_words[4:]
+
+    return frappe._dict({
+        "rows": rows,
+        "pages": pages,
+        "page_count": len(pages),
+        "empty_rows": get_empty_rows(item_count) if len(pages) == 1 else 0,
+        "total_qty": format_indian_integer(doc.total_qty),
+        "total": format_indian_number(doc.total),
+        "freight_charges": format_indian_number(flt(doc.get("freight_charges"))),
+        "misc_charges": format_indian_number(flt(doc.get("misc_charges"))),
+        "taxable_value": format_indian_number(taxable_value),
+        "cgst_amount": format_indian_number(taxes.cgst_amount),
+        "sgst_amount": format_indian_number(taxes.sgst_amount),
+        "igst_amount": format_indian_number(taxes.igst_amount) if taxes.igst_amount else None,
+        "total_invoice_value": format_indian_number(total_invoice_value),
+        "amount_in_words": in_words,
+        "bank_space_class": get_space_class("bank-space", last_page_count, 3),
+        "terms_space_class": get_space_class("terms-space", last_page_count, 4),
+        "sign_space_class": get_space_class("sign-space", last_page_count, 5)
+    })
+
+
+def get_gst_amounts(doc):
+    """Return the CGST, SGST and IGST amounts of a document, summed over its tax rows"""
+    amounts = frappe._dict({"cgst_amount": 0.0, "sgst_amount": 0.0, "igst_amount": 0.0})
+
+    for tax in doc.get("taxes") or []:
+        description = f"{tax.description or ''} {tax.account_head or ''}".upper()
+        for tax_type in ("CGST", "SGST", "IGST"):
+            if tax_type in description:
+                amounts[f"{tax_type.lower()}_amount"] += flt(tax.tax_amount)
+                break
+
+    return amounts
+
+
+def get_item_rows(items):
+    """Return the item table rows with their numbers already formatted"""
+    quantities = format_indian_numbers([int(flt(item.qty)) for item in items], decimal_places=0)
+    rates = format_indian_numbers([flt(item.rate) for item in items])
+    amounts = format_indian_numbers([flt(item.amount) for item in items])
+
+    return [
+        frappe._dict({
+            "idx": index + 1,
+            "item_code": item.item_code,
+            "customer_part_no": item.get("customer_part_no") or "",
+            "description": item.get("description_of_goods") or item.description or "",
+            "hsn_sac_code": item.get("hsn_sac_code") or "",
+            "qty": quantities[index],
+            "rate": rates[index],
+            "amount": amounts[index]
+        })
+        for index, item in enumerate(items)
+    ]
+
+
+def get_pages(items, rows):
+    """
+    Split the item rows into printed pages
+
+    Every page but the last has up to `custom_invoice_print_rows_per_page` rows
+    (default 30) and the last at most `custom_invoice_print_rows_last_page`
+    (default 18). Each page carries the quantity and amount brought forward from
+    the pages before it and, except the last, the running total it carries forward.
+    """
+    rows_per_page = max(cint(frappe.conf.get("custom_invoice_print_rows_per_page")) or ROWS_PER_PAGE, 1)
+    rows_on_last_page = min(cint(frappe.conf.get("custom_invoice_print_rows_last_page")) or ROWS_ON_LAST_PAGE, rows_per_page)
+
+    bounds = []
+    start = 0
+    while len(rows) - start > rows_on_last_page:
+        # Always leave at least one row for the last page
+        end = start + min(rows_per_page, len(rows) - start - 1)
+        bounds.append((start, end))
+        start = end
+    bounds.append((start, len(rows)))
+
+    pages = []
+    qty = amount = 0
+    for number, (start, end) in enumerate(bounds, 1):
+        brought_forward = get_page_total(qty, amount) if number > 1 else None
+        for item in items[start:end]:
+            qty += int(flt(item.qty))
+            amount += flt(item.amount)
+
+        is_last = number == len(bounds)
+        pages.append(frappe._dict({
+            "number": number,
+            "rows": rows[start:end],
+            "is_last": is_last,
+            "brought_forward": brought_forward,
+            "carried_forward": None if is_last else get_page_total(qty, amount)
+        }))
+
+    return pages
+
+
+def get_page_total(qty, amount):
+    return frappe._dict({"qty": format_indian_integer(qty), "amount": format_indian_number(amount)})
+
+
+def get_empty_rows(item_count):
+    """Padding rows that keep short invoices at the height of the printed form"""
+    return 4 - item_count if item_count < 4 else 1 if item_count < 6 else 0
+
+
+def get_space_class(prefix, item_count, max_count):
+    """Return the spacing class for the item count, e.g. `sign-space-2` or `sign-space-more`"""
+    if item_count > max_count:
+        return f"{prefix}-more"
+    return f"{prefix}-{max(item_count, 1)}"
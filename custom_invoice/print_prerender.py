@@ -0,0 +1,66 @@
+import time
+
+import frappe
+from frappe.utils import cint
+
+from custom_invoice import print_cache, print_timing
+from custom_invoice.api import print_controller
+from custom_invoice.print_template import PRINT_FORMAT
+
+JOB_PREFIX = "custom_invoice_prerender::"
+RATE_KEY = "custom_invoice_prerender_rate"
+
+
+def enqueue_prerender(doc, method=None):
+    """
+    Queue the copies PDF of a submitted invoice so the first print is served from the PDF cache
+
+    The copies are the ones in the invoice's `print_copies` field, printed with
+    the PR Plastics Invoice format, which is what the print dialog offers by
+    default. Runs on the long queue, at most `custom_invoice_prerender_per_minute`
+    (default 30) times a minute per site so bulk submissions do not flood it.
+    Disable with `custom_invoice_prerender_on_submit: 0`.
+    """
+    if not cint(frappe.conf.get("custom_invoice_prerender_on_submit", 1)) or not print_cache.is_enabled():
+        return
+
+    if frappe.flags.in_import or frappe.flags.in_patch or frappe.flags.in_install:
+        return
+
+    if not acquire_rate_slot():
+        frappe.logger().debug(f"Skipped pre-rendering {doc.doctype} {doc.name}, rate limit reached")
+        return
+
+    job_id = JOB_PREFIX + doc.name
+    frappe.enqueue(
+        "custom_invoice.print_prerender.run_prerender",
+        queue="long",
+        job_id=job_id,
+        deduplicate=True,
+        enqueue_after_commit=True,
+        doctype=doc.doctype,
+        name=doc.name,
+        copies=print_controller.parse_copies(doc.get("print_copies")),
+    )
+
+
+def run_prerender(doctype, name, copies):
+    """Background job of `enqueue_prerender`; renders and caches the copies PDF unless it is cached already"""
+    if frappe.db.get_value(doctype, name, "docstatus") != 1:
+        return
+
+    stamp_labels = frappe.conf.get("custom_invoice_stamp_copy_labels")
+    with print_timing.track(doctype=doctype, name=name, mode="prerender", copies=len(copies)):
+        return print_controller.get_copies_file_url(doctype, name, PRINT_FORMAT, copies, stamp_labels)
+
+
+def acquire_rate_slot():
+    """Count a pre-render against the current minute and return whether it is within the limit"""
+    limit = cint(frappe.conf.get("custom_invoice_prerender_per_minute")) or 30
+
+    key = frappe.cache().make_key(f"{RATE_KEY}:{int(time.time() // 60)}")
+    count = frappe.cache().incrby(key, 1)
+    if count == 1:
+        frappe.cache().expire(key, 120)
+
+    return count <= limit
@@ -0,0 +1,95 @@
+import hashlib
+
+import frappe
+from frappe.utils import cint
+
+PRINT_FORMAT = "PR Plastics Invoice"
+HASH_CACHE_KEY = "custom_invoice_print_format_hash"
+
+# Compiled templates of this process by (site, print format): (html hash, template)
+compiled_templates = {}
+warmed_sites = set()
+
+
+def render_print_format(doctype, name, print_format=PRINT_FORMAT):
+    """
+    Render a Jinja print format for a document with the compiled template of this process
+
+    Returns the same HTML as the print format body, without the print view wrapper
+    that `frappe.get_print` adds around it.
+    """
+    doc = frappe.get_doc(doctype, name)
+    doc.check_permission("print")
+
+    print_settings = frappe.get_cached_doc("Print Settings")
+    doc.run_method("before_print", print_settings)
+
+    jenv = frappe.get_jenv()
+    context = dict(jenv.globals)
+    context.update({
+        "doc": doc,
+        "print_settings": print_settings,
+        "no_letterhead": 1
+    })
+    return get_template(print_format).render(context)
+
+
+def get_template(print_format=PRINT_FORMAT):
+    """
+    Return the compiled template of a print format, compiling it only when its HTML changed
+
+    Only `clear_template_cache` writes the shared hash, after the edit is
+    committed. A reader keeps the hash it saw before reading the HTML, so a
+    read that raced with an edit is recompiled once the new hash appears.
+    """
+    key = (frappe.local.site, print_format)
+    current_hash = frappe.cache().hget(HASH_CACHE_KEY, print_format)
+
+    cached = compiled_templates.get(key)
+    if cached and cached[0] == current_hash:
+        return cached[1]
+
+    html = frappe.db.get_value("Print Format", print_format, "html") or ""
+
+    # Templates are shared across requests; per request globals are passed when rendering
+    template = frappe.get_jenv().from_string(html)
+    compiled_templates[key] = (current_hash, template)
+    return template
+
+
+def get_html_hash(html):
+    return hashlib.sha1((html or "").encode()).hexdigest()
+
+
+def clear_template_cache(doc, method=None):
+    """Publish the new HTML hash of an edited print format so every worker recompiles it"""
+    site, name, html_hash = frappe.local.site, doc.name, get_html_hash(doc.html)
+
+    def publish():
+        # Other workers only read the new HTML once it is committed
+        frappe.cache().hset(HASH_CACHE_KEY, name, html_hash)
+        compiled_templates.pop((site, name), None)
+
+    frappe.db.after_commit.add(publish)
+
+
+def warm_template_cache():
+    """
+    Compile the print format the first time a worker serves a site
+
+    Runs before every request and job, so after the first call it only checks a set.
+    Enable with the `custom_invoice_prewarm_print_template` site config.
+    """
+    if frappe.local.site in warmed_sites:
+        return
+
+    warmed_sites.add(frappe.local.site)
+    if not cint(frappe.conf.get("custom_invoice_prewarm_print_template")):
+        return
+
+    try:
+        if frappe.db.exists("Print Format", PRINT_FORMAT):
+            get_template(PRINT_FORMAT)
+    except Exception:
+        # Warming is an optimisation only, a failure must never break the request
+        frappe.logger().error("Could not pre-warm the print format template", exc_info=True)
@@ -0,0 +1,127 @@
+import json
+import time
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import cint
+
+HISTOGRAM_KEY = "custom_invoice_print_timing"
+HISTOGRAM_SAMPLES = 1000
+
+
+@contextmanager
+def track(**fields):
+    """
+    Time one print request and write its stage timings as a single JSON log line
+
+    Stages and sizes are added with `stage` and `set_value` from anywhere inside
+    the block. The line goes to the `custom_invoice.print_timing` log. With the
+    `custom_invoice_print_timing_histogram` site config the stage timings are also
+    kept in Redis for `get_print_timing_stats`.
+    """
+    previous = getattr(frappe.local, "custom_invoice_print_timing", None)
+    timing = frappe.local.custom_invoice_print_timing = frappe._dict(stages={}, fields=dict(fields))
+    status = "ok"
+    start = time.perf_counter()
+
+    try:
+        yield timing
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        timing.stages["total"] = (time.perf_counter() - start) * 1000
+        frappe.local.custom_invoice_print_timing = previous
+        write_timing(timing, status)
+
+
+@contextmanager
+def stage(name):
+    """Add the time spent in the block to stage `name` of the current request, if one is tracked"""
+    timing = getattr(frappe.local, "custom_invoice_print_timing", None)
+    if timing is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.stages[name] = timing.stages.get(name, 0) + (time.perf_counter() - start) * 1000
+
+
+def set_value(key, value):
+    timing = getattr(frappe.local, "custom_invoice_print_timing", None)
+    if timing is not None:
+        timing.fields[key] = value
+
+
+def set_size(key, data):
+    """Record the size in bytes of HTML or PDF data, encoding text only when a request is tracked"""
+    timing = getattr(frappe.local, "custom_invoice_print_timing", None)
+    if timing is not None:
+        timing.fields[key] = len(data.encode() if isinstance(data, str) else data)
+
+
+def write_timing(timing, status):
+    stages = {name: round(ms, 2) for name, ms in timing.stages.items()}
+
+    try:
+        frappe.logger("custom_invoice.print_timing").info(json.dumps(
+            {"event": "print_multiple_copies", "status": status, "stages_ms": stages, **timing.fields},
+            default=str
+        ))
+
+        if status == "ok" and cint(frappe.conf.get("custom_invoice_print_timing_histogram")):
+            add_samples(stages)
+    except Exception:
+        # Telemetry must never fail the print itself
+        frappe.logger().error("Could not record print timings", exc_info=True)
+
+
+def add_samples(stages):
+    """Push the stage timings onto per stage Redis lists that keep the last HISTOGRAM_SAMPLES values"""
+    cache = frappe.cache()
+    pipeline = cache.pipeline()
+    for name, ms in stages.items():
+        key = cache.make_key(f"{HISTOGRAM_KEY}:{name}")
+        pipeline.lpush(key, ms)
+        pipeline.ltrim(key, 0, HISTOGRAM_SAMPLES - 1)
+    pipeline.sadd(cache.make_key(f"{HISTOGRAM_KEY}:stages"), *stages)
+    pipeline.execute()
+
+
+def get_percentile(sorted_samples, percentile):
+    """Nearest rank percentile of an ascending list"""
+    rank = max(1, -(-len(sorted_samples) * percentile // 100))
+    return sorted_samples[int(rank) - 1]
+
+
+@frappe.whitelist()
+def get_print_timing_stats():
+    """Return p50/p95/p99 and max milliseconds of every print stage over the recent samples"""
+    frappe.only_for("System Manager")
+
+    cache = frappe.cache()
+    pipeline = cache.pipeline()
+    pipeline.smembers(cache.make_key(f"{HISTOGRAM_KEY}:stages"))
+    stages = sorted(frappe.safe_decode(name) for name in pipeline.execute()[0])
+
+    for name in stages:
+        pipeline.lrange(cache.make_key(f"{HISTOGRAM_KEY}:{name}"), 0, -1)
+    samples_by_stage = pipeline.execute()
+
+    stats = {}
+    for name, values in zip(stages, samples_by_stage):
+        samples = sorted(float(value) for value in values)
+        if not samples:
+            continue
+        stats[name] = {
+            "count": len(samples),
+            "p50": get_percentile(samples, 50),
+            "p95": get_percentile(samples, 95),
+            "p99": get_percentile(samples, 99),
+            "max": samples[-1]
+        }
+
+    return stats
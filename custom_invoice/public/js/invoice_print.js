@@ -1,15 +1,105 @@
-frappe.ui.form.on('Sales Invoice', {
-    refresh: function(frm) {
-        frm.add_custom_button(__('Print Multiple Copies'), function() {
-            show_copy_dialog(frm);
-        }, __('Print'));
+// This file is loaded for both the Sales Invoice form and list view,
+// so only register the form events once
+frappe.provide("custom_invoice");
+
+if (!custom_invoice.print_form_events) {
+    custom_invoice.print_form_events = true;
+    
+    frappe.ui.form.on('Sales Invoice', {
+        refresh: function(frm) {
+            // Let item rows be entered by customer part number; the query wraps
+            // ERPNext's item query, so its filters still apply. Set on refresh:
+            // handlers here run before the form controller's onload, whose
+            // setup_queries would replace a query set in onload with ERPNext's.
+            frm.set_query('item_code', 'items', function(doc) {
+                return {
+                    query: 'custom_invoice.part_no.item_query',
+                    filters: {is_sales_item: 1, customer: doc.customer, has_variants: 0}
+                };
+            });
+            
+            frm.add_custom_button(__('Print Multiple Copies'), function() {
+                show_copy_dialog(frm);
+            }, __('Print'));
+        }
+    });
+}
+
+// Bulk printing from the Sales Invoice list. ERPNext ships its own list settings
+// for Sales Invoice, so extend them instead of replacing them.
+frappe.listview_settings['Sales Invoice'] = frappe.listview_settings['Sales Invoice'] || {};
+
+(function(settings) {
+    if (settings.custom_invoice_bulk_print) return;
+    settings.custom_invoice_bulk_print = true;
+    
+    let onload = settings.onload;
+    settings.onload = function(listview) {
+        if (onload) onload.apply(this, arguments);
+        
+        listview.page.add_actions_menu_item(__('Print Multiple Copies'), function() {
+            show_bulk_copy_dialog(listview);
+        }, false);
+    };
+})(frappe.listview_settings['Sales Invoice']);
+
+function show_bulk_copy_dialog(listview) {
+    let names = listview.get_checked_items(true);
+    if (!names.length) {
+        frappe.msgprint(__("Please select the invoices to print"));
+        return;
     }
-});
+    
+    let copy_types = ["Original", "Duplicate", "Triplicate", "Quadruplicate", "Transport"];
+    
+    let fields = copy_types.map(type => ({
+        label: type,
+        fieldname: 'copy_' + type.toLowerCase(),
+        fieldtype: 'Check',
+        default: type === "Original" ? 1 : 0
+    }));
+    
+    let d = new frappe.ui.Dialog({
+        title: __('Select Copies to Print for {0} Invoices', [names.length]),
+        fields: fields,
+        primary_action_label: __('Print'),
+        primary_action: function(values) {
+            let selected_copies = copy_types.filter(type => values['copy_' + type.toLowerCase()]);
+            
+            if (selected_copies.length === 0) {
+                frappe.msgprint(__("Please select at least one copy type"));
+                return;
+            }
+            
+            frappe.call({
+                method: "custom_invoice.api.print_controller.print_multiple_copies_bulk",
+                args: {
+                    doctype: listview.doctype,
+                    names: names,
+                    print_format: "PR Plastics Invoice",
+                    copies: selected_copies
+                },
+                callback: function(response) {
+                    if (response.message && response.message.job_id) {
+                        watch_print_job(response.message.job_id, listview.page);
+                    }
+                }
+            });
+            d.hide();
+        }
+    });
+    
+    d.show();
+}
 
 function show_copy_dialog(frm) {
     // Predefined copy types
     let copy_types = ["Original", "Duplicate", "Triplicate", "Quadruplicate", "Transport"];
     
+    // Start from the invoice's saved copies, which is also what was pre-rendered
+    // on submit, so printing them straight away is served from the PDF cache
+    let default_copies = (frm.doc.print_copies || "Original").split(",");
+    
     // Create fields for checkboxes
     let fields = [];
     
@@ -19,7 +109,7 @@ function show_copy_dialog(frm) {
             label: type,
             fieldname: 'copy_' + type.toLowerCase(),
             fieldtype: 'Check',
-            default: type === "Original" ? 1 : 0 // Default select Original
+            default: default_copies.includes(type) ? 1 : 0
         });
     });
     
@@ -36,6 +126,22 @@ function show_copy_dialog(frm) {
         default: 0
     });
     
+    fields.push({
+        label: __('Attach PDF to Invoice'),
+        fieldname: 'attach',
+        fieldtype: 'Check',
+        default: 0,
+        depends_on: 'eval:!doc.run_in_background'
+    });
+    
+    fields.push({
+        label: __('Generate in Background'),
+        fieldname: 'run_in_background',
+        fieldtype: 'Check',
+        default: 0,
+        description: __('Keep working while the PDF is generated; a link to it is shown once ready')
+    });
+    
     // Create dialog
     let d = new frappe.ui.Dialog({
         title: __('Select Copies to Print'),
@@ -65,7 +171,11 @@ function show_copy_dialog(frm) {
             }
             
             // Print copies
-            print_selected_copies(frm, selected_copies);
+            if (values.run_in_background) {
+                enqueue_selected_copies(frm, selected_copies);
+            } else {
+                print_selected_copies(frm, selected_copies, values.attach);
+            }
             d.hide();
         }
     });
@@ -73,41 +183,150 @@ function show_copy_dialog(frm) {
     d.show();
 }
 
-function print_selected_copies(frm, copies) {
+function print_selected_copies(frm, copies, attach) {
     // Use hardcoded "PR Plastics Invoice" for now for simplicity
     let print_format = "PR Plastics Invoice";
     
-    if (!frm.doc.__islocal && frm.doc.docstatus === 1) {
-        // Show loading indicator
-        frappe.dom.freeze(__('Generating PDF...'));
-        
-        frappe.call({
-            method: "custom_invoice.api.print_controller.print_multiple_copies",
-            args: {
-                doctype: frm.doctype,
-                name: frm.docname,
-                print_format: print_format,
-                copies: copies
-            },
-            callback: function(response) {
-                frappe.dom.unfreeze();
-                
-                if (response.message) {
-                    console.log("Response received:", response.message);
-                    // Open the generated PDF
-                    window.open(response.message, '_blank');
-                } else {
-                    frappe.msgprint(__("No response received from the server. Please check the error logs."));
-                }
-            },
-            error: function(xhr, status, error) {
-                frappe.dom.unfreeze();
-                console.error("Error in print_multiple_copies:", xhr, status, error);
-                frappe.msgprint(__("An error occurred while generating the PDF. Please check the console for details."));
+    if (frm.doc.__islocal || frm.doc.docstatus !== 1) {
+        frappe.msgprint(__("Please save and submit the document before printing copies."));
+        return;
+    }
+    
+    if (attach) {
+        attach_selected_copies(frm, copies, print_format);
+        return;
+    }
+    
+    // The PDF is streamed straight into the new tab, so no file URL
+    // round trip is needed. This GET is read-only; it never saves a File.
+    let query = $.param({
+        doctype: frm.doctype,
+        name: frm.docname,
+        print_format: print_format,
+        copies: JSON.stringify(copies),
+        download: 1
+    });
+    window.open('/api/method/custom_invoice.api.print_controller.print_multiple_copies?' + query, '_blank');
+}
+
+function attach_selected_copies(frm, copies, print_format) {
+    // Saving the attachment has to be a POST; open the tab now, while this is
+    // still the click, since browsers block window.open in the callback
+    let pdf_window = window.open('', '_blank');
+    
+    frappe.call({
+        method: "custom_invoice.api.print_controller.print_multiple_copies",
+        args: {
+            doctype: frm.doctype,
+            name: frm.docname,
+            print_format: print_format,
+            copies: copies
+        },
+        freeze: true,
+        freeze_message: __('Generating PDF...'),
+        callback: function(response) {
+            if (!response.message) return;
+            if (pdf_window) {
+                pdf_window.location = response.message;
+            } else {
+                frappe.msgprint(`<a href="${encodeURI(response.message)}" target="_blank" rel="noopener">${__('Open PDF')}</a>`);
             }
-        });
-    } else {
+            frm.reload_doc();
+        },
+        error: function() {
+            if (pdf_window) pdf_window.close();
+        }
+    });
+}
+
+function enqueue_selected_copies(frm, copies) {
+    let print_format = "PR Plastics Invoice";
+    
+    if (frm.doc.__islocal || frm.doc.docstatus !== 1) {
         frappe.msgprint(__("Please save and submit the document before printing copies."));
+        return;
     }
+    
+    frappe.call({
+        method: "custom_invoice.api.print_controller.print_multiple_copies",
+        args: {
+            doctype: frm.doctype,
+            name: frm.docname,
+            print_format: print_format,
+            copies: copies,
+            run_async: 1
+        },
+        callback: function(response) {
+            if (response.message && response.message.job_id) {
+                watch_print_job(response.message.job_id, frm.page, __('Print'));
+            }
+        }
+    });
 }
 
+function watch_print_job(job_id, page, group) {
+    let cancel_label = __('Cancel PDF Generation');
+    let finished = false;
+    
+    let done = function() {
+        finished = true;
+        frappe.realtime.off('custom_invoice_print_ready', on_ready);
+        frappe.realtime.off('custom_invoice_print_failed', on_failed);
+        page.remove_inner_button(cancel_label, group);
+    };
+    
+    let on_ready = function(data) {
+        if (finished || data.job_id !== job_id) return;
+        done();
+        // Browsers block window.open outside a click, so let the user open the file
+        frappe.msgprint({
+            title: __('PDF is ready'),
+            message: `<a href="${encodeURI(data.file_url)}" target="_blank" rel="noopener">${__('Open PDF')}</a>`,
+            indicator: 'green'
+        });
+        
+        if (data.failed && data.failed.length) {
+            frappe.msgprint({
+                title: __('Some documents could not be printed'),
+                message: data.failed.map(row => `<b>${row.name}</b>: ${frappe.utils.escape_html(row.error)}`).join('<br>'),
+                indicator: 'orange'
+            });
+        }
+    };
+    
+    let on_failed = function(data) {
+        if (finished || data.job_id !== job_id) return;
+        done();
+        frappe.msgprint(__("An error occurred while generating the PDF. Please check the error logs."));
+    };
+    
+    frappe.realtime.on('custom_invoice_print_ready', on_ready);
+    frappe.realtime.on('custom_invoice_print_failed', on_failed);
+    
+    frappe.show_alert({message: __('Generating PDF in the background...'), indicator: 'blue'});
+    
+    page.add_inner_button(cancel_label, function() {
+        frappe.call({
+            method: "custom_invoice.api.print_controller.cancel_print_job",
+            args: {job_id: job_id},
+            callback: function() {
+                done();
+                frappe.show_alert({message: __('PDF generation cancelled'), indicator: 'orange'});
+            }
+        });
+    }, group);
+    
+    // The job may have finished before the listeners were attached
+    frappe.call({
+        method: "custom_invoice.api.print_controller.get_print_job_status",
+        args: {job_id: job_id},
+        callback: function(response) {
+            let status = response.message && response.message.status;
+            if (status === "finished") {
+                on_ready({job_id: job_id, file_url: response.message.file_url});
+            } else if (status === "failed") {
+                on_failed({job_id: job_id});
+            }
+        }
+    });
+}
@@ -1,149 +1,256 @@
 import frappe
-from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+from frappe.custom.doctype.custom_field.custom_field import create_custom_field
 from frappe.custom.doctype.property_setter.property_setter import make_property_setter
+from frappe.utils import cint, cstr, flt
 
-def after_install():
-    """
-    Add custom fields to Sales Invoice and Item doctype, modify field labels,
-    and customize the Item table in Sales Invoice
-    """
-    custom_fields = {
-        "Sales Invoice": [
-            {
-                "fieldname": "other_details_section",
-                "label": "Other Details",
-                "fieldtype": "Section Break",
-                "insert_after": "is_debit_note",
-                "collapsible": 1
-            },
-            {
-                "fieldname": "dispatched_through",
-                "label": "Dispatched Through",
-                "fieldtype": "Data",
-                "insert_after": "other_details_section",
-                "translatable": 0,
-                "print_hide_if_no_value": 1  # Hide in print if no value
-            },
-            {
-                "fieldname": "eway_bill_no",
-                "label": "E-way Bill No.",
-                "fieldtype": "Data",
-                "insert_after": "dispatched_through",
-                "translatable": 0,
-                "print_hide_if_no_value": 1  # Hide in print if no value
-            },
-            {
-                "fieldname": "freight_charges",
-                "label": "Freight Charges",
-                "fieldtype": "Currency",
-                "insert_after": "eway_bill_no",
-                "translatable": 0,
-                "print_hide_if_no_value": 1  # Hide in print if no value
-            },
-            {
-                "fieldname": "misc_charges",
-                "label": "Miscellaneous Charges",
-                "fieldtype": "Currency",
-                "insert_after": "freight_charges",
-                "translatable": 0,
-                "print_hide_if_no_value": 1  # Hide in print if no value
-            },
-            {
-                "fieldname": "control_no_new",
-                "label": "Control No.",
-                "fieldtype": "Text Editor",  # Large text area
-                "insert_after": "misc_charges",
-                "translatable": 0,
-                "print_hide_if_no_value": 1  # Hide in print if no value
-            },
-            {
-                "fieldname": "order_details",
-                "label": "Order Details",
-                "fieldtype": "Text Editor",  # Large text area
-                "insert_after": "control_no_new",
-                "translatable": 0,
-                "print_hide_if_no_value": 1  # Hide in print if no value
-            },
-            {
-                "fieldname": "packing_details_new",
-                "label": "Packing Details",
-                "fieldtype": "Text Editor",  # Changed to Text Editor for larger text area
-                "insert_after": "order_details",
-                "translatable": 0,
-                "print_hide_if_no_value": 1  # Hide in print if no value
-            },
-            {
-                "fieldname": "print_copies",
-                "label": "Print Copies",
-                "fieldtype": "Select",
-                "options": "Original\nOriginal,Duplicate\nOriginal,Duplicate,Triplicate\nOriginal,Duplicate,Triplicate,Quadruplicate\nOriginal,Duplicate,Triplicate,Quadruplicate,Transport",
-                "default": "Original,Duplicate,Triplicate",
-                "insert_after": "other_details_section",
-                "description": "Select which copies to print"
-            }
-        ],
-        "Item": [
-            {
-                "fieldname": "customer_part_no",
-                "label": "Customer Part No.",
-                "fieldtype": "Data",
-                "insert_after": "item_code",
-                "translatable": 0,
-                "reqd": 1  # Making it mandatory
-            },
-            {
-                "fieldname": "hsn_sac",
-                "label": "HSN/SAC",
-                "fieldtype": "Data",
-                "insert_after": "customer_part_no",
-                "translatable": 0,
-                "reqd": 1  # Making it mandatory
-            }
-        ],
-        "Sales Invoice Item": [
-            {
-                "fieldname": "customer_part_no",
-                "label": "Customer Part No.",
-                "fieldtype": "Data",
-                "insert_after": "item_name",
-                "fetch_from": "item_code.customer_part_no",
-                "read_only": 1,
-                "in_list_view": 1,
-                "print_hide": 0
-            },
-            {
-                "fieldname": "hsn_sac_code",
-                "label": "HSN/SAC",
-                "fieldtype": "Data",
-                "insert_after": "customer_part_no",
-                "fetch_from": "item_code.hsn_sac",
-                "read_only": 1,
-                "in_list_view": 1,
-                "print_hide": 0
-            }
-        ]
-    }
-    
-    create_custom_fields(custom_fields)
-    
+# Custom fields added to Sales Invoice, Item and Sales Invoice Item
+CUSTOM_FIELDS = {
+    "Sales Invoice": [
+        {
+            "fieldname": "other_details_section",
+            "label": "Other Details",
+            "fieldtype": "Section Break",
+            "insert_after": "is_debit_note",
+            "collapsible": 1
+        },
+        {
+            "fieldname": "dispatched_through",
+            "label": "Dispatched Through",
+            "fieldtype": "Data",
+            "insert_after": "other_details_section",
+            "translatable": 0,
+            "print_hide_if_no_value": 1  # Hide in print if no value
+        },
+        {
+            "fieldname": "eway_bill_no",
+            "label": "E-way Bill No.",
+            "fieldtype": "Data",
+            "insert_after": "dispatched_through",
+            "translatable": 0,
+            "print_hide_if_no_value": 1  # Hide in print if no value
+        },
+        {
+            "fieldname": "freight_charges",
+            "label": "Freight Charges",
+            "fieldtype": "Currency",
+            "insert_after": "eway_bill_no",
+            "translatable": 0,
+            "print_hide_if_no_value": 1  # Hide in print if no value
+        },
+        {
+            "fieldname": "misc_charges",
+            "label": "Miscellaneous Charges",
+            "fieldtype": "Currency",
+            "insert_after": "freight_charges",
+            "translatable": 0,
+            "print_hide_if_no_value": 1  # Hide in print if no value
+        },
+        {
+            "fieldname": "control_no_new",
+            "label": "Control No.",
+            "fieldtype": "Text Editor",  # Large text area
+            "insert_after": "misc_charges",
+            "translatable": 0,
+            "print_hide_if_no_value": 1  # Hide in print if no value
+        },
+        {
+            "fieldname": "order_details",
+            "label": "Order Details",
+            "fieldtype": "Text Editor",  # Large text area
+            "insert_after": "control_no_new",
+            "translatable": 0,
+            "print_hide_if_no_value": 1  # Hide in print if no value
+        },
+        {
+            "fieldname": "packing_details_new",
+            "label": "Packing Details",
+            "fieldtype": "Text Editor",  # Changed to Text Editor for larger text area
+            "insert_after": "order_details",
+            "translatable": 0,
+            "print_hide_if_no_value": 1  # Hide in print if no value
+        },
+        {
+            "fieldname": "print_copies",
+            "label": "Print Copies",
+            "fieldtype": "Select",
+            "options": "Original\nOriginal,Duplicate\nOriginal,Duplicate,Triplicate\nOriginal,Duplicate,Triplicate,Quadruplicate\nOriginal,Duplicate,Triplicate,Quadruplicate,Transport",
+            "default": "Original,Duplicate,Triplicate",
+            "insert_after": "other_details_section",
+            "description": "Select which copies to print"
+        }
+    ],
+    "Item": [
+        {
+            "fieldname": "customer_part_no",
+            "label": "Customer Part No.",
+            "fieldtype": "Data",
+            "insert_after": "item_code",
+            "translatable": 0,
+            "reqd": 1,  # Making it mandatory
+            "unique": 1  # Items are looked up by it, see part_no.py
+        },
+        {
+            "fieldname": "hsn_sac",
+            "label": "HSN/SAC",
+            "fieldtype": "Data",
+            "insert_after": "customer_part_no",
+            "translatable": 0,
+            "reqd": 1  # Making it mandatory
+        }
+    ],
+    "Sales Invoice Item": [
+        {
+            "fieldname": "customer_part_no",
+            "label": "Customer Part No.",
+            "fieldtype": "Data",
+            "insert_after": "item_name",
+            "fetch_from": "item_code.customer_part_no",
+            "read_only": 1,
+            "in_list_view": 1,
+            "print_hide": 0,
+            "search_index": 1  # Filtered and grouped on by reports
+        },
+        {
+            "fieldname": "hsn_sac_code",
+            "label": "HSN/SAC",
+            "fieldtype": "Data",
+            "insert_after": "customer_part_no",
+            "fetch_from": "item_code.hsn_sac",
+            "read_only": 1,
+            "in_list_view": 1,
+            "print_hide": 0,
+            "search_index": 1  # Filtered and grouped on by reports
+        }
+    ]
+}
+
+
+# (doctype, fieldname, property, value, property type)
+PROPERTY_SETTERS = [
     # Change the label of item_code and item_name fields in Item doctype
-    make_property_setter("Item", "item_code", "label", "Item Code (Part No.)", "Data")
-    make_property_setter("Item", "item_name", "label", "Item Name (Part No.)", "Data")
-    
+    ("Item", "item_code", "label", "Item Code (Part No.)", "Data"),
+    ("Item", "item_name", "label", "Item Name (Part No.)", "Data"),
+
     # Change the label of item_code field in Sales Invoice Item table to "Part No."
-    make_property_setter("Sales Invoice Item", "item_code", "label", "Part No.", "Data")
-    
+    ("Sales Invoice Item", "item_code", "label", "Part No.", "Data"),
+
     # Configure which fields to show in the Item table grid view
     # We need to explicitly set which fields should be visible in the grid
-    make_property_setter("Sales Invoice Item", "item_code", "in_list_view", 1, "Check")
-    make_property_setter("Sales Invoice Item", "customer_part_no", "in_list_view", 1, "Check")
-    make_property_setter("Sales Invoice Item", "hsn_sac_code", "in_list_view", 1, "Check")
-    make_property_setter("Sales Invoice Item", "qty", "in_list_view", 1, "Check")
-    make_property_setter("Sales Invoice Item", "rate", "in_list_view", 1, "Check") 
-    make_property_setter("Sales Invoice Item", "amount", "in_list_view", 1, "Check")
-    
+    ("Sales Invoice Item", "item_code", "in_list_view", 1, "Check"),
+    ("Sales Invoice Item", "customer_part_no", "in_list_view", 1, "Check"),
+    ("Sales Invoice Item", "hsn_sac_code", "in_list_view", 1, "Check"),
+    ("Sales Invoice Item", "qty", "in_list_view", 1, "Check"),
+    ("Sales Invoice Item", "rate", "in_list_view", 1, "Check"),
+    ("Sales Invoice Item", "amount", "in_list_view", 1, "Check"),
+
     # Increase the maximum columns shown in the grid view
-    make_property_setter("Sales Invoice Item", None, "max_columns", 8, "Int")
+    ("Sales Invoice Item", None, "max_columns", 8, "Int"),
+]
+
+
+def after_install():
+    """
+    Add custom fields to Sales Invoice and Item doctype, modify field labels,
+    and customize the Item table in Sales Invoice
+    """
+    sync_customizations()
     
     frappe.msgprint("Custom fields added to Sales Invoice and Item doctype, field labels updated, and Sales Invoice Item table customized")
 
+
+def sync_customizations(custom_fields=CUSTOM_FIELDS, property_setters=PROPERTY_SETTERS):
+    """
+    Bring the custom fields and property setters in line with CUSTOM_FIELDS and PROPERTY_SETTERS
+
+    Stored values are read in one query each and only missing or different
+    records are written. Tables are altered and meta caches cleared once per
+    doctype that actually changed, so running it again on an up to date site
+    writes nothing.
+
+    Returns:
+        set: Doctypes that were changed
+    """
+    changed_fields = sync_custom_fields(custom_fields)
+    changed_setters = sync_property_setters(property_setters)
+
+    for doctype in changed_fields:
+        frappe.db.updatedb(doctype)
+
+    for doctype in changed_fields | changed_setters:
+        frappe.clear_cache(doctype=doctype)
+
+    return changed_fields | changed_setters
+
+
+def sync_custom_fields(custom_fields):
+    """Insert or update the custom fields that differ from the stored ones and return their doctypes"""
+    properties = sorted({key for fields in custom_fields.values() for df in fields for key in df})
+    stored = {
+        (row.dt, row.fieldname): row
+        for row in frappe.get_all(
+            "Custom Field",
+            filters={"dt": ["in", list(custom_fields)]},
+            fields=["name", "dt", *properties]
+        )
+    }
+
+    changed = set()
+
+    # Table changes are applied per doctype by sync_customizations, not per field
+    frappe.flags.in_create_custom_fields = True
+    try:
+        for doctype, fields in custom_fields.items():
+            for df in fields:
+                row = stored.get((doctype, df["fieldname"]))
+                if not row:
+                    create_custom_field(doctype, df)
+                elif any(values_differ(row.get(key), value) for key, value in df.items()):
+                    custom_field = frappe.get_doc("Custom Field", row.name)
+                    custom_field.update(df)
+                    custom_field.save()
+                else:
+                    continue
+                changed.add(doctype)
+    finally:
+        frappe.flags.in_create_custom_fields = False
+
+    return changed
+
+
+def sync_property_setters(property_setters):
+    """Create the property setters whose stored value differs and return their doctypes"""
+    doctypes = list({setter[0] for setter in property_setters})
+    stored = {
+        (row.doc_type, row.field_name or None, row.property): row.value
+        for row in frappe.get_all(
+            "Property Setter",
+            filters={"doc_type": ["in", doctypes]},
+            fields=["doc_type", "field_name", "property", "value"]
+        )
+    }
+
+    changed = set()
+    for doctype, fieldname, property, value, property_type in property_setters:
+        key = (doctype, fieldname, property)
+        if key in stored and not values_differ(stored[key], value):
+            continue
+
+        # Fields are validated once per doctype below instead of after every setter
+        make_property_setter(doctype, fieldname, property, value, property_type, validate_fields_for_doctype=False)
+        changed.add(doctype)
+
+    if changed:
+        from frappe.core.doctype.doctype.doctype import validate_fields_for_doctype
+        for doctype in changed:
+            validate_fields_for_doctype(doctype)
+
+    return changed
+
+
+def values_differ(stored, desired):
+    """Compare a stored value with a desired one the way they are saved (checks, ints and floats as numbers)"""
+    if isinstance(desired, float):
+        return flt(stored) != desired
+    if isinstance(desired, int):
+        return cint(stored) != desired
+    return cstr(stored) != cstr(desired)
@@ -0,0 +1,175 @@
+import re
+
+import frappe
+from frappe.utils import add_days, cint, get_datetime, now_datetime
+
+from custom_invoice import print_cache
+from custom_invoice.api.print_controller import get_copies_file_name
+
+# When a file of the same name already exists, Frappe appends the last six
+# characters of the content hash before the extension, e.g. `..._copiesab12cd.pdf`
+SUFFIX_PATTERN = r"[0-9a-f]{0,6}\.pdf"
+
+# Merged PDFs of print_multiple_copies_bulk: private and not attached to a document
+BULK_FILE_PATTERN = re.compile(r"\w+_bulk_[0-9a-z]+_copies" + SUFFIX_PATTERN)
+
+
+def cleanup_copies_files(dry_run=False):
+    """
+    Delete redundant `<doctype>_<name>_copies.pdf` attachments left by reprints
+
+    For every document the newest copies PDF, and any PDF the print cache still
+    serves, is kept. Of the others, a file is deleted when an identical one
+    (same content hash) is kept, when the document already has
+    `custom_invoice_copies_keep` newer files (default 3, 0 for no limit), or when
+    it is older than `custom_invoice_copies_retention_days` (default 30, 0 to
+    keep files of any age). Merged bulk print PDFs are deleted once they are
+    older than the same retention period.
+
+    Files are deleted in batches of `custom_invoice_copies_cleanup_batch_size`
+    (default 200) with a commit after each, so tabFile is never locked for long.
+
+    Returns:
+        dict: number of files checked, deleted (as duplicates and as old reprints)
+        and the bytes freed on disk
+    """
+    keep_count = cint(frappe.conf.get("custom_invoice_copies_keep", 3))
+    retention_days = cint(frappe.conf.get("custom_invoice_copies_retention_days", 30))
+    batch_size = cint(frappe.conf.get("custom_invoice_copies_cleanup_batch_size")) or 200
+
+    files, bulk_files = get_copies_files()
+    cutoff = add_days(now_datetime(), -retention_days) if retention_days else None
+    duplicates, old_files = get_files_to_delete(files, get_cached_files(), keep_count, cutoff)
+    old_bulk_files = [file for file in bulk_files if cutoff and get_datetime(file.creation) < cutoff]
+
+    summary = frappe._dict({
+        "checked": len(files) + len(bulk_files),
+        "duplicates": len(duplicates),
+        "old_files": len(old_files),
+        "old_bulk_files": len(old_bulk_files),
+        "deleted": 0,
+        "freed_bytes": 0,
+    })
+
+    to_delete = duplicates + old_files + old_bulk_files
+    if not dry_run:
+        for start in range(0, len(to_delete), batch_size):
+            deleted, freed_bytes = delete_files(to_delete[start:start + batch_size])
+            summary.deleted += deleted
+            summary.freed_bytes += freed_bytes
+
+    frappe.logger("custom_invoice.tasks").info(
+        f"Copies PDF cleanup{' (dry run)' if dry_run else ''}: checked {summary.checked}, "
+        f"{summary.duplicates} duplicates, {summary.old_files} old reprints and {summary.old_bulk_files} old bulk PDFs, "
+        f"deleted {summary.deleted}, freed {summary.freed_bytes} bytes"
+    )
+    return summary
+
+
+def get_copies_files():
+    """
+    Return the PDFs generated by print_multiple_copies
+
+    Returns:
+        tuple: (files attached to their document, merged bulk print files), newest first
+    """
+    files = frappe.get_all(
+        "File",
+        filters={"file_name": ["like", "%\\_copies%.pdf"], "is_folder": 0},
+        fields=["name", "file_name", "file_url", "file_size", "content_hash", "attached_to_doctype", "attached_to_name", "creation"],
+        order_by="creation desc",
+    )
+
+    # The LIKE filter also matches user uploads such as `Delivery_copies.pdf`
+    attached = [file for file in files if is_document_copies_file(file)]
+    bulk = [
+        file for file in files
+        if not file.attached_to_doctype and BULK_FILE_PATTERN.fullmatch(file.file_name)
+    ]
+    return attached, bulk
+
+
+def is_document_copies_file(file):
+    if not (file.attached_to_doctype and file.attached_to_name):
+        return False
+
+    base_name = get_copies_file_name(file.attached_to_doctype, file.attached_to_name)[:-len(".pdf")]
+    return bool(re.fullmatch(re.escape(base_name) + SUFFIX_PATTERN, file.file_name))
+
+
+def get_cached_files():
+    """Names of the Files the PDF cache still points at"""
+    return {entry["file"] for entry in print_cache.get_entries().values()}
+
+
+def get_files_to_delete(files, protected, keep_count, cutoff=None):
+    """
+    Pick the files to delete, grouped per document
+
+    Args:
+        files: copies PDFs, newest first
+        protected: names of files that must not be deleted
+        keep_count: files to keep per document, 0 for no limit
+        cutoff: files created before this datetime may be deleted
+
+    Returns:
+        tuple: (duplicates, old_files) lists of files
+    """
+    files_by_document = {}
+    for file in files:
+        files_by_document.setdefault((file.attached_to_doctype, file.attached_to_name), []).append(file)
+
+    duplicates = []
+    old_files = []
+    for document_files in files_by_document.values():
+        # Protected files first so they, rather than a newer copy of the same
+        # content, are the ones kept
+        document_files.sort(key=lambda file: file.name not in protected)
+
+        kept_hashes = set()
+        kept = 0
+        for file in document_files:
+            if file.name in protected or not kept:
+                pass
+            elif file.content_hash and file.content_hash in kept_hashes:
+                duplicates.append(file)
+                continue
+            elif (keep_count and kept >= keep_count) or (cutoff and get_datetime(file.creation) < cutoff):
+                old_files.append(file)
+                continue
+
+            kept += 1
+            if file.content_hash:
+                kept_hashes.add(file.content_hash)
+
+    return duplicates, old_files
+
+
+def delete_files(files):
+    """
+    Delete a batch of Files and commit
+
+    Frappe stores byte-identical uploads once on disk, so a file only frees space
+    when no remaining File points at its URL.
+
+    Returns:
+        tuple: (number of deleted files, bytes freed on disk)
+    """
+    deleted = []
+    for file in files:
+        frappe.db.savepoint("copies_cleanup")
+        try:
+            frappe.delete_doc("File", file.name, ignore_permissions=True, delete_permanently=True)
+            deleted.append(file)
+        except Exception:
+            frappe.db.rollback(save_point="copies_cleanup")
+            frappe.log_error(title="Copies PDF Cleanup Error", reference_doctype="File", reference_name=file.name)
+
+    frappe.db.commit()
+
+    sizes = {file.file_url: cint(file.file_size) for file in deleted if file.file_url}
+    freed_bytes = sum(
+        size for file_url, size in sizes.items()
+        if not frappe.db.exists("File", {"file_url": file_url})
+    )
+    return len(deleted), freed_bytes
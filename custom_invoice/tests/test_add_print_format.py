@@ -0,0 +1,62 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from custom_invoice.add_print_format import (
+    SYNCED_HASH_KEY,
+    add_print_format,
+    get_print_format_status,
+    get_template_html,
+)
+from custom_invoice.print_template import PRINT_FORMAT, get_html_hash
+
+
+class TestAddPrintFormat(FrappeTestCase):
+    def setUp(self):
+        self.addCleanup(self.restore_template)
+
+    def restore_template(self):
+        # add_print_format commits, so put back the shipped template for the other tests
+        add_print_format()
+        frappe.db.set_value("Print Format", PRINT_FORMAT, "html", get_template_html())
+        frappe.db.set_global(SYNCED_HASH_KEY, get_html_hash(get_template_html()))
+        frappe.db.commit()
+
+    def test_up_to_date_after_sync(self):
+        add_print_format()
+        self.assertFalse(get_print_format_status()["stale"])
+
+    def test_second_sync_does_not_save(self):
+        add_print_format()
+        with patch.object(frappe, "get_doc") as get_doc, patch.object(frappe, "new_doc") as new_doc:
+            add_print_format()
+
+        get_doc.assert_not_called()
+        new_doc.assert_not_called()
+
+    def test_ui_edit_survives_migrate(self):
+        add_print_format()
+        edited_html = get_template_html() + "<!-- edited in the UI -->"
+        frappe.db.set_value("Print Format", PRINT_FORMAT, "html", edited_html)
+
+        status = get_print_format_status()
+        self.assertFalse(status["stale"])
+        self.assertTrue(status["edited"])
+
+        add_print_format()
+        self.assertEqual(frappe.db.get_value("Print Format", PRINT_FORMAT, "html"), edited_html)
+
+    def test_changed_template_replaces_ui_edit(self):
+        add_print_format()
+        frappe.db.set_value("Print Format", PRINT_FORMAT, "html", "<p>edited in the UI</p>")
+
+        new_html = get_template_html() + "<!-- new template -->"
+        with patch("custom_invoice.add_print_format.get_template_html", return_value=new_html):
+            status = get_print_format_status()
+            self.assertTrue(status["stale"])
+            self.assertTrue(status["edited"])
+            add_print_format()
+
+        self.assertEqual(frappe.db.get_value("Print Format", PRINT_FORMAT, "html"), new_html)
+        self.assertEqual(frappe.db.get_global(SYNCED_HASH_KEY), get_html_hash(new_html))
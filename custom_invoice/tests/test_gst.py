@@ -0,0 +1,103 @@
+import io
+import json
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from custom_invoice.custom_invoice.report.hsn_wise_sales_summary.hsn_wise_sales_summary import execute
+from custom_invoice.gst import export_gstr1
+
+COMPANY = "_Test GST Export Company"
+MONTH = "2000-03"
+PREFIX = "GSTTEST-"
+
+# Invoice rows without a code of their own take this Item's
+ITEM_CODE = "GSTTEST-ITEM"
+ITEM_HSN = "39239090"
+
+# name, GSTIN, freight, misc, [(hsn, qty, amount)], CGST, SGST
+INVOICES = [
+    ("GSTTEST-0001", "33AAAAA0000A1Z5", 150, 25.5, [("39269099", 10, 1000), ("39231090", 5, 333.33)], 135.5, 135.5),
+    ("GSTTEST-0002", "33BBBBB0000B1Z5", 0, 80, [("39269099", 3, 450.25), ("39269099", 7, 99.99), ("", 4, 120)], 56.5, 56.5),
+    ("GSTTEST-0003", "29CCCCC0000C1Z5", 12.75, 0, [("39231090", 1, 10), ("84779000", 2, 2200)], 0, 0),
+]
+
+
+class TestGstr1Export(FrappeTestCase):
+    def setUp(self):
+        self.addCleanup(self.delete_invoices)
+
+        frappe.db.bulk_insert("Item", ["name", "item_code", "item_name", "hsn_sac"], [(ITEM_CODE, ITEM_CODE, ITEM_CODE, ITEM_HSN)])
+
+        for name, gstin, freight, misc, items, cgst, sgst in INVOICES:
+            total = sum(amount for hsn, qty, amount in items)
+            frappe.db.bulk_insert(
+                "Sales Invoice",
+                ["name", "company", "posting_date", "docstatus", "is_return", "customer_name", "tax_id",
+                    "total", "grand_total", "freight_charges", "misc_charges"],
+                [(name, COMPANY, f"{MONTH}-10", 1, 0, name, gstin, total, total + freight + misc + cgst + sgst, freight, misc)],
+            )
+            frappe.db.bulk_insert(
+                "Sales Invoice Item",
+                ["name", "parent", "parenttype", "parentfield", "idx", "item_code", "hsn_sac_code", "uom", "qty", "amount"],
+                [
+                    (f"{name}-{idx}", name, "Sales Invoice", "items", idx, ITEM_CODE, hsn, "Nos", qty, amount)
+                    for idx, (hsn, qty, amount) in enumerate(items, 1)
+                ],
+            )
+            frappe.db.bulk_insert(
+                "Sales Taxes and Charges",
+                ["name", "parent", "parenttype", "parentfield", "idx", "description", "rate", "tax_amount"],
+                [
+                    (f"{name}-CGST", name, "Sales Invoice", "taxes", 1, "CGST @ 9.0", 9, cgst),
+                    (f"{name}-SGST", name, "Sales Invoice", "taxes", 2, "SGST @ 9.0", 9, sgst),
+                ],
+            )
+
+    def delete_invoices(self):
+        for doctype, column in (("Sales Invoice Item", "parent"), ("Sales Taxes and Charges", "parent"), ("Sales Invoice", "name")):
+            frappe.db.sql(f"delete from `tab{doctype}` where `{column}` like %s", PREFIX + "%")
+        frappe.db.sql("delete from `tabItem` where name = %s", ITEM_CODE)
+
+    def export(self, section):
+        f = io.StringIO()
+        export_gstr1(f, MONTH, section=section, company=COMPANY)
+        return json.loads(f.getvalue())
+
+    def test_hsn_section_adds_up_to_b2b(self):
+        b2b = [
+            item["itm_det"]
+            for recipient in self.export("b2b")["b2b"]
+            for invoice in recipient["inv"]
+            for item in invoice["itms"]
+        ]
+        hsn = self.export("hsn")["hsn"]["data"]
+
+        taxable_value = sum(
+            sum(amount for _, _, amount in items) + freight + misc
+            for _, _, freight, misc, items, _, _ in INVOICES
+        )
+
+        # Each section rounds per row, so allow a cent per row
+        for key in ("txval", "camt", "samt", "iamt"):
+            self.assertAlmostEqual(sum(row[key] for row in hsn), sum(row[key] for row in b2b), delta=0.01 * len(hsn))
+        self.assertAlmostEqual(sum(row["txval"] for row in b2b), taxable_value, places=2)
+
+    def test_charges_are_spread_over_items(self):
+        hsn = {row["hsn_sc"]: row for row in self.export("hsn")["hsn"]["data"]}
+
+        # 84779000 is only on GSTTEST-0003: 2200 of its 2210, plus that share of 12.75 freight
+        self.assertAlmostEqual(hsn["84779000"]["txval"], flt(2200 + 12.75 * 2200 / 2210, 2), places=2)
+
+    def test_report_matches_hsn_section(self):
+        hsn = {row["hsn_sc"]: row for row in self.export("hsn")["hsn"]["data"]}
+        filters = {"company": COMPANY, "from_date": f"{MONTH}-01", "to_date": f"{MONTH}-31"}
+        report = {row.hsn_sac_code: row for row in execute(filters)[1]}
+
+        # The row without a code of its own is summed under its Item's code
+        self.assertIn(ITEM_HSN, report)
+        self.assertEqual(set(report), set(hsn))
+        for code, row in hsn.items():
+            self.assertAlmostEqual(flt(report[code].taxable_value), row["txval"], places=2)
+            self.assertAlmostEqual(flt(report[code].cgst_amount), row["camt"], places=2)
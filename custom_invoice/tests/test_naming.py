@@ -0,0 +1,89 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from custom_invoice.naming import close_series_connection
+from custom_invoice.utils import custom_invoice_naming
+
+# A month no real invoice is posted in, so the series starts at 1
+POSTING_DATE = "2000-02-01"
+PREFIX = "PRP-200002-"
+
+WORKERS = 4
+INVOICES_PER_WORKER = 25
+BLOCK_SIZE = 5
+
+
+def insert_invoices(site, sites_path, mode, count):
+    """Insert `count` bare Sales Invoices named by the custom naming in `mode`, one commit each"""
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    try:
+        frappe.local.conf.custom_invoice_naming_mode = mode
+        frappe.local.conf.custom_invoice_naming_block_size = BLOCK_SIZE
+
+        names = []
+        for _ in range(count):
+            doc = frappe.new_doc("Sales Invoice")
+            doc.posting_date = POSTING_DATE
+            custom_invoice_naming(doc)
+            # Skip validation, only the name and the insert transaction matter here
+            doc.db_insert()
+            frappe.db.commit()
+            names.append(doc.name)
+        return names
+    finally:
+        close_series_connection()
+        frappe.destroy()
+
+
+class TestConcurrentNaming(FrappeTestCase):
+    def setUp(self):
+        self.delete_test_invoices()
+        self.addCleanup(self.delete_test_invoices)
+
+    def delete_test_invoices(self):
+        frappe.db.sql("delete from `tabSales Invoice` where name like %s", PREFIX + "%")
+        frappe.db.sql("delete from `tabSeries` where name = %s", PREFIX)
+        frappe.db.commit()
+
+    def insert_in_workers(self, mode):
+        """Insert invoices from parallel worker processes and return the names per worker"""
+        # Spawned like the bulk print workers, so no database connection is shared
+        pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        with pool:
+            return list(pool.map(
+                partial(insert_invoices, frappe.local.site, frappe.local.sites_path, mode),
+                [INVOICES_PER_WORKER] * WORKERS,
+            ))
+
+    def assert_unique(self, names_per_worker):
+        names = [name for names in names_per_worker for name in names]
+        self.assertEqual(len(names), WORKERS * INVOICES_PER_WORKER)
+        self.assertEqual(len(set(names)), len(names))
+        self.assertTrue(all(name.startswith(PREFIX) for name in names))
+
+        numbers = [int(name[len(PREFIX):]) for name in names]
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertEqual(frappe.db.count("Sales Invoice", {"name": ["like", PREFIX + "%"]}), len(names))
+        return sorted(numbers)
+
+    def test_separate_mode_is_unique_and_gapless(self):
+        names = self.insert_in_workers("separate")
+        numbers = self.assert_unique(names)
+
+        # Nothing was rolled back, so no number is lost
+        self.assertEqual(numbers, list(range(1, len(numbers) + 1)))
+
+    def test_block_mode_is_unique(self):
+        names = self.insert_in_workers("block")
+        numbers = self.assert_unique(names)
+
+        # Each worker takes whole blocks, the last one of a worker may be partly unused
+        self.assertLessEqual(max(numbers), WORKERS * (INVOICES_PER_WORKER + BLOCK_SIZE))
+        for worker_names in names:
+            worker_numbers = [int(name[len(PREFIX):]) for name in worker_names]
+            self.assertEqual(worker_numbers, sorted(worker_numbers))
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+import frappe
+from click.testing import CliRunner
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import get_url
+
+from custom_invoice import commands, pdf_engine, pdf_pool
+
+
+class TestPdfPool(FrappeTestCase):
+    def test_command_passes_chromium_settings(self):
+        with patch.object(pdf_pool, "serve") as serve, \
+                patch.object(pdf_engine, "find_chromium_binary", return_value="/opt/chromium/chrome"):
+            result = CliRunner().invoke(commands.start_pdf_pool, ["--engine", "chromium", "--size", "1"])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(serve.call_args.kwargs["settings"]["chromium_path"], "/opt/chromium/chrome")
+        self.assertEqual(serve.call_args.kwargs["settings"]["chromium_args"], [])
+
+    @unittest.skipUnless(pdf_engine.find_chromium_binary(), "Chromium is not installed")
+    def test_pool_started_by_command_renders(self):
+        socket_path = os.path.join(tempfile.mkdtemp(prefix="custom_invoice_pool_"), "pool.sock")
+
+        # The command serves until the process exits, so run it in a daemon thread
+        threading.Thread(
+            target=commands.start_pdf_pool.callback,
+            kwargs={"engine": "chromium", "size": 1, "socket_path": socket_path},
+            daemon=True,
+        ).start()
+
+        deadline = time.monotonic() + 60
+        while not os.path.exists(socket_path) and time.monotonic() < deadline:
+            time.sleep(0.2)
+        self.assertTrue(os.path.exists(socket_path), "The pool did not start listening")
+
+        with patch.dict(frappe.conf, {"custom_invoice_pdf_pool_socket": socket_path}):
+            pdf = pdf_pool.render("chromium", "<html><body>Pool test</body></html>", {}, get_url())
+
+        self.assertTrue(pdf.startswith(b"%PDF"))
+
+    def test_dead_renderer_is_reported_unavailable(self):
+        pool = pdf_pool.RendererPool("chromium", 1, 10, {"chromium_path": "/nonexistent/chromium"})
+        try:
+            response = pdf_pool.get_response(
+                pool, {"engine": "chromium", "html": "<p>x</p>", "options": {}, "base_url": ""}, max_queue=4
+            )
+        finally:
+            pool.stop()
+
+        self.assertEqual(response["status"], "unavailable")
+
+    def test_unavailable_pool_falls_back_to_direct_render(self):
+        conn = MagicMock()
+        conn.poll.return_value = True
+        conn.recv.return_value = {"status": "unavailable", "error": "EOFError()"}
+        direct_render = MagicMock(return_value=b"%PDF-direct")
+
+        with patch.object(pdf_pool, "Client", return_value=conn), \
+                patch.dict(pdf_engine.ENGINES, {"chromium": direct_render}), \
+                patch.dict(frappe.conf, {"custom_invoice_pdf_pool": 1}):
+            pdf = pdf_engine.get_pdf("<p>x</p>", {}, engine="chromium")
+
+        self.assertEqual(pdf, b"%PDF-direct")
+        direct_render.assert_called_once()
@@ -0,0 +1,40 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from custom_invoice import print_cache
+
+
+class TestPrintCacheInvalidation(FrappeTestCase):
+    def setUp(self):
+        # Keep the entries apart from the site's real cache
+        cache_key = patch.object(print_cache, "CACHE_KEY", "custom_invoice_pdf_cache_test")
+        cache_key.start()
+        self.addCleanup(cache_key.stop)
+        self.addCleanup(frappe.cache().delete_value, print_cache.CACHE_KEY)
+
+        for name in ("SINV-TEST-0001", "SINV-TEST-0001-1", "SINV-TEST-0002"):
+            frappe.cache().hset(print_cache.CACHE_KEY, f"key-{name}", {
+                "file": f"file-{name}", "file_url": "", "size": 0, "doctype": "Sales Invoice",
+                "name": name, "print_format": "Standard", "last_access": 0,
+            })
+
+    def test_insert_without_amended_from_skips_the_cache(self):
+        doc = frappe._dict(doctype="Sales Invoice", name="SINV-TEST-0003", amended_from=None)
+        with patch.object(print_cache, "get_entries") as get_entries:
+            print_cache.invalidate_amended_from(doc)
+
+        get_entries.assert_not_called()
+
+    def test_amendment_drops_only_the_amended_document(self):
+        doc = frappe._dict(doctype="Sales Invoice", name="SINV-TEST-0001-1", amended_from="SINV-TEST-0001")
+        print_cache.invalidate_amended_from(doc)
+
+        self.assertEqual(sorted(print_cache.get_entries()), ["key-SINV-TEST-0001-1", "key-SINV-TEST-0002"])
+
+    def test_cancel_drops_the_document(self):
+        doc = frappe._dict(doctype="Sales Invoice", name="SINV-TEST-0002", amended_from=None)
+        print_cache.invalidate_document(doc)
+
+        self.assertEqual(sorted(print_cache.get_entries()), ["key-SINV-TEST-0001", "key-SINV-TEST-0001-1"])
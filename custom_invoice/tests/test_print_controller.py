@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from custom_invoice.api import print_controller
+
+PRINT_HTML = """
+<html><body>
+<table><tr><td id="copy-type-label"><!--copy-type-label-->Original<!--/copy-type-label--></td></tr></table>
+<p>Invoice body</p>
+</body></html>
+"""
+
+THREE_COPIES = ["Original", "Duplicate", "Triplicate"]
+FIVE_COPIES = ["Original", "Duplicate", "Triplicate", "Quadruplicate", "Extra Copy"]
+
+PAGE_BREAK = '<div style="page-break-after: always;"></div>'
+
+
+class TestPrintMultipleCopies(FrappeTestCase):
+    def get_copies_html(self, copies, **kwargs):
+        """Run get_copies_pdf with the print and PDF conversion patched, return the get_print mock and the HTML sent to get_pdf"""
+        with patch.object(frappe, "get_print", return_value=PRINT_HTML) as get_print, \
+                patch.object(print_controller, "get_pdf", return_value=b"%PDF-1.4") as get_pdf:
+            pdf = print_controller.get_copies_pdf("Sales Invoice", "SINV-TEST-0001", "Standard", copies, stamp_labels=0, **kwargs)
+
+        self.assertEqual(pdf, b"%PDF-1.4")
+        get_pdf.assert_called_once()
+        return get_print, get_pdf.call_args.args[0]
+
+    def assert_one_label_per_copy(self, html, copies):
+        self.assertEqual(html.count(PAGE_BREAK), len(copies) - 1)
+        for copy_type, copy_html in zip(copies, html.split(PAGE_BREAK)):
+            self.assertEqual(copy_html.count("<!--copy-type-label-->"), 1)
+            self.assertIn(f"<!--copy-type-label-->{copy_type}<!--/copy-type-label-->", copy_html)
+        for copy_type in copies:
+            self.assertEqual(html.count(f">{copy_type}<"), 1)
+
+    def test_three_copies_render_once(self):
+        get_print, html = self.get_copies_html(THREE_COPIES)
+
+        get_print.assert_called_once()
+        self.assert_one_label_per_copy(html, THREE_COPIES)
+
+    def test_five_copies_render_once(self):
+        get_print, html = self.get_copies_html(FIVE_COPIES, letterhead="Test Letter Head")
+
+        get_print.assert_called_once()
+        self.assertEqual(get_print.call_args.kwargs["letterhead"], "Test Letter Head")
+        self.assert_one_label_per_copy(html, FIVE_COPIES)
+
+    def test_download_renders_once(self):
+        with patch.object(frappe, "get_print", return_value=PRINT_HTML) as get_print, \
+                patch.object(print_controller, "get_pdf", return_value=b"%PDF-1.4") as get_pdf:
+            print_controller.print_multiple_copies(
+                "Sales Invoice", "SINV-TEST-0001", print_format="Standard",
+                copies=frappe.as_json(FIVE_COPIES), stamp_labels=0, download=1,
+            )
+
+        get_print.assert_called_once()
+        self.assertEqual(frappe.local.response.filecontent, b"%PDF-1.4")
+        self.assert_one_label_per_copy(get_pdf.call_args.args[0], FIVE_COPIES)
+
+    def test_get_request_cannot_attach(self):
+        with patch.object(frappe.local, "request", frappe._dict(method="GET"), create=True), \
+                patch.object(print_controller, "get_copies_pdf") as get_copies_pdf:
+            self.assertRaises(
+                frappe.PermissionError, print_controller.print_multiple_copies,
+                "Sales Invoice", "SINV-TEST-0001", print_format="Standard", download=1, attach=1,
+            )
+
+        get_copies_pdf.assert_not_called()
@@ -0,0 +1,45 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from custom_invoice import print_template
+
+PRINT_FORMAT = "Custom Invoice Template Cache Test"
+
+
+class TestTemplateCache(FrappeTestCase):
+    def setUp(self):
+        frappe.cache().hdel(print_template.HASH_CACHE_KEY, PRINT_FORMAT)
+        self.addCleanup(frappe.cache().hdel, print_template.HASH_CACHE_KEY, PRINT_FORMAT)
+        self.addCleanup(print_template.compiled_templates.pop, (frappe.local.site, PRINT_FORMAT), None)
+
+    def get_template(self, html):
+        with patch.object(frappe.db, "get_value", return_value=html):
+            return print_template.get_template(PRINT_FORMAT)
+
+    def test_reader_does_not_publish_hash(self):
+        self.assertEqual(self.get_template("<p>old</p>").render(), "<p>old</p>")
+        self.assertIsNone(frappe.cache().hget(print_template.HASH_CACHE_KEY, PRINT_FORMAT))
+
+    def test_edit_publishes_hash_after_commit(self):
+        doc = frappe._dict(name=PRINT_FORMAT, html="<p>new</p>")
+        with patch.object(frappe.db, "after_commit") as after_commit:
+            print_template.clear_template_cache(doc)
+
+        self.assertIsNone(frappe.cache().hget(print_template.HASH_CACHE_KEY, PRINT_FORMAT))
+
+        after_commit.add.call_args.args[0]()
+        self.assertEqual(frappe.cache().hget(print_template.HASH_CACHE_KEY, PRINT_FORMAT), print_template.get_html_hash(doc.html))
+
+    def test_read_racing_an_edit_is_recompiled(self):
+        # A reader fetched the old HTML while the edit was not yet committed
+        self.get_template("<p>old</p>")
+
+        with patch.object(frappe.db, "after_commit") as after_commit:
+            print_template.clear_template_cache(frappe._dict(name=PRINT_FORMAT, html="<p>new</p>"))
+        after_commit.add.call_args.args[0]()
+
+        # Only the committed edit's hash is published, so the next read picks up the new HTML
+        self.assertEqual(self.get_template("<p>new</p>").render(), "<p>new</p>")
+        self.assertEqual(self.get_template("<p>ignored</p>").render(), "<p>new</p>")
@@ -0,0 +1,84 @@
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, now_datetime
+
+from custom_invoice.api.print_controller import get_copies_file_name
+from custom_invoice.tasks import cleanup_copies_files
+
+
+class TestCleanupCopiesFiles(FrappeTestCase):
+    def setUp(self):
+        # Any document will do as the attachment target; copies files are named after it
+        self.document = frappe.get_doc({"doctype": "ToDo", "description": "Copies PDF cleanup test"}).insert()
+        self.addCleanup(self.delete_test_files)
+
+    def delete_test_files(self):
+        for name in frappe.get_all("File", {"file_name": ["like", "%test-cleanup%"]}, pluck="name"):
+            frappe.delete_doc("File", name, ignore_permissions=True, delete_permanently=True)
+        for name in frappe.get_all("File", {"attached_to_name": self.document.name}, pluck="name"):
+            frappe.delete_doc("File", name, ignore_permissions=True, delete_permanently=True)
+        frappe.delete_doc("ToDo", self.document.name, ignore_permissions=True, force=True)
+        frappe.db.commit()
+
+    def make_file(self, content, days_old=0, file_name=None, attached=True, is_private=0):
+        file = frappe.get_doc({
+            "doctype": "File",
+            "file_name": file_name or get_copies_file_name("ToDo", self.document.name),
+            "is_private": is_private,
+            "attached_to_doctype": "ToDo" if attached else None,
+            "attached_to_name": self.document.name if attached else None,
+            "content": content,
+        }).insert(ignore_permissions=True)
+
+        if days_old:
+            frappe.db.set_value("File", file.name, "creation", add_days(now_datetime(), -days_old), update_modified=False)
+        return file
+
+    def cleanup(self, keep=3, retention_days=30):
+        with patch.dict(frappe.conf, {
+            "custom_invoice_copies_keep": keep,
+            "custom_invoice_copies_retention_days": retention_days,
+        }):
+            return cleanup_copies_files()
+
+    def test_reprints_with_suffixed_names_are_pruned(self):
+        files = [self.make_file(f"%PDF reprint {index}".encode(), days_old=3 - index) for index in range(3)]
+
+        # Frappe renames a new file whose name is taken by different content
+        self.assertNotEqual(files[1].file_name, files[0].file_name)
+
+        summary = self.cleanup(keep=1, retention_days=0)
+
+        self.assertEqual(summary.old_files, 2)
+        self.assertTrue(frappe.db.exists("File", files[2].name))
+        self.assertFalse(frappe.db.exists("File", files[1].name))
+        self.assertFalse(frappe.db.exists("File", files[0].name))
+
+    def test_identical_reprints_are_deduplicated(self):
+        older = self.make_file(b"%PDF same content", days_old=1)
+        newer = self.make_file(b"%PDF same content")
+
+        summary = self.cleanup()
+
+        self.assertEqual(summary.duplicates, 1)
+        self.assertTrue(frappe.db.exists("File", newer.name))
+        self.assertFalse(frappe.db.exists("File", older.name))
+
+    def test_old_bulk_pdfs_are_pruned(self):
+        old = self.make_file(b"%PDF old bulk", days_old=40, file_name="ToDo_bulk_0a1b2c3d_copies.pdf", attached=False, is_private=1)
+        recent = self.make_file(b"%PDF recent bulk", file_name="ToDo_bulk_4e5f6a7b_copies.pdf", attached=False, is_private=1)
+
+        self.cleanup()
+
+        self.assertFalse(frappe.db.exists("File", old.name))
+        self.assertTrue(frappe.db.exists("File", recent.name))
+
+    def test_other_files_are_kept(self):
+        upload = self.make_file(b"%PDF user upload", days_old=40, file_name="Delivery_test-cleanup_copies.pdf")
+        self.make_file(b"%PDF newest copies")
+
+        self.cleanup(keep=1, retention_days=1)
+
+        self.assertTrue(frappe.db.exists("File", upload.name))
@@ -0,0 +1,63 @@
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from custom_invoice.utils import set_description_of_goods
+
+
+class Invoice:
+    """Just what the hook reads of a Sales Invoice; `items` cannot be a frappe._dict key"""
+
+    def __init__(self, items, previous=None):
+        self.items = items
+        self.previous = previous
+
+    def get_doc_before_save(self):
+        return self.previous
+
+
+def make_invoice(rows, previous_rows=None):
+    items = [frappe._dict(row) for row in rows]
+    previous = Invoice(items=[frappe._dict(row) for row in previous_rows]) if previous_rows is not None else None
+    return Invoice(items=items, previous=previous)
+
+
+class TestSetDescriptionOfGoods(FrappeTestCase):
+    def test_empty_field_is_filled_as_text(self):
+        doc = make_invoice([{"name": "row1", "item_code": "ITEM-1", "description": "<p>PP &amp; HDPE</p>", "description_of_goods": None}])
+        set_description_of_goods(doc)
+
+        self.assertEqual(doc.items[0].description_of_goods, "PP & HDPE")
+
+    def test_typed_description_of_new_document_is_kept(self):
+        # New invoices, amendments and duplicates have no saved version
+        doc = make_invoice([{"name": None, "item_code": "ITEM-1", "description": "<p>Cap</p>", "description_of_goods": "Typed by hand"}])
+        set_description_of_goods(doc)
+
+        self.assertEqual(doc.items[0].description_of_goods, "Typed by hand")
+
+    def test_new_row_of_saved_document_is_kept(self):
+        doc = make_invoice(
+            [{"name": "new-row", "item_code": "ITEM-2", "description": "Lid", "description_of_goods": "Typed by hand"}],
+            previous_rows=[{"name": "row1", "item_code": "ITEM-1"}],
+        )
+        set_description_of_goods(doc)
+
+        self.assertEqual(doc.items[0].description_of_goods, "Typed by hand")
+
+    def test_changed_item_is_refilled(self):
+        doc = make_invoice(
+            [{"name": "row1", "item_code": "ITEM-2", "description": "Lid", "description_of_goods": "Cap"}],
+            previous_rows=[{"name": "row1", "item_code": "ITEM-1"}],
+        )
+        set_description_of_goods(doc)
+
+        self.assertEqual(doc.items[0].description_of_goods, "Lid")
+
+    def test_unchanged_item_keeps_edit(self):
+        doc = make_invoice(
+            [{"name": "row1", "item_code": "ITEM-1", "description": "Cap", "description_of_goods": "Cap, blue"}],
+            previous_rows=[{"name": "row1", "item_code": "ITEM-1"}],
+        )
+        set_description_of_goods(doc)
+
+        self.assertEqual(doc.items[0].description_of_goods, "Cap, blue")
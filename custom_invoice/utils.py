@@ -1,62 +1,136 @@
 import frappe
-from frappe.model.naming import make_autoname
-from datetime import datetime
+import html
+import re
+from decimal import Context, Decimal, ROUND_HALF_UP
+
+from custom_invoice.naming import get_invoice_name
+
+HTML_TAG_PATTERN = re.compile(r"<[^>]*>")
 
 def custom_invoice_naming(doc, method=None):
     if doc.doctype == "Sales Invoice" and not doc.name:
-        # Get current date in YYYYMM format
-        date_str = datetime.now().strftime("%Y%m")
-        # Construct series prefix
-        series_prefix = f"PRP-{date_str}-"
-        # Now call make_autoname with prefix and series part separated
-        doc.name = make_autoname(series_prefix + ".####")
+        # PRP-YYYYMM-#### for the month of the posting date, see custom_invoice.naming
+        doc.name = get_invoice_name(doc)
+
+
+def set_description_of_goods(doc, method=None):
+    """
+    Fill `description_of_goods` of the invoice items with their description as plain text
+    
+    Runs on validate for all rows at once. A row is filled when the field is
+    empty or its item changed since the last save, so descriptions typed by hand
+    are kept, including those of new rows, amendments and duplicated invoices.
+    """
+    previous = doc.get_doc_before_save()
+    previous_items = {row.name: row.item_code for row in previous.items} if previous else {}
+    
+    # Rows of the same item share a description, convert each text only once
+    texts = {}
+    for row in doc.items:
+        if not row.description:
+            continue
+        # Rows without a saved version keep what they were created with
+        item_changed = row.name in previous_items and previous_items[row.name] != row.item_code
+        if row.description_of_goods and not item_changed:
+            continue
+        
+        if row.description not in texts:
+            texts[row.description] = html_to_text(row.description)
+        row.description_of_goods = texts[row.description]
+
+
+def html_to_text(value):
+    """Strip the tags and unescape the entities of an HTML fragment, like the browser's textContent"""
+    if not value:
+        return ""
+    if "<" not in value and "&" not in value:
+        return value
+    return html.unescape(HTML_TAG_PATTERN.sub("", value))
 
 
 def format_indian_number(number, decimal_places=2):
     """
     Format a number in Indian style with commas (e.g., 10,00,000.00)
     
+    Rounds half away from zero on the decimal value, so 2.675 gives 2.68.
+    
     Args:
-        number: The number to format
+        number: The number to format (int, float, Decimal or numeric string)
         decimal_places: Number of decimal places to show
     
     Returns:
         String: Formatted number with Indian style commas
     """
-    try:
-        number = float(number)
-    except (ValueError, TypeError):
-        number = 0
-    
-    # Format with specified decimal places
-    number_str = '{:.{decimal}f}'.format(number, decimal=decimal_places)
-    
-    # Split integer and decimal parts
-    parts = number_str.split('.')
-    integer_part = parts[0]
-    decimal_part = parts[1] if len(parts) > 1 else ''
-    
-    # Add commas
-    result = ''
-    # First add comma after first 3 digits from right
-    if len(integer_part) > 3:
-        result = ',' + integer_part[-3:]
-        integer_part = integer_part[:-3]
-        # Then add commas after every 2 digits
-        while len(integer_part) > 0:
-            group = integer_part[-2:] if len(integer_part) >= 2 else integer_part
-            result = ',' + group + result
-            integer_part = integer_part[:-len(group)]
-        # Remove leading comma
-        result = result[1:]
-    else:
-        result = integer_part
-    
-    # Add decimal part if needed
-    if decimal_places > 0:
-        return result + '.' + decimal_part
-    return result
+    return _format_indian_number(number, int(decimal_places))
+
+def format_indian_numbers(numbers, decimal_places=2):
+    """Format a whole column of numbers in Indian style, see `format_indian_number`"""
+    decimal_places = int(decimal_places)
+    return [_format_indian_number(number, decimal_places) for number in numbers]
 
 def format_indian_integer(number):
     """Format an integer in Indian style with commas (e.g., 10,00,000)"""
-    return format_indian_number(number, decimal_places=0)
\ No newline at end of file
+    return format_indian_number(number, decimal_places=0)
+
+_DECIMAL_CONTEXT = Context(prec=60, rounding=ROUND_HALF_UP)
+_ONE = Decimal(1)
+
+def _format_indian_number(number, decimal_places):
+    """Return the Indian style string of `number`, working on the digits of its scaled integer value"""
+    digits = None
+    
+    if type(number) is float:
+        # repr() is the shortest string that round-trips, i.e. the decimal value
+        # the user entered, so rounding its digits avoids binary float artefacts
+        text = repr(number)
+        if "e" not in text and "n" not in text:
+            negative = text[0] == "-"
+            integer_part, _, decimal_part = text.lstrip("-").partition(".")
+            if len(decimal_part) <= decimal_places:
+                digits = integer_part + decimal_part.ljust(decimal_places, "0")
+            elif decimal_part[decimal_places] >= "5":
+                digits = str(int(integer_part + decimal_part[:decimal_places]) + 1)
+            else:
+                digits = integer_part + decimal_part[:decimal_places]
+    elif isinstance(number, int):
+        negative = number < 0
+        digits = str(abs(number)) + "0" * decimal_places
+    
+    if digits is None:
+        try:
+            value = number if isinstance(number, Decimal) else Decimal(str(number))
+            value = value.scaleb(decimal_places, _DECIMAL_CONTEXT).quantize(_ONE, context=_DECIMAL_CONTEXT)
+            negative = value < 0
+            digits = str(abs(int(value)))
+        except (ArithmeticError, ValueError, TypeError):
+            # Invalid input, NaN and infinity are printed as zero
+            negative = False
+            digits = "0"
+    
+    if decimal_places:
+        digits = digits.zfill(decimal_places + 1)
+        integer_part = digits[:-decimal_places]
+    else:
+        integer_part = digits.lstrip("0") or "0"
+    
+    # Last three digits form one group, the rest is grouped in pairs
+    length = len(integer_part)
+    if length > 7:
+        head = integer_part[:-3]
+        first = len(head) % 2
+        groups = [head[:first]] if first else []
+        groups.extend([head[i:i + 2] for i in range(first, len(head), 2)])
+        groups.append(integer_part[-3:])
+        integer_part = ",".join(groups)
+    elif length > 5:
+        integer_part = integer_part[:-5] + "," + integer_part[-5:-3] + "," + integer_part[-3:]
+    elif length > 3:
+        integer_part = integer_part[:-3] + "," + integer_part[-3:]
+    
+    # Keep the sign outside the digit groups and never print "-0.00"
+    if negative and digits.strip("0"):
+        integer_part = "-" + integer_part
+    
+    if decimal_places:
+        return integer_part + "." + digits[-decimal_places:]
+    return integer_part